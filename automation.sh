@@ -18,9 +18,15 @@ echo "Installing requirements..."
 pip3 install -r "$REPO_DIR/requirements.txt" || { echo "Error: Failed to install requirements."; exit 1; }
 
 
-# Run the Python script
-echo "Running Python script..."
-python3 "$SCRIPT_PATH" || { echo "Error: Failed to run Python script."; exit 1; }
+# Run a backfill worker when a job is assigned, otherwise the Python script
+if [ -n "$BACKFILL_BUCKET" ] && [ -n "$BACKFILL_JOB_ID" ]; then
+    echo "Running backfill worker for job $BACKFILL_JOB_ID..."
+    python3 "$REPO_DIR/src/backfill.py" worker "$BACKFILL_BUCKET" "$BACKFILL_JOB_ID" \
+        --lease-seconds "${BACKFILL_LEASE_SECONDS:-900}" || { echo "Error: Backfill worker failed."; exit 1; }
+else
+    echo "Running Python script..."
+    python3 "$SCRIPT_PATH" || { echo "Error: Failed to run Python script."; exit 1; }
+fi
 
 echo "Script execution complete."
 
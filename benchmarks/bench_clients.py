@@ -0,0 +1,96 @@
+"""
+Per-call latency of fresh boto3 clients versus the shared aws_clients registry.
+
+Runs S3 ListBuckets against a local stubbed endpoint, so only client construction and
+connection setup are measured, not AWS itself:
+
+    python benchmarks/bench_clients.py --calls 200
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import boto3  # noqa: E402
+import aws_clients  # noqa: E402
+
+LIST_BUCKETS_XML = (b'<?xml version="1.0" encoding="UTF-8"?>'
+                    b'<ListAllMyBucketsResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+                    b'<Owner><ID>stub</ID><DisplayName>stub</DisplayName></Owner>'
+                    b'<Buckets><Bucket><Name>bucket-s3</Name>'
+                    b'<CreationDate>2022-01-01T00:00:00.000Z</CreationDate></Bucket></Buckets>'
+                    b'</ListAllMyBucketsResult>')
+
+
+class StubS3Handler(BaseHTTPRequestHandler):
+    """Answers every GET with a canned ListBuckets response over a keep-alive connection."""
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/xml')
+        self.send_header('Content-Length', str(len(LIST_BUCKETS_XML)))
+        self.end_headers()
+        self.wfile.write(LIST_BUCKETS_XML)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_server():
+    """Starts the stub endpoint on a free localhost port and returns (server, endpoint_url)."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubS3Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def time_calls(make_client, calls):
+    """Returns per-call latencies in milliseconds for client lookup plus one ListBuckets call."""
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        make_client().list_buckets()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def summarize(latencies):
+    """Reduces latencies to mean/p50/p95 milliseconds."""
+    ordered = sorted(latencies)
+    return {
+        'mean_ms': round(statistics.fmean(ordered), 3),
+        'p50_ms': round(ordered[len(ordered) // 2], 3),
+        'p95_ms': round(ordered[int(len(ordered) * 0.95) - 1], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--calls', type=int, default=200)
+    args = parser.parse_args()
+
+    for name in ('AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY'):
+        os.environ.setdefault(name, 'stub')
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+    server, endpoint_url = start_stub_server()
+    try:
+        before = time_calls(lambda: boto3.client('s3', endpoint_url=endpoint_url), args.calls)
+        after = time_calls(lambda: aws_clients.get_client('s3', endpoint_url=endpoint_url), args.calls)
+    finally:
+        server.shutdown()
+
+    print(json.dumps({'calls': args.calls,
+                      'per_call_client': summarize(before),
+                      'shared_registry': summarize(after)}, indent=4))
+
+
+if __name__ == "__main__":
+    main()
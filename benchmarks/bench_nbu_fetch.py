@@ -0,0 +1,59 @@
+"""
+Serial, concurrent and planned-grid NBU fetching against the local fake NBU server.
+
+    python benchmarks/bench_nbu_fetch.py --days 30 --currencies 10 --latency 0.05
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from fake_nbu import CURRENCIES, start_fake_nbu  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--currencies", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--rate-limit", type=float, default=0, help="Requests per second, 0 for unlimited")
+    args = parser.parse_args()
+
+    server = start_fake_nbu(latency=args.latency, error_rate=args.error_rate)
+    os.environ["NBU_API_URL"] = server.api_url
+    os.environ["NBU_PERIOD_URL"] = server.period_url
+    import nbu_fetcher
+
+    dates = [(datetime(2022, 1, 1) + timedelta(days=day)).strftime("%Y%m%d") for day in range(args.days)]
+    pairs = [(date, currency) for date in dates for currency in CURRENCIES[:args.currencies]]
+    results = {"pairs": len(pairs), "latency_s": args.latency}
+
+    def measure(name, fetch):
+        server.requests = 0
+        start = time.perf_counter()
+        result = fetch()
+        results[name] = {"seconds": round(time.perf_counter() - start, 3), "requests": server.requests}
+        return result
+
+    serial = measure("serial", lambda: [nbu_fetcher.fetch_exchange_rate(date, currency) for date, currency in pairs])
+    concurrent = measure("concurrent", lambda: nbu_fetcher.fetch_exchange_rates(
+        pairs, max_workers=args.workers, rate_limit=args.rate_limit))
+    results["identical"] = serial == concurrent
+
+    expected = {pair: rate[pair[1]] for pair, rate in zip(pairs, serial) if rate}
+    for mode in nbu_fetcher.FETCH_MODES + (None,):
+        grid = measure(f"grid_{mode or 'auto'}", lambda: nbu_fetcher.fetch_rate_grid(
+            dates, CURRENCIES[:args.currencies], mode=mode, max_workers=args.workers, rate_limit=args.rate_limit))
+        results[f"grid_{mode or 'auto'}"]["identical"] = grid == expected
+    server.shutdown()
+    print(json.dumps(results, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Import-time startup cost of every src/cli.py subcommand, measured with python -X importtime.
+
+Each command is resolved in a fresh interpreter (its module is imported, nothing is called), so the
+numbers are what every short-lived invocation pays before doing any work:
+
+    python benchmarks/bench_startup.py --budget-ms 150
+    python benchmarks/bench_startup.py --commands s3-buckets,ddb-delete --repeat 5
+
+Exits with status 1 if a command's median import time exceeds the budget, or if a command imports
+one of HEAVY_MODULES.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+import cli  # noqa: E402
+
+HEAVY_MODULES = ('pandas', 'matplotlib', 'pyarrow', 'boto3', 'botocore', 'requests')
+DEFAULT_BUDGET_MS = 150
+
+
+def parse_importtime(stderr):
+    """Returns {module: cumulative_us} for top-level imports and the set of every imported module."""
+    top_level, imported = {}, set()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        module = name.strip()
+        imported.add(module)
+        if not name[1:].startswith(' '):  # Nested imports are indented below their parent
+            top_level[module] = int(cumulative)
+    return top_level, imported
+
+
+def measure(command):
+    """Imports the command's target in a fresh interpreter; returns (total_ms, top-level modules, imported)."""
+    code = f"import sys; sys.path.insert(0, {SRC_DIR!r}); import cli; cli.resolve({command!r})"
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f"{command} failed to import:\n{result.stderr[-2000:]}")
+    top_level, imported = parse_importtime(result.stderr)
+    return sum(top_level.values()) / 1000, top_level, imported
+
+
+def bench(commands, repeat, top):
+    results = []
+    for command in commands:
+        totals, top_level, imported = [], {}, set()
+        for _ in range(repeat):
+            total_ms, top_level, imported = measure(command)
+            totals.append(total_ms)
+        heaviest = sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:top]
+        results.append({
+            'command': command,
+            'target': cli.COMMANDS[command][0],
+            'import_ms': round(statistics.median(totals), 1),
+            'heavy_modules': sorted(module for module in HEAVY_MODULES if module in imported),
+            'heaviest': [{'module': module, 'ms': round(us / 1000, 1)} for module, us in heaviest],
+        })
+    return results
+
+
+def check(results, budget_ms):
+    violations = []
+    for result in results:
+        if result['import_ms'] > budget_ms:
+            violations.append(f"{result['command']}: {result['import_ms']} ms exceeds the {budget_ms} ms budget")
+        if result['heavy_modules']:
+            violations.append(f"{result['command']}: imports {', '.join(result['heavy_modules'])} at startup")
+    return violations
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--commands', default=','.join(cli.COMMANDS),
+                        help='comma-separated subcommands (default: all)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per command; the median is reported')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help='maximum median import time per command')
+    parser.add_argument('--top', type=int, default=5, help='heaviest top-level imports listed per command')
+    parser.add_argument('--output', help='also write the results to this JSON file')
+    args = parser.parse_args()
+
+    results = bench([command for command in args.commands.split(',') if command], args.repeat, args.top)
+    violations = check(results, args.budget_ms)
+    report = {'budget_ms': args.budget_ms, 'commands': results, 'violations': violations}
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    sys.exit(1 if violations else 0)
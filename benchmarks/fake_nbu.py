@@ -0,0 +1,139 @@
+"""
+Local stand-in for the NBU statdirectory API with injectable latency and failures.
+
+    python benchmarks/fake_nbu.py --port 8000 --latency 0.05
+    NBU_API_URL=http://127.0.0.1:8000/NBUStatService/v1/statdirectory \
+    NBU_PERIOD_URL=http://127.0.0.1:8000/NBU_Exchange python src/ec2_s3.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+API_PREFIX = "/NBUStatService/v1/statdirectory"
+PERIOD_PREFIX = "/NBU_Exchange"
+CURRENCIES = ["AUD", "AZN", "BDT", "CAD", "CHF", "CNY", "CZK", "DKK", "DZD", "EGP", "EUR", "GBP", "GEL", "HKD",
+              "HUF", "IDR", "ILS", "INR", "JPY", "KRW", "KZT", "LBP", "MDL", "MXN", "MYR", "NOK", "NZD", "PLN",
+              "RON", "RSD", "SAR", "SEK", "SGD", "THB", "TND", "TRY", "USD", "VND", "XAU", "ZAR"]
+
+
+def fake_rate(currency_code, date):
+    """
+    Deterministic pseudo rate for a currency on a date, so repeated runs produce identical data.
+
+    Like the real NBU rates, weekend dates carry the rate set on the preceding Friday.
+    """
+    set_on = date - timedelta(days=max(date.weekday() - 4, 0))
+    seed = zlib.crc32(f"{currency_code}{set_on:%Y%m%d}".encode())
+    return round(10 + (seed % 400000) / 10000, 4)
+
+
+def rate_record(currency_code, date):
+    """Builds one record shaped like the real statdirectory exchange endpoint output."""
+    return {"r030": CURRENCIES.index(currency_code), "txt": currency_code, "cc": currency_code,
+            "rate": fake_rate(currency_code, date), "exchangedate": f"{date:%d.%m.%Y}"}
+
+
+def period_records(currency_code, start, end):
+    """Builds exchange_site records for the working days in [start, end], quoted per 10 units."""
+    records = []
+    day = start
+    while day <= end:
+        if day.weekday() < 5:
+            rate = fake_rate(currency_code, day)
+            records.append({"exchangedate": f"{day:%d.%m.%Y}", "r030": CURRENCIES.index(currency_code),
+                            "cc": currency_code, "txt": currency_code, "enname": currency_code,
+                            "rate": round(rate * 10, 4), "units": 10, "rate_per_unit": rate})
+        day += timedelta(days=1)
+    return records
+
+
+class FakeNBUHandler(BaseHTTPRequestHandler):
+    """Serves the exchange and exchange_site endpoints; latency and error_rate are set on the server instance."""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        server.count_request()
+        if server.latency:
+            time.sleep(server.latency)
+        if server.error_rate and random.random() < server.error_rate:
+            return self.reply(server.error_status, {"message": "Service Unavailable"})
+
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query, keep_blank_values=True).items()}
+        if url.path == f"{PERIOD_PREFIX}/exchange_site":
+            start, end = (datetime.strptime(params[name], "%Y%m%d") for name in ("start", "end"))
+            valcode = params.get("valcode", "").upper()
+            return self.reply(200, period_records(valcode, start, end) if valcode in CURRENCIES else [])
+        if url.path != f"{API_PREFIX}/exchange":
+            return self.reply(404, {"message": "Not Found"})
+
+        date = datetime.strptime(params["date"], "%Y%m%d") if "date" in params else datetime.now()
+        valcode = params.get("valcode", "").upper()
+        codes = [valcode] if valcode else CURRENCIES
+        self.reply(200, [rate_record(code, date) for code in codes if code in CURRENCIES])
+
+    def reply(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeNBUServer(ThreadingHTTPServer):
+    """Threaded fake NBU server that counts the requests it receives."""
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), latency=0.0, error_rate=0.0, error_status=503):
+        super().__init__(address, FakeNBUHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    @property
+    def api_url(self):
+        """Base URL to put in NBU_API_URL."""
+        return f"http://127.0.0.1:{self.server_address[1]}{API_PREFIX}"
+
+    @property
+    def period_url(self):
+        """Base URL to put in NBU_PERIOD_URL."""
+        return f"http://127.0.0.1:{self.server_address[1]}{PERIOD_PREFIX}"
+
+
+def start_fake_nbu(latency=0.0, error_rate=0.0, error_status=503):
+    """Starts a fake NBU server on a free port in a background thread and returns it."""
+    server = FakeNBUServer(latency=latency, error_rate=error_rate, error_status=error_status)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with an error")
+    parser.add_argument("--error-status", type=int, default=503, help="HTTP status of the injected errors")
+    args = parser.parse_args()
+
+    fake = FakeNBUServer(("127.0.0.1", args.port), args.latency, args.error_rate, args.error_status)
+    print(f"Fake NBU API listening on {fake.api_url} and {fake.period_url}")
+    fake.serve_forever()
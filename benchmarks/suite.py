@@ -0,0 +1,231 @@
+"""
+Benchmark suite for the S3, DynamoDB, NBU and plotting paths against moto and the fake NBU server.
+
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/suite.py --sizes 10,1000,100000 --nbu-latency 0.02 --aws-latency 0.005 --output results.json
+
+Every size gets a synthetic rates dataset with unique (Currency, Rate) keys. Paths whose cost does not
+scale usefully to millions of rows (item-by-item loading, S3 object counts, NBU pairs) are capped by
+the --max-* options; each result records the row count it actually ran with.
+"""
+import argparse
+import contextlib
+import csv
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+from fake_nbu import CURRENCIES, start_fake_nbu  # noqa: E402
+
+BUCKET = "bench-bucket"
+TABLE = "boto3_sdk_exchange_rates"
+BASE_DATE = datetime(2000, 1, 1)
+SUITE_CURRENCIES = ["USD", "EUR"] + [c for c in CURRENCIES if c not in ("USD", "EUR")][:8]
+ALL_PATHS = ["load", "query", "upload", "download", "purge", "combined_rates", "plot", "plot_current"]
+
+
+def write_dataset(path, rows, currencies=SUITE_CURRENCIES):
+    """Streams a synthetic rates CSV with unique (Currency, Rate) keys and one date per currency round."""
+    with open(path, "w", newline="", encoding="utf-8") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["Currency", "Rate", "Exchange Date"])
+        for i in range(rows):
+            date = BASE_DATE + timedelta(days=i // len(currencies))
+            writer.writerow([currencies[i % len(currencies)], f"{20 + i * 1e-4:.4f}", date.strftime("%d.%m.%Y")])
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def measure(fn, rows=None):
+    """Runs fn with its console output sent to stderr and returns timing, throughput and memory."""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stderr):
+        value = fn()
+    seconds = time.perf_counter() - start
+    result = {"seconds": round(seconds, 6), "peak_rss_mb": peak_rss_mb()}
+    if rows is not None:
+        result["rows"] = rows
+        result["rows_per_sec"] = round(rows / seconds, 1) if seconds else None
+    return result, value
+
+
+def inject_aws_latency(seconds):
+    """Delays every AWS request by the given seconds, emulating the round trip moto does not have."""
+    import aws_clients
+
+    def delay(**kwargs):
+        time.sleep(seconds)
+
+    aws_clients.register_event_handler("request-created", delay)
+
+
+def bench_size(size, args, workdir, nbu_server):
+    """Runs every selected path on a dataset of the given size and returns their results."""
+    import dynamodb
+    import ec2_s3
+    import ec2_s3_computing_automation as automation
+    from aws_clients import get_client
+
+    csv_path = os.path.join(workdir, f"rates_{size}.csv")
+    write_dataset(csv_path, size)
+    results = {"file_mb": round(os.path.getsize(csv_path) / (1024 * 1024), 3)}
+
+    if "load" in args.paths or "query" in args.paths:
+        with contextlib.redirect_stdout(sys.stderr):
+            dynamodb.create_dynamodb_table()
+        results["load_bulk"], _ = measure(lambda: dynamodb.load_items_from_csv_to_table(
+            TABLE, csv_path, bulk=True, max_workers=args.workers), size)
+        serial_rows = min(size, args.max_serial_rows)
+        if "load" in args.paths and serial_rows:
+            serial_path = os.path.join(workdir, f"rates_{serial_rows}_serial.csv")
+            write_dataset(serial_path, serial_rows)
+            results["load_serial"], _ = measure(
+                lambda: dynamodb.load_items_from_csv_to_table(TABLE, serial_path), serial_rows)
+
+    if "query" in args.paths:
+        results["query_all"], items = measure(lambda: dynamodb.query_items(TABLE), size)
+        results["query_all"]["items"] = len(items)
+        results["query_currency"], items = measure(lambda: dynamodb.query_items(TABLE, currency="USD"))
+        results["query_currency"]["items"] = len(items)
+        dynamodb.query_items(TABLE, currency="USD", use_cache=True)
+        results["query_currency_cached"], _ = measure(lambda: dynamodb.query_items(TABLE, currency="USD",
+                                                                                   use_cache=True))
+
+    if "load" in args.paths or "query" in args.paths:
+        get_client("dynamodb").delete_table(TableName=TABLE)
+
+    if "upload" in args.paths or "download" in args.paths:
+        object_name = os.path.basename(csv_path)
+        results["upload"], _ = measure(lambda: ec2_s3.upload_file_to_s3(BUCKET, csv_path), size)
+        if "download" in args.paths:
+            # download_file_from_s3 always writes src/s3_exchange_rates.csv, so keep the checked-in copy
+            target = os.path.join(SRC_DIR, "s3_exchange_rates.csv")
+            backup = os.path.join(workdir, "s3_exchange_rates.csv.bak")
+            if os.path.exists(target):
+                shutil.copyfile(target, backup)
+            try:
+                results["download"], _ = measure(lambda: ec2_s3.download_file_from_s3(BUCKET, object_name), size)
+            finally:
+                if os.path.exists(backup):
+                    shutil.move(backup, target)
+
+    if "purge" in args.paths:
+        objects = min(size, args.max_objects)
+        s3_client = get_client("s3")
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            list(executor.map(lambda i: s3_client.put_object(Bucket=BUCKET, Key=f"purge/{i:08d}", Body=b"x" * 64),
+                              range(objects)))
+        results["purge"], _ = measure(lambda: automation.delete_all_objects_in_s3_bucket(
+            BUCKET, max_workers=args.workers), objects)
+
+    if "combined_rates" in args.paths:
+        pairs = min(size, args.max_nbu_pairs)
+        currencies = SUITE_CURRENCIES[:min(pairs, len(SUITE_CURRENCIES))]
+        days = -(-pairs // len(currencies))
+        dates = [(BASE_DATE + timedelta(days=day)).strftime("%Y%m%d") for day in range(days)]
+        nbu_server.requests = 0
+        results["combined_rates"], records = measure(lambda: ec2_s3.get_uah_exchange_combined_rates(
+            dates, currencies, use_cache=False), len(dates) * len(currencies))
+        results["combined_rates"]["nbu_requests"] = nbu_server.requests
+        results["combined_rates"]["records"] = len(records)
+
+    if "plot" in args.paths:
+        output_file = os.path.join(workdir, f"plot_{size}.png")
+        results["plot"], _ = measure(lambda: ec2_s3.plot_uah_exchange_rates(
+            csv_path, BASE_DATE.year, output_file=output_file), size)
+
+    if "plot_current" in args.paths:
+        # The bar chart shows one bar per row, so it is fed one date's worth of currencies
+        current_rows = min(size, len(SUITE_CURRENCIES))
+        current_path = os.path.join(workdir, f"current_{current_rows}.csv")
+        write_dataset(current_path, current_rows)
+        results["plot_current"], _ = measure(lambda: ec2_s3.plot_uah_current_exchange_rate(current_path),
+                                             current_rows)
+
+    os.remove(csv_path)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="10,1000,100000", help="Comma-separated dataset sizes in rows")
+    parser.add_argument("--paths", default=",".join(ALL_PATHS), help="Comma-separated subset of " + ",".join(ALL_PATHS))
+    parser.add_argument("--nbu-latency", type=float, default=0.0, help="Seconds added to every fake NBU response")
+    parser.add_argument("--nbu-error-rate", type=float, default=0.0, help="Fraction of NBU requests answered with 503")
+    parser.add_argument("--aws-latency", type=float, default=0.0, help="Seconds added to every AWS request")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--max-serial-rows", type=int, default=1000, help="Cap for item-by-item loading")
+    parser.add_argument("--max-objects", type=int, default=10000, help="Cap for objects created for the purge")
+    parser.add_argument("--max-nbu-pairs", type=int, default=20000, help="Cap for (date, currency) pairs fetched")
+    parser.add_argument("--metrics", action="store_true", help="Add per-operation API metrics to the results")
+    parser.add_argument("--output", help="Write the JSON results to this file as well as stdout")
+    args = parser.parse_args()
+    args.paths = args.paths.split(",")
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    from moto import mock_aws
+
+    nbu_server = start_fake_nbu(latency=args.nbu_latency, error_rate=args.nbu_error_rate)
+    workdir = tempfile.mkdtemp(prefix="bench_suite_")
+    # Set before any src module is imported, so runs start cold and synthetic rates never reach the
+    # user's rate cache or rollup store
+    os.environ.update({"NBU_API_URL": nbu_server.api_url, "NBU_PERIOD_URL": nbu_server.period_url,
+                       "AWS_ACCESS_KEY_ID": "testing", "AWS_SECRET_ACCESS_KEY": "testing",
+                       "AWS_DEFAULT_REGION": "us-east-1",
+                       "NBU_RATE_CACHE": os.path.join(workdir, "nbu_rates_cache.sqlite"),
+                       "RATE_ROLLUPS": os.path.join(workdir, "rate_rollups.sqlite")})
+    os.environ.pop("AWS_ENDPOINT_URL", None)
+
+    report = {
+        "started": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "nbu_latency_s": args.nbu_latency,
+        "aws_latency_s": args.aws_latency,
+        "workers": args.workers,
+        "sizes": {},
+    }
+    cwd = os.getcwd()
+    os.chdir(workdir)  # plot_uah_current_exchange_rate saves into the working directory
+    try:
+        with mock_aws():
+            if args.aws_latency:
+                inject_aws_latency(args.aws_latency)
+            if args.metrics:
+                import instrumentation
+                instrumentation.enable()
+            from aws_clients import get_client
+            get_client("s3").create_bucket(Bucket=BUCKET)
+            for size in sizes:
+                print(f"Benchmarking {size} rows...", file=sys.stderr)
+                report["sizes"][str(size)] = bench_size(size, args, workdir, nbu_server)
+            if args.metrics:
+                report["metrics"] = instrumentation.get_metrics().summary()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+        nbu_server.shutdown()
+
+    output = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import threading
+
+DEFAULT_MAX_POOL_CONNECTIONS = 50
+
+_lock = threading.Lock()
+_thread_local = threading.local()
+_session = None
+_clients = {}
+_generation = 0  # Bumped by reset() so per-thread resource caches are discarded lazily
+_event_handlers = []  # (event name, handler) pairs registered on every new session
+_config_kwargs = {"max_pool_connections": DEFAULT_MAX_POOL_CONNECTIONS, "tcp_keepalive": True}
+_config = None  # botocore Config built from _config_kwargs with the first session
+
+
+def configure(max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS, tcp_keepalive=True, **config_kwargs):
+    """
+    Sets the botocore configuration used for every client and resource created by the registry.
+
+    Already cached clients are dropped so the next lookup picks up the new settings.
+
+    Args:
+        max_pool_connections (int): Size of each client's HTTP connection pool.
+        tcp_keepalive (bool): Enables TCP keep-alive on pooled connections.
+        **config_kwargs: Any other botocore Config options (e.g. retries, connect_timeout).
+    """
+    global _config_kwargs, _config
+    with _lock:
+        _config_kwargs = dict(max_pool_connections=max_pool_connections, tcp_keepalive=tcp_keepalive, **config_kwargs)
+        _config = None
+    reset()
+
+
+def reset():
+    """Drops the shared session and all cached clients and resources."""
+    global _session, _generation
+    with _lock:
+        _session = None
+        _clients.clear()
+        _generation += 1
+
+
+def get_session():
+    """Returns the process-wide boto3 session, creating it on first use."""
+    global _session, _config
+    with _lock:
+        if _session is None:
+            # boto3 is imported here so importing this module (and the CLI) stays cheap
+            import boto3.session
+            from botocore.config import Config
+            _config = _config or Config(**_config_kwargs)
+            _session = boto3.session.Session()
+            for event_name, handler in _event_handlers:
+                _session.events.register(event_name, handler)
+        return _session
+
+
+def register_event_handler(event_name, handler):
+    """
+    Registers a botocore event handler (e.g. 'after-call') for every client and resource of the registry.
+
+    Cached clients are dropped so they are rebuilt with the handler attached.
+    """
+    with _lock:
+        _event_handlers.append((event_name, handler))
+    reset()
+
+
+def unregister_event_handler(event_name, handler):
+    """Removes a handler added with register_event_handler; cached clients are rebuilt without it."""
+    with _lock:
+        if (event_name, handler) in _event_handlers:
+            _event_handlers.remove((event_name, handler))
+    reset()
+
+
+def get_client(service_name, region_name=None, endpoint_url=None):
+    """
+    Returns a shared, pooled boto3 client for a service and region.
+
+    Clients are thread-safe, so one instance per (service, region, endpoint) is reused by all threads.
+
+    Args:
+        service_name (str): AWS service name, e.g. 's3' or 'ec2'.
+        region_name (str): AWS region. If not specified, the session default is used.
+        endpoint_url (str): Optional endpoint override, e.g. a local stand-in.
+    """
+    key = (service_name, region_name, endpoint_url)
+    client = _clients.get(key)
+    if client is None:
+        session = get_session()
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                # Session.client() is not thread-safe, so creation happens under the lock
+                client = session.client(service_name, region_name=region_name,
+                                        endpoint_url=endpoint_url, config=_config)
+                _clients[key] = client
+    return client
+
+
+def get_resource(service_name, region_name=None, endpoint_url=None):
+    """
+    Returns a pooled boto3 resource for a service and region, cached per calling thread.
+
+    Resources are not thread-safe, so each thread gets its own instance which it then keeps reusing.
+
+    Args:
+        service_name (str): AWS service name, e.g. 'dynamodb'.
+        region_name (str): AWS region. If not specified, the session default is used.
+        endpoint_url (str): Optional endpoint override, e.g. a local stand-in.
+    """
+    if getattr(_thread_local, 'generation', None) != _generation:
+        _thread_local.generation = _generation
+        _thread_local.resources = {}
+    resources = _thread_local.resources
+    key = (service_name, region_name, endpoint_url)
+    resource = resources.get(key)
+    if resource is None:
+        session = get_session()
+        with _lock:
+            resource = session.resource(service_name, region_name=region_name,
+                                        endpoint_url=endpoint_url, config=_config)
+        resources[key] = resource
+    return resource
@@ -0,0 +1,404 @@
+import argparse
+import csv
+import io
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from aws_clients import get_client
+import ec2_s3
+
+LOCK_TABLE = "boto3_sdk_backfill_locks"
+JOB_PREFIX = "backfill"
+DEFAULT_SHARD_DAYS = 31
+DEFAULT_LEASE_SECONDS = 900
+DEFAULT_MAX_ATTEMPTS = 3  # Claims of one shard before it is marked failed
+RATE_FIELDS = ["Currency", "Rate", "Exchange Date"]
+
+
+def _job_key(job_id, *parts):
+    """S3 key under the job's prefix, e.g. backfill/<job_id>/shards/0001.json."""
+    return "/".join([JOB_PREFIX, job_id, *parts])
+
+
+def _chunks(values, size):
+    """Splits a list into consecutive chunks of at most size elements."""
+    return [values[i:i + size] for i in range(0, len(values), size)]
+
+
+def date_range(start_date, end_date):
+    """Returns every date from start_date to end_date inclusive, both in YYYYMMDD format."""
+    day = datetime.strptime(start_date, "%Y%m%d")
+    end = datetime.strptime(end_date, "%Y%m%d")
+    dates = []
+    while day <= end:
+        dates.append(day.strftime("%Y%m%d"))
+        day += timedelta(days=1)
+    return dates
+
+
+def plan_shards(dates, currency_codes, shard_days=DEFAULT_SHARD_DAYS, currencies_per_shard=None):
+    """
+    Divides a dates x currencies backfill into shards of consecutive dates and currency groups.
+
+    Args:
+        dates (list): Dates in YYYYMMDD format.
+        currency_codes (list): Currency codes, e.g. ["USD", "EUR"].
+        shard_days (int): Dates per shard.
+        currencies_per_shard (int): Currencies per shard. Defaults to all of them.
+
+    Returns:
+        list: Shard manifests with shard_id, dates and currencies keys.
+    """
+    currency_groups = _chunks(list(currency_codes), currencies_per_shard or len(currency_codes))
+    shards = []
+    for date_chunk in _chunks(list(dates), shard_days):
+        for currency_group in currency_groups:
+            shards.append({"shard_id": f"{len(shards):05d}", "dates": date_chunk, "currencies": currency_group})
+    return shards
+
+
+def create_lock_table(table_name=LOCK_TABLE):
+    """Creates the DynamoDB table holding one claim record per (job, shard), if it does not exist yet."""
+    dynamodb_client = get_client("dynamodb")
+    try:
+        dynamodb_client.create_table(
+            TableName=table_name,
+            KeySchema=[
+                {"AttributeName": "JobId", "KeyType": "HASH"},
+                {"AttributeName": "ShardId", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "JobId", "AttributeType": "S"},
+                {"AttributeName": "ShardId", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        dynamodb_client.get_waiter("table_exists").wait(TableName=table_name)
+        print(f"Lock table '{table_name}' created.")
+    except dynamodb_client.exceptions.ResourceInUseException:
+        pass
+
+
+def start_backfill(bucket_name, job_id, dates, currency_codes, shard_days=DEFAULT_SHARD_DAYS,
+                   currencies_per_shard=None, lock_table=LOCK_TABLE):
+    """
+    Coordinator step: plans the shards and publishes their manifests to S3.
+
+    Manifests land under s3://bucket_name/backfill/<job_id>/shards/, next to a job.json listing
+    every shard, which workers and merge_backfill read.
+
+    Returns:
+        list: The published shard manifests.
+    """
+    create_lock_table(lock_table)
+    shards = plan_shards(dates, currency_codes, shard_days, currencies_per_shard)
+    s3_client = get_client("s3")
+    for shard in shards:
+        s3_client.put_object(Bucket=bucket_name, Key=_job_key(job_id, "shards", shard["shard_id"] + ".json"),
+                             Body=json.dumps(shard).encode("utf-8"), ContentType="application/json")
+    job = {"job_id": job_id, "currencies": list(currency_codes), "shards": [shard["shard_id"] for shard in shards]}
+    s3_client.put_object(Bucket=bucket_name, Key=_job_key(job_id, "job.json"),
+                         Body=json.dumps(job).encode("utf-8"), ContentType="application/json")
+    print(f"Backfill '{job_id}': {len(dates)} dates x {len(currency_codes)} currencies "
+          f"in {len(shards)} shards published to s3://{bucket_name}/{_job_key(job_id)}/")
+    return shards
+
+
+def load_job(bucket_name, job_id):
+    """Reads the job.json written by start_backfill."""
+    body = get_client("s3").get_object(Bucket=bucket_name, Key=_job_key(job_id, "job.json"))["Body"].read()
+    return json.loads(body)
+
+
+def claim_shard(job_id, shard_id, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS, lock_table=LOCK_TABLE,
+                max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """
+    Claims a shard with a conditional update on the lock table.
+
+    The update succeeds only if the shard was never claimed or its previous claim is unfinished and its
+    lease has expired, so a shard abandoned by a crashed worker is picked up again. Every claim adds
+    one to the shard's Attempts; a shard that was already claimed max_attempts times without finishing
+    is marked failed instead of being handed out again.
+
+    Returns:
+        bool: True if this worker now owns the shard.
+    """
+    dynamodb_client = get_client("dynamodb")
+    now = int(time.time())
+    try:
+        response = dynamodb_client.update_item(
+            TableName=lock_table,
+            Key={"JobId": {"S": job_id}, "ShardId": {"S": shard_id}},
+            UpdateExpression="SET #owner = :owner, ShardStatus = :claimed, LeaseExpires = :expires "
+                             "ADD Attempts :one",
+            ConditionExpression="attribute_not_exists(ShardId) OR (ShardStatus = :claimed AND LeaseExpires < :now)",
+            ExpressionAttributeNames={"#owner": "Owner"},
+            ExpressionAttributeValues={":owner": {"S": worker_id}, ":claimed": {"S": "claimed"},
+                                       ":expires": {"N": str(now + lease_seconds)}, ":now": {"N": str(now)},
+                                       ":one": {"N": "1"}},
+            ReturnValues="UPDATED_NEW",
+        )
+    except dynamodb_client.exceptions.ConditionalCheckFailedException:
+        return False
+
+    attempts = int(response["Attributes"]["Attempts"]["N"])
+    if attempts <= max_attempts:
+        return True
+    dynamodb_client.update_item(
+        TableName=lock_table,
+        Key={"JobId": {"S": job_id}, "ShardId": {"S": shard_id}},
+        UpdateExpression="SET ShardStatus = :failed",
+        ConditionExpression="#owner = :owner",
+        ExpressionAttributeNames={"#owner": "Owner"},
+        ExpressionAttributeValues={":failed": {"S": "failed"}, ":owner": {"S": worker_id}},
+    )
+    print(f"[{worker_id}] shard {shard_id}: marked failed after {max_attempts} attempts")
+    return False
+
+
+def complete_shard(job_id, shard_id, worker_id, rows, lock_table=LOCK_TABLE):
+    """Marks an owned shard as done; returns False if the lease was lost to another worker."""
+    dynamodb_client = get_client("dynamodb")
+    try:
+        dynamodb_client.update_item(
+            TableName=lock_table,
+            Key={"JobId": {"S": job_id}, "ShardId": {"S": shard_id}},
+            UpdateExpression="SET ShardStatus = :done, #rows = :rows",
+            ConditionExpression="#owner = :owner",
+            ExpressionAttributeNames={"#owner": "Owner", "#rows": "Rows"},
+            ExpressionAttributeValues={":done": {"S": "done"}, ":owner": {"S": worker_id},
+                                       ":rows": {"N": str(rows)}},
+        )
+        return True
+    except dynamodb_client.exceptions.ConditionalCheckFailedException:
+        return False
+
+
+def _get_shard_locks(job_id, lock_table=LOCK_TABLE):
+    """Returns {shard_id: (status, lease_expires)} for every shard of the job that was ever claimed."""
+    paginator = get_client("dynamodb").get_paginator("query")
+    locks = {}
+    for page in paginator.paginate(TableName=lock_table, KeyConditionExpression="JobId = :job",
+                                   ExpressionAttributeValues={":job": {"S": job_id}}):
+        for item in page["Items"]:
+            locks[item["ShardId"]["S"]] = (item["ShardStatus"]["S"], int(item["LeaseExpires"]["N"]))
+    return locks
+
+
+def get_shard_states(job_id, lock_table=LOCK_TABLE):
+    """Returns {shard_id: status} for every shard of the job that was ever claimed."""
+    return {shard_id: status for shard_id, (status, _) in _get_shard_locks(job_id, lock_table).items()}
+
+
+def _claimable_shards(job_id, shard_ids, lock_table=LOCK_TABLE):
+    """Shards among shard_ids that were never claimed, or whose claim is unfinished and its lease expired."""
+    locks = _get_shard_locks(job_id, lock_table)
+    now = int(time.time())
+    return [shard_id for shard_id in shard_ids
+            if shard_id not in locks or (locks[shard_id][0] == "claimed" and locks[shard_id][1] < now)]
+
+
+def _records_to_csv(records):
+    """Serializes exchange rate records to CSV bytes with the json_to_csv columns."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=RATE_FIELDS)
+    writer.writeheader()
+    writer.writerows(records)
+    return buffer.getvalue().encode("utf-8")
+
+
+def process_shard(bucket_name, job_id, shard, use_cache=True):
+    """Fetches one shard's rates and uploads them as backfill/<job_id>/parts/<shard_id>.csv; returns the row count."""
+    records = ec2_s3.get_uah_exchange_combined_rates(shard["dates"], shard["currencies"], use_cache=use_cache)
+    get_client("s3").put_object(Bucket=bucket_name, Key=_job_key(job_id, "parts", shard["shard_id"] + ".csv"),
+                                Body=_records_to_csv(records), ContentType="text/csv")
+    return len(records)
+
+
+def run_worker(bucket_name, job_id, worker_id=None, lease_seconds=DEFAULT_LEASE_SECONDS, lock_table=LOCK_TABLE,
+               use_cache=True, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """
+    Worker loop: claims unfinished shards one at a time, fetches them and uploads their partitions.
+
+    Several workers can run against the same job; the lock table makes sure each shard is fetched once
+    unless its worker dies and the lease expires. After each pass the worker looks for shards whose
+    lease expired in the meantime and makes another pass over them, so it only returns once every
+    shard is done, failed or held by a live claim. A shard that keeps failing is marked failed after
+    max_attempts claims. Workers sharing a host should each get their own NBU_RATE_CACHE (run_local
+    does this).
+
+    Args:
+        bucket_name (str): S3 bucket holding the job.
+        job_id (str): Backfill job started with start_backfill.
+        worker_id (str): Name recorded on claims. Defaults to '<hostname>-<pid>'.
+        lease_seconds (int): How long a claim is held before other workers may take the shard over.
+        lock_table (str): DynamoDB lock table.
+        use_cache (bool): Use the local NBU rate cache.
+        max_attempts (int): Claims of one shard before it is marked failed.
+
+    Returns:
+        list: IDs of the shards processed by this worker.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    processed = []
+    shard_ids = load_job(bucket_name, job_id)["shards"]
+    while shard_ids:
+        for shard_id in shard_ids:
+            if _run_shard(bucket_name, job_id, shard_id, worker_id, lease_seconds, lock_table, use_cache,
+                          max_attempts):
+                processed.append(shard_id)
+        # Leases that ran out during the pass belong to workers that died; take their shards over
+        shard_ids = _claimable_shards(job_id, shard_ids, lock_table)
+    print(f"[{worker_id}] finished, {len(processed)} shards processed.")
+    return processed
+
+
+def _run_shard(bucket_name, job_id, shard_id, worker_id, lease_seconds, lock_table, use_cache, max_attempts):
+    """Claims and processes one shard; returns True if this worker completed it."""
+    if not claim_shard(job_id, shard_id, worker_id, lease_seconds, lock_table, max_attempts):
+        return False
+    try:
+        body = get_client("s3").get_object(Bucket=bucket_name, Key=_job_key(job_id, "shards", shard_id + ".json"))
+        rows = process_shard(bucket_name, job_id, json.loads(body["Body"].read()), use_cache=use_cache)
+        if complete_shard(job_id, shard_id, worker_id, rows, lock_table):
+            print(f"[{worker_id}] shard {shard_id}: {rows} rates uploaded")
+            return True
+        print(f"[{worker_id}] shard {shard_id}: lease lost before completion")
+    except Exception as e:
+        # The claim stays unfinished, so a worker retries the shard once the lease expires, up to max_attempts
+        print(f"[{worker_id}] Error processing shard {shard_id}: {e}")
+    return False
+
+
+def merge_backfill(bucket_name, job_id, output_key=None, lock_table=LOCK_TABLE):
+    """
+    Coordinator step: concatenates the uploaded partitions into a single CSV once every shard is done.
+
+    Records are ordered by date, then by the job's currency order, matching get_uah_exchange_combined_rates.
+
+    Args:
+        bucket_name (str): S3 bucket holding the job.
+        job_id (str): Backfill job.
+        output_key (str): S3 key of the merged CSV. Defaults to backfill/<job_id>/exchange_rates.csv.
+        lock_table (str): DynamoDB lock table.
+
+    Returns:
+        dict: Merged rows, the output key, the shards still pending and the failed ones among them
+            (nothing is merged while any are pending).
+    """
+    job = load_job(bucket_name, job_id)
+    states = get_shard_states(job_id, lock_table)
+    pending = [shard_id for shard_id in job["shards"] if states.get(shard_id) != "done"]
+    failed = [shard_id for shard_id in pending if states.get(shard_id) == "failed"]
+    output_key = output_key or _job_key(job_id, "exchange_rates.csv")
+    if pending:
+        print(f"Backfill '{job_id}': {len(pending)} of {len(job['shards'])} shards not done yet "
+              f"({len(failed)} failed), nothing merged.")
+        return {"rows": 0, "output_key": None, "pending": pending, "failed": failed}
+
+    s3_client = get_client("s3")
+    records = []
+    for shard_id in job["shards"]:
+        body = s3_client.get_object(Bucket=bucket_name, Key=_job_key(job_id, "parts", shard_id + ".csv"))["Body"]
+        records.extend(csv.DictReader(io.StringIO(body.read().decode("utf-8"))))
+
+    currency_order = {currency: i for i, currency in enumerate(job["currencies"])}
+    records.sort(key=lambda r: (datetime.strptime(r["Exchange Date"], "%d.%m.%Y"), currency_order[r["Currency"]]))
+    s3_client.put_object(Bucket=bucket_name, Key=output_key, Body=_records_to_csv(records), ContentType="text/csv")
+    print(f"Backfill '{job_id}': {len(records)} rates merged into s3://{bucket_name}/{output_key}")
+    return {"rows": len(records), "output_key": output_key, "pending": [], "failed": []}
+
+
+def run_local(bucket_name, job_id, dates, currency_codes, workers=3, shard_days=DEFAULT_SHARD_DAYS,
+              port=5000):
+    """
+    Runs a whole backfill on this machine: a moto server stands in for S3 and DynamoDB and each
+    worker is a separate 'backfill.py worker' process, exactly as automation.sh starts them on EC2.
+
+    Requires moto[server]. NBU requests go to NBU_API_URL / NBU_PERIOD_URL, so point those at
+    benchmarks/fake_nbu.py to stay fully offline.
+
+    Returns:
+        dict: The merge_backfill result.
+    """
+    import logging
+    from moto.server import ThreadedMotoServer
+    import aws_clients
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = ThreadedMotoServer(port=port, verbose=False)
+    server.start()
+    env = {**os.environ, "AWS_ENDPOINT_URL": f"http://127.0.0.1:{port}",
+           "AWS_ACCESS_KEY_ID": "testing", "AWS_SECRET_ACCESS_KEY": "testing",
+           "AWS_DEFAULT_REGION": os.environ.get("AWS_DEFAULT_REGION", "us-east-1")}
+    saved_env = {key: os.environ.get(key) for key in env}
+    os.environ.update(env)
+    aws_clients.reset()
+    cache_dir = tempfile.mkdtemp(prefix="backfill_cache_")  # One NBU rate cache per worker process
+    try:
+        get_client("s3").create_bucket(Bucket=bucket_name)
+        start_backfill(bucket_name, job_id, dates, currency_codes, shard_days=shard_days)
+        processes = [
+            subprocess.Popen([sys.executable, os.path.abspath(__file__), "worker", bucket_name, job_id,
+                              "--worker-id", f"local-{i}"],
+                             env={**env, "NBU_RATE_CACHE": os.path.join(cache_dir, f"local-{i}.sqlite")})
+            for i in range(workers)
+        ]
+        for process in processes:
+            process.wait()
+        return merge_backfill(bucket_name, job_id)
+    finally:
+        for key, value in saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        aws_clients.reset()
+        server.stop()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distributed NBU exchange rate backfill.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    start_parser = commands.add_parser("start", help="plan shards and publish their manifests")
+    local_parser = commands.add_parser("local", help="run coordinator and workers locally against moto")
+    for sub in (start_parser, local_parser):
+        sub.add_argument("bucket")
+        sub.add_argument("job_id")
+        sub.add_argument("start_date", help="YYYYMMDD")
+        sub.add_argument("end_date", help="YYYYMMDD")
+        sub.add_argument("--currencies", default="USD,EUR")
+        sub.add_argument("--shard-days", type=int, default=DEFAULT_SHARD_DAYS)
+    local_parser.add_argument("--workers", type=int, default=3)
+
+    worker_parser = commands.add_parser("worker", help="claim and process shards until none are left")
+    worker_parser.add_argument("bucket")
+    worker_parser.add_argument("job_id")
+    worker_parser.add_argument("--worker-id")
+    worker_parser.add_argument("--lease-seconds", type=int, default=DEFAULT_LEASE_SECONDS)
+    worker_parser.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS)
+
+    merge_parser = commands.add_parser("merge", help="merge finished partitions into one CSV")
+    merge_parser.add_argument("bucket")
+    merge_parser.add_argument("job_id")
+
+    args = parser.parse_args()
+    if args.command == "start":
+        start_backfill(args.bucket, args.job_id, date_range(args.start_date, args.end_date),
+                       args.currencies.split(","), shard_days=args.shard_days)
+    elif args.command == "worker":
+        run_worker(args.bucket, args.job_id, worker_id=args.worker_id, lease_seconds=args.lease_seconds,
+                   max_attempts=args.max_attempts)
+    elif args.command == "merge":
+        merge_backfill(args.bucket, args.job_id)
+    else:
+        run_local(args.bucket, args.job_id, date_range(args.start_date, args.end_date),
+                  args.currencies.split(","), workers=args.workers, shard_days=args.shard_days)
@@ -0,0 +1,204 @@
+"""
+Single entry point for the snippets, e.g.:
+
+    python src/cli.py s3-buckets
+    python src/cli.py ddb-delete boto3_sdk_exchange_rates GBP 60.0001
+    python src/cli.py rates 20220101:20220131 USD,EUR
+
+Every subcommand names its implementation as 'module:function', and the module is only imported
+once that subcommand runs, so a trivial command never pays for pandas, matplotlib or a plot it
+does not draw. Options that are left out fall back to the function's own defaults.
+"""
+import argparse
+import importlib
+import json
+import sys
+
+
+def _list(value):
+    """Comma-separated values, e.g. 'USD,EUR'."""
+    return [item for item in value.split(",") if item]
+
+
+def _dates(value):
+    """Comma-separated YYYYMMDD dates and inclusive 'START:END' ranges, e.g. '20220101:20220131,20220301'."""
+    dates = []
+    for item in _list(value):
+        if ":" in item:
+            from backfill import date_range
+            dates += date_range(*item.split(":", 1))
+        else:
+            dates.append(item)
+    return dates
+
+
+def _tags(value):
+    """Comma-separated Key=Value tag filters, e.g. 'Role=worker,Env=dev'."""
+    return dict(item.split("=", 1) for item in _list(value))
+
+
+def _arg(*flags, **kwargs):
+    return flags, kwargs
+
+
+_TABLE = _arg("table_name")
+_BUCKET = _arg("bucket_name")
+_MAX_WORKERS = _arg("--max-workers", type=int)
+_DATES_HELP = "YYYYMMDD dates and START:END ranges, comma-separated"
+_CURRENCIES = _arg("currency_codes", type=_list, help="currency codes, comma-separated, e.g. USD,EUR")
+_PREVIEW = [_arg("--mode", choices=["all", "head", "tail", "page", "sample"]), _arg("--rows", type=int),
+            _arg("--page", type=int), _arg("--seed", type=int)]
+_FETCH = [_arg("--max-workers", type=int), _arg("--rate-limit", type=float),
+          _arg("--mode", choices=["pair", "date", "period"]),
+          _arg("--no-cache", dest="use_cache", action="store_false")]
+
+# name -> (target, help, arguments); argument dests match the target's parameter names
+COMMANDS = {
+    # EC2 instances
+    "ec2-create-key-pair": ("ec2_s3_computing_automation:create_key_pair", "create the automation key pair", []),
+    "ec2-create": ("ec2_s3_computing_automation:create_instance", "launch one instance", []),
+    "ec2-running": ("ec2_s3_computing_automation:get_running_instances", "list running instances", []),
+    "ec2-stopped": ("ec2_s3_computing_automation:get_stopped_instances", "list stopped instances", []),
+    "ec2-stop": ("ec2_s3_computing_automation:stop_instance", "stop the running instances", []),
+    "ec2-terminate": ("ec2_s3_computing_automation:terminate_instance", "terminate the instances", []),
+    "ec2-inventory": ("cli:inventory", "list instances matching state, type and tag filters", [
+        _arg("--states", type=_list), _arg("--instance-types", type=_list), _arg("--tags", type=_tags),
+        _arg("--refresh", action="store_true")]),
+    "fleet-launch": ("ec2_fleet:launch_fleet", "launch a fleet of instances", [
+        _arg("count", type=int), _arg("--image-id"), _arg("--instance-type"), _arg("--key-name"),
+        _arg("--tags", type=_tags), _arg("--launch-chunk", type=int),
+        _arg("--no-partial", dest="allow_partial", action="store_false"), _MAX_WORKERS,
+        _arg("--no-wait", dest="wait", action="store_false")]),
+    "fleet-stop": ("ec2_fleet:stop_fleet", "stop instances and wait until they are stopped", [
+        _arg("instance_ids", nargs="+"), _MAX_WORKERS, _arg("--no-wait", dest="wait", action="store_false")]),
+    "fleet-terminate": ("ec2_fleet:terminate_fleet", "terminate instances and wait until they are gone", [
+        _arg("instance_ids", nargs="+"), _MAX_WORKERS, _arg("--no-wait", dest="wait", action="store_false")]),
+
+    # S3
+    "s3-create-bucket": ("ec2_s3_computing_automation:create_s3_bucket", "create a bucket", [_BUCKET]),
+    "s3-buckets": ("ec2_s3_computing_automation:get_existing_s3_buckets", "list buckets", []),
+    "s3-upload": ("ec2_s3_computing_automation:upload_file_to_s3", "upload a file", [
+        _BUCKET, _arg("file_path"), _arg("object_name", nargs="?")]),
+    "s3-download": ("ec2_s3_computing_automation:download_file_from_s3", "download an object", [
+        _BUCKET, _arg("object_name")]),
+    "s3-preview": ("csv_preview:display_s3_csv_with_header", "preview a CSV object without downloading it", [
+        _BUCKET, _arg("object_name"), *_PREVIEW]),
+    "s3-purge": ("ec2_s3_computing_automation:delete_all_objects_in_s3_bucket", "delete every object", [
+        _BUCKET, _MAX_WORKERS]),
+    "s3-destroy": ("ec2_s3_computing_automation:destroy_s3_bucket", "empty and delete a bucket", [_BUCKET]),
+    "s3-sync-up": ("s3_transfer:sync_directory_to_s3", "upload a directory's new and changed files", [
+        _arg("local_dir"), _BUCKET, _arg("--prefix"), _MAX_WORKERS]),
+    "s3-sync-down": ("s3_transfer:sync_s3_prefix_to_directory", "download a prefix's new and changed objects", [
+        _BUCKET, _arg("prefix"), _arg("local_dir"), _MAX_WORKERS]),
+    "csv-preview": ("csv_preview:display_csv_with_header", "preview a local CSV file", [
+        _arg("csv_file_path"), *_PREVIEW]),
+
+    # DynamoDB
+    "ddb-create-table": ("dynamodb:create_dynamodb_table", "create the exchange rates table", []),
+    "ddb-load": ("dynamodb:load_items_from_csv_to_table", "load a CSV export (or Parquet dataset)", [
+        _TABLE, _arg("csv_file_path"), _arg("--bulk", action="store_true"), _MAX_WORKERS,
+        _arg("--update-rollups", action="store_true")]),
+    "ddb-add": ("dynamodb:add_item", "add one rate", [
+        _TABLE, _arg("currency"), _arg("rate"), _arg("exchange_date", help="dd.mm.yyyy")]),
+    "ddb-edit": ("dynamodb:edit_item", "change one rate", [
+        _TABLE, _arg("currency"), _arg("old_rate"), _arg("new_rate"), _arg("--new-exchange-date")]),
+    "ddb-delete": ("dynamodb:delete_item", "delete one rate", [_TABLE, _arg("currency"), _arg("rate")]),
+    "ddb-query": ("dynamodb:query_items", "query rates by currency and/or date", [
+        _TABLE, _arg("--currency"), _arg("--exchange-date"), _arg("--total-segments", type=int),
+        _arg("--use-cache", action="store_true")]),
+    "ddb-stats": ("dynamodb:query_rate_stats", "mean/min/max/last rates from the rollups", [
+        _arg("--currencies", type=_list), _arg("--level", choices=["day", "month", "year"]),
+        _arg("--start"), _arg("--end")]),
+    "ddb-search": ("dynamodb:search_items", "print the EUR rates", []),
+    "ddb-export": ("dynamodb_export:export_table_to_s3", "export a table to S3 as compressed CSV chunks", [
+        _TABLE, _BUCKET, _arg("prefix"), _arg("--compression", type=lambda value: None if value == "none" else value),
+        _arg("--total-segments", type=int), _arg("--max-uploads", type=int)]),
+    "ddb-sync": ("delta_sync:sync_s3_csv_to_dynamodb", "apply a CSV object's changed rows to a table", [
+        _BUCKET, _arg("object_name"), _TABLE, _arg("--manifest-key"), _MAX_WORKERS,
+        _arg("--force", action="store_true")]),
+    "history-create": ("rate_history:create_rate_history_table", "create the rate history table", []),
+    "history-load": ("rate_history:load_history_from_csv", "load a CSV export into the history table", [
+        _arg("csv_file_path"), _MAX_WORKERS]),
+    "history-migrate": ("rate_history:migrate_to_history_table", "copy the rates table into the history table", [
+        _arg("--source-table"), _arg("--target-table"), _arg("--total-segments", type=int), _MAX_WORKERS]),
+    "history-range": ("rate_history:query_range", "a currency's rates between two dates", [
+        _arg("currency"), _arg("start"), _arg("end")]),
+    "history-date": ("rate_history:query_date", "every currency's rate on one date", [_arg("date")]),
+
+    # NBU exchange rates
+    "rate": ("ec2_s3:get_uah_exchange_rate", "one currency's UAH rate on one date", [
+        _arg("date_str", help="YYYYMMDD"), _arg("currency_code"),
+        _arg("--no-cache", dest="use_cache", action="store_false")]),
+    "rates": ("ec2_s3:get_uah_exchange_combined_rates", "UAH rates for dates x currencies", [
+        _arg("str_dates", type=_dates, help=_DATES_HELP), _CURRENCIES, *_FETCH,
+        _arg("--update-rollups", action="store_true")]),
+    "plot": ("ec2_s3:plot_uah_exchange_rates", "chart a year of rates (from the rollups without --csv-file)", [
+        _arg("specified_year", type=int), _arg("--csv-file", dest="csv_file", default=None),
+        _arg("--currencies", type=_list), _arg("--freq", choices=["daily", "monthly", "yearly"]),
+        _arg("--output-file")]),
+    "plot-current": ("ec2_s3:plot_uah_current_exchange_rate", "chart the latest rates of a CSV", [
+        _arg("csv_file")]),
+    "pipeline": ("pipeline:run_pipeline", "fetch, write, chart and upload rates as overlapping stages", [
+        _arg("str_dates", type=_dates, help=_DATES_HELP), _CURRENCIES, _BUCKET, _arg("--csv-name"),
+        _arg("--freq", choices=["daily", "monthly", "yearly"]), _arg("--batch-dates", type=int),
+        _arg("--queue-size", type=int), _arg("--output-dir"), _MAX_WORKERS, _arg("--rate-limit", type=float)]),
+    "backfill-start": ("backfill:start_backfill", "plan a distributed backfill", [
+        _BUCKET, _arg("job_id"), _arg("dates", type=_dates, help=_DATES_HELP), _CURRENCIES,
+        _arg("--shard-days", type=int)]),
+    "backfill-worker": ("backfill:run_worker", "process backfill shards until none are left", [
+        _BUCKET, _arg("job_id"), _arg("--worker-id"), _arg("--lease-seconds", type=int),
+        _arg("--max-attempts", type=int)]),
+    "backfill-merge": ("backfill:merge_backfill", "merge a finished backfill into one CSV", [
+        _BUCKET, _arg("job_id"), _arg("--output-key")]),
+}
+
+
+def inventory(states=None, instance_types=None, tags=None, refresh=False):
+    """Instance summaries from ec2_inventory, which returns an index object rather than a list."""
+    import ec2_inventory
+    return ec2_inventory.get_inventory(states, instance_types, tags, refresh=refresh).find()
+
+
+def resolve(command):
+    """Imports the module behind a subcommand and returns its function."""
+    module_name, function_name = COMMANDS[command][0].split(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="AWS boto3 snippets and NBU exchange rate tools.")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="collect API metrics, log them as JSON and write them to PATH in Prometheus format")
+    commands = parser.add_subparsers(dest="command", required=True, metavar="command")
+    for name, (_, help_text, arguments) in COMMANDS.items():
+        # Options left out are not passed at all, so the target's defaults apply
+        sub = commands.add_parser(name, help=help_text, argument_default=argparse.SUPPRESS)
+        for flags, kwargs in arguments:
+            sub.add_argument(*flags, **kwargs)
+    return parser
+
+
+def main(argv=None):
+    args = vars(build_parser().parse_args(argv))
+    command, metrics_path = args.pop("command"), args.pop("metrics")
+    function = resolve(command)
+
+    if metrics_path:
+        import logging
+        import instrumentation
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+        instrumentation.enable()
+    try:
+        result = function(**args)
+    finally:
+        if metrics_path:
+            instrumentation.log_metrics()
+            instrumentation.write_prometheus(metrics_path)
+
+    if result is not None:
+        print(json.dumps(result, indent=2, default=str))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+import os
+import pandas as pd
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import s3_transfer
+
+RATE_COLUMNS = ["Currency", "Rate", "Exchange Date"]
+PARTITION_COLUMNS = ["Year", "Currency"]
+DATE_FORMAT = "%d.%m.%Y"
+
+
+def is_columnar(source):
+    """Tells whether a path points at Parquet data (a .parquet file or a partitioned dataset directory)."""
+    return source.endswith(".parquet") or source.startswith("s3://") or os.path.isdir(source)
+
+
+def rates_to_frame(data):
+    """
+    Converts exchange rate records to a typed DataFrame.
+
+    Args:
+        data (list): Records with Currency, Rate and Exchange Date (dd.mm.yyyy) keys.
+
+    Returns:
+        DataFrame: Currency (str), Rate (float64), Exchange Date (datetime64) and Year (int16) columns.
+    """
+    df = pd.DataFrame.from_records(data, columns=RATE_COLUMNS)
+    df["Rate"] = df["Rate"].astype("float64")
+    df["Exchange Date"] = pd.to_datetime(df["Exchange Date"], format=DATE_FORMAT)
+    df["Year"] = df["Exchange Date"].dt.year.astype("int16")
+    return df
+
+
+def write_rates_dataset(data, dataset_dir, partition_cols=PARTITION_COLUMNS):
+    """
+    Writes exchange rate records as a Parquet dataset partitioned by year and currency.
+
+    Files land under dataset_dir/Year=2022/Currency=USD/..., so readers filtering on those
+    columns only open the matching partitions. Existing partitions that are rewritten are replaced.
+
+    Args:
+        data (list): Records with Currency, Rate and Exchange Date keys.
+        dataset_dir (str): Output directory.
+        partition_cols (list): Columns used as directory partitions.
+    """
+    df = rates_to_frame(data)
+    df.to_parquet(dataset_dir, engine="pyarrow", partition_cols=list(partition_cols), index=False,
+                  existing_data_behavior="delete_matching")
+
+
+def upload_rates_dataset_to_s3(dataset_dir, bucket_name, prefix, max_workers=s3_transfer.DEFAULT_SYNC_WORKERS):
+    """Uploads a partitioned dataset directory to s3://bucket_name/prefix, keeping the Year=/Currency= layout."""
+    prefix = prefix.rstrip("/") + "/"
+    return s3_transfer.sync_directory_to_s3(dataset_dir, bucket_name, prefix, max_workers=max_workers)
+
+
+def _partition_filter(years, currencies):
+    """Builds the dataset filter expression for the requested years and currencies, or None."""
+    expression = None
+    for column, values in (("Year", years), ("Currency", currencies)):
+        if values is not None:
+            condition = ds.field(column).isin([int(v) for v in values] if column == "Year" else list(values))
+            expression = condition if expression is None else expression & condition
+    return expression
+
+
+def _open_dataset(source):
+    """Opens a local or s3:// Parquet file or Hive-partitioned directory as a pyarrow dataset."""
+    filesystem, path = pafs.FileSystem.from_uri(source) if "://" in source else (None, source)
+    return ds.dataset(path, filesystem=filesystem, format="parquet", partitioning="hive")
+
+
+def read_rates(source, columns=None, years=None, currencies=None):
+    """
+    Reads exchange rates from a CSV file or a Parquet file/dataset (local or s3://).
+
+    Parquet sources are read natively with column pruning and partition pruning; CSV sources
+    are parsed and filtered after loading.
+
+    Args:
+        source (str): CSV path, .parquet file, dataset directory or s3://bucket/prefix.
+        columns (list): Columns to return. Defaults to Currency, Rate and Exchange Date.
+        years (list): Only return these years.
+        currencies (list): Only return these currencies.
+
+    Returns:
+        DataFrame: Typed rates with Exchange Date as datetime64 and Rate as float64.
+    """
+    columns = list(columns or RATE_COLUMNS)
+
+    if is_columnar(source):
+        df = _open_dataset(source).to_table(columns=columns, filter=_partition_filter(years, currencies)).to_pandas()
+        if "Currency" in df:
+            df["Currency"] = df["Currency"].astype(str)
+        return df
+
+    df = pd.read_csv(source)
+    df["Exchange Date"] = pd.to_datetime(df["Exchange Date"], format=DATE_FORMAT)
+    if years is not None:
+        df = df[df["Exchange Date"].dt.year.isin([int(year) for year in years])]
+    if currencies is not None:
+        df = df[df["Currency"].isin(list(currencies))]
+    if "Year" in columns:
+        df["Year"] = df["Exchange Date"].dt.year
+    return df[columns].reset_index(drop=True)
+
+
+def iter_rate_records(source, batch_size=1000):
+    """
+    Streams records from a Parquet source as CSV-shaped dictionaries (string Rate, dd.mm.yyyy dates).
+
+    Only one record batch is held in memory at a time.
+
+    Yields:
+        dict: Records with Currency, Rate and Exchange Date keys.
+    """
+    dataset = _open_dataset(source)
+    for batch in dataset.to_batches(columns=RATE_COLUMNS, batch_size=batch_size):
+        df = batch.to_pandas()
+        df["Exchange Date"] = df["Exchange Date"].dt.strftime(DATE_FORMAT)
+        df["Rate"] = df["Rate"].map(repr)
+        df["Currency"] = df["Currency"].astype(str)
+        yield from df.to_dict("records")
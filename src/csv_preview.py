@@ -0,0 +1,187 @@
+import codecs
+import csv
+import os
+import random
+from collections import deque
+from itertools import islice
+from aws_clients import get_client
+
+PREVIEW_MODES = ("all", "head", "tail", "sample", "page")
+DEFAULT_ROWS = 20
+DEFAULT_WIDTH_WINDOW = 100  # Rows inspected to size the columns
+DEFAULT_MAX_COLUMN_WIDTH = 40
+DEFAULT_CHUNK_SIZE = 1024 * 1024  # Bytes per read / ranged GET
+
+
+def _split_lines(text):
+    """Splits text into "\n"-terminated lines (newlines kept) and the unterminated rest."""
+    # Unlike str.splitlines, this leaves \x0b, \x0c, \x1c-\x1e, \x85 and \u2028/\u2029 inside quoted fields
+    # alone, and a "\r" cut off from its "\n" at a chunk boundary stays in the rest instead of ending a row
+    lines = text.split("\n")
+    remainder = lines.pop()
+    return [line + "\n" for line in lines], remainder
+
+
+def _iter_lines(read_range, size, chunk_size=DEFAULT_CHUNK_SIZE, encoding="utf-8"):
+    """Yields decoded lines (newlines kept) by reading a byte source in fixed-size ranges."""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    remainder = ""
+    for start in range(0, size, chunk_size):
+        lines, remainder = _split_lines(remainder + decoder.decode(read_range(start, min(start + chunk_size, size))))
+        yield from lines
+    remainder += decoder.decode(b"", final=True)
+    if remainder:
+        yield remainder
+
+
+def _tail_lines(read_range, size, count, chunk_size=DEFAULT_CHUNK_SIZE, encoding="utf-8", skip_header=False):
+    """
+    Returns the last `count` lines by reading backwards from the end, without scanning the whole source.
+
+    With skip_header, the first line is left out if the lines read reach back to the start of the source.
+    """
+    start, data = size, b""
+    while start > 0 and data.count(b"\n") <= count:
+        new_start = max(0, start - chunk_size)
+        data = read_range(new_start, start) + data
+        start = new_start
+    lines, remainder = _split_lines(data.decode(encoding, errors="replace"))
+    if remainder:
+        lines.append(remainder)
+    if start > 0 or skip_header:
+        lines = lines[1:]  # Past the start the first line is probably cut in half; at the start it is the header
+    return lines[-count:] if count else []
+
+
+def _select_rows(reader, mode, rows, page, seed):
+    """Applies a preview mode to a streaming csv reader positioned after the header row."""
+    if mode == "all":
+        return reader
+    if mode == "head":
+        return islice(reader, rows)
+    if mode == "page":
+        return islice(reader, (page - 1) * rows, page * rows)
+    if mode == "sample":
+        # Reservoir sampling keeps `rows` uniformly chosen rows in constant memory
+        rng = random.Random(seed)
+        reservoir = []
+        for index, row in enumerate(reader):
+            if index < rows:
+                reservoir.append(row)
+            else:
+                slot = rng.randint(0, index)
+                if slot < rows:
+                    reservoir[slot] = row
+        return reservoir
+    return deque(reader, maxlen=rows)  # tail
+
+
+def _fit(cell, width):
+    return cell if len(cell) <= width else cell[:max(width - 3, 0)] + "..."
+
+
+def _print_grid(headers, rows, width_window, max_column_width):
+    """Prints rows as a grid table, sizing columns from the header and the first `width_window` rows only."""
+    rows = iter(rows)
+    window = list(islice(rows, width_window))
+    widths = [len(header) for header in headers]
+    for row in window:
+        for index, cell in enumerate(row[:len(widths)]):
+            widths[index] = max(widths[index], len(cell))
+    widths = [min(width, max_column_width) for width in widths]
+
+    def line(char):
+        return "+" + "+".join(char * (width + 2) for width in widths) + "+"
+
+    def format_row(row):
+        cells = list(row[:len(widths)]) + [""] * (len(widths) - len(row))
+        return "| " + " | ".join(_fit(cell, width).ljust(width) for cell, width in zip(cells, widths)) + " |"
+
+    print(line("-"))
+    print(format_row(headers))
+    print(line("="))
+    for row in window:
+        print(format_row(row))
+        print(line("-"))
+    for row in rows:
+        print(format_row(row))
+        print(line("-"))
+
+
+def preview_csv(lines, mode="all", rows=DEFAULT_ROWS, page=1, seed=None, width_window=DEFAULT_WIDTH_WINDOW,
+                max_column_width=DEFAULT_MAX_COLUMN_WIDTH, tail_lines=None):
+    """
+    Prints a streaming preview of CSV text lines with a formatted header row.
+
+    Args:
+        lines (iterable): CSV lines, header first.
+        mode (str): 'all', 'head', 'tail', 'sample' (uniform random rows) or 'page'.
+        rows (int): Rows shown by head/tail/sample/page.
+        page (int): 1-based page number for 'page' mode.
+        seed (int): Random seed for 'sample' mode.
+        width_window (int): Rows used to compute column widths.
+        max_column_width (int): Longer cells are truncated.
+        tail_lines (list): Already fetched trailing lines without the header, used instead of scanning
+            for 'tail' mode.
+    """
+    if mode not in PREVIEW_MODES:
+        raise ValueError(f"Unknown preview mode '{mode}', expected one of {PREVIEW_MODES}")
+
+    reader = csv.reader(lines)
+    headers = next(reader, None)
+    if headers is None:
+        print("CSV file is empty.")
+        return
+    if mode == "tail" and tail_lines is not None:
+        selected = list(csv.reader(tail_lines))[-rows:]
+    else:
+        selected = _select_rows(reader, mode, rows, page, seed)
+    _print_grid(headers, selected, width_window, max_column_width)
+
+
+def display_csv_with_header(csv_file_path, mode="all", rows=DEFAULT_ROWS, page=1, seed=None):
+    """Reads a CSV file and displays it in the console with a formatted header row, streaming from disk."""
+    try:
+        with open(csv_file_path, "rb") as csvfile:
+            size = os.fstat(csvfile.fileno()).st_size
+
+            def read_range(start, end):
+                csvfile.seek(start)
+                return csvfile.read(end - start)
+
+            tail = _tail_lines(read_range, size, rows, skip_header=True) if mode == "tail" else None
+            preview_csv(_iter_lines(read_range, size), mode, rows, page, seed, tail_lines=tail)
+    except FileNotFoundError:
+        print(f"Error: File '{csv_file_path}' not found.")
+    except Exception as e:
+        print(f"An error occurred: {e}")
+
+
+def display_s3_csv_with_header(bucket_name, object_name, mode="head", rows=DEFAULT_ROWS, page=1, seed=None,
+                               chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Displays a CSV object straight from S3 using ranged GETs, without downloading the file first.
+
+    Head and page previews stop reading as soon as enough rows are shown; tail reads from the end.
+
+    Args:
+        bucket_name (str): Name of the S3 bucket.
+        object_name (str): S3 object name.
+        mode (str): 'all', 'head', 'tail', 'sample' or 'page'.
+        rows (int): Rows shown by head/tail/sample/page.
+        page (int): 1-based page number for 'page' mode.
+        seed (int): Random seed for 'sample' mode.
+        chunk_size (int): Bytes fetched per ranged GET.
+    """
+    try:
+        s3_client = get_client("s3")
+        size = s3_client.head_object(Bucket=bucket_name, Key=object_name)["ContentLength"]
+
+        def read_range(start, end):
+            response = s3_client.get_object(Bucket=bucket_name, Key=object_name, Range=f"bytes={start}-{end - 1}")
+            return response["Body"].read()
+
+        tail = _tail_lines(read_range, size, rows, chunk_size, skip_header=True) if mode == "tail" else None
+        preview_csv(_iter_lines(read_range, size, chunk_size), mode, rows, page, seed, tail_lines=tail)
+    except Exception as e:
+        print(f"Error previewing s3://{bucket_name}/{object_name}: {e}")
@@ -0,0 +1,116 @@
+import codecs
+import csv
+import gzip
+import hashlib
+import json
+from aws_clients import get_client
+import dynamodb
+
+MANIFEST_SUFFIX = ".manifest.json.gz"
+
+
+def row_hash(row):
+    """Stable hash of every column of a CSV row, used to detect changed items."""
+    payload = json.dumps(row, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha1(payload).hexdigest()
+
+
+def load_manifest(bucket_name, manifest_key):
+    """
+    Reads a sync manifest from S3.
+
+    Returns:
+        dict: {'etag': str or None, 'rows': {primary key JSON: row hash}}; empty if none was stored yet.
+    """
+    s3_client = get_client("s3")
+    try:
+        body = s3_client.get_object(Bucket=bucket_name, Key=manifest_key)["Body"].read()
+    except s3_client.exceptions.NoSuchKey:
+        return {"etag": None, "rows": {}}
+    return json.loads(gzip.decompress(body))
+
+
+def save_manifest(bucket_name, manifest_key, manifest):
+    """Stores a sync manifest in S3 as gzip-compressed JSON."""
+    body = gzip.compress(json.dumps(manifest, separators=(",", ":")).encode("utf-8"))
+    get_client("s3").put_object(Bucket=bucket_name, Key=manifest_key, Body=body,
+                                ContentType="application/json", ContentEncoding="gzip")
+
+
+def _iter_s3_csv_rows(bucket_name, object_name):
+    """Streams CSV rows as dictionaries straight from the S3 object body."""
+    body = get_client("s3").get_object(Bucket=bucket_name, Key=object_name)["Body"]
+    lines = codecs.iterdecode(body.iter_lines(keepends=True), "utf-8")
+    yield from csv.DictReader(lines)
+
+
+def sync_s3_csv_to_dynamodb(bucket_name, object_name, table_name, manifest_key=None, max_workers=8, force=False):
+    """
+    Writes only the new or changed rows of an S3 CSV export to the DynamoDB table.
+
+    A manifest next to the export remembers the ETag of the last synced object and a hash of
+    every loaded row by primary key. An unchanged ETag skips the run without reading the CSV;
+    otherwise the CSV is streamed and only rows whose hash differs from the manifest are written.
+    Rows removed from the CSV are left in the table.
+
+    Args:
+        bucket_name (str): Name of the S3 bucket.
+        object_name (str): S3 key of the CSV export.
+        table_name (str): Name of the DynamoDB table.
+        manifest_key (str): S3 key of the manifest. Defaults to '<object_name>.manifest.json.gz'.
+        max_workers (int): Concurrent BatchWriteItem workers.
+        force (bool): Compare rows even if the ETag matches the manifest.
+
+    Returns:
+        dict: Rows scanned, rows written, unchanged and failed rows, and consumed WCU.
+    """
+    manifest_key = manifest_key or object_name + MANIFEST_SUFFIX
+    report = {"rows": 0, "written": 0, "unchanged": 0, "failed": 0, "consumed_wcu": 0.0}
+
+    try:
+        etag = get_client("s3").head_object(Bucket=bucket_name, Key=object_name)["ETag"]
+        manifest = load_manifest(bucket_name, manifest_key)
+        if manifest["etag"] == etag and not force:
+            print(f"s3://{bucket_name}/{object_name} unchanged since the last sync (ETag {etag}), nothing to write.")
+            return report
+
+        key_names = dynamodb.get_key_names(table_name)
+        known = manifest["rows"]
+        synced, changed = {}, {}
+
+        # Only the changed rows are held, but synced keeps a hash per key, so memory grows with the number of
+        # keys in the CSV (as the manifest does); a key repeated in the CSV keeps its last row, as put_item would
+        for row in _iter_s3_csv_rows(bucket_name, object_name):
+            report["rows"] += 1
+            key = json.dumps([row.get(name) for name in key_names])
+            synced[key] = row_hash(row)
+            if known.get(key) == synced[key]:
+                changed.pop(key, None)
+            else:
+                changed[key] = row
+        report["unchanged"] = len(synced) - len(changed)
+
+        stats = dynamodb.bulk_put_items(table_name, changed.values(), max_workers=max_workers, key_names=key_names)
+        report["written"] = stats["rows"]
+        report["failed"] = stats["failed_rows"]
+        report["consumed_wcu"] = stats["consumed_wcu"]
+
+        # Failed rows keep their previous manifest state, so the next run retries them
+        for failed_key in stats["failed_keys"]:
+            key = json.dumps(list(failed_key))
+            if key in known:
+                synced[key] = known[key]
+            else:
+                synced.pop(key, None)
+        save_manifest(bucket_name, manifest_key,
+                      {"etag": None if stats["failed_rows"] else etag, "rows": {**known, **synced}})
+
+        print(f"Synced s3://{bucket_name}/{object_name} to '{table_name}': {report['written']} written, "
+              f"{report['unchanged']} unchanged, {report['failed']} failed, {report['consumed_wcu']} WCU consumed.")
+    except Exception as e:
+        print(f"Error syncing s3://{bucket_name}/{object_name} to DynamoDB: {e}")
+    return report
+
+
+if __name__ == "__main__":
+    sync_s3_csv_to_dynamodb("bucket-s3", "exchange_rates.csv", "boto3_sdk_exchange_rates")
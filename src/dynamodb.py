@@ -1,12 +1,26 @@
-import boto3
 import csv
-from tabulate import tabulate
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+from aws_clients import get_client, get_resource
+from csv_preview import display_csv_with_header
+import query_cache
+import rollups
+
+BATCH_WRITE_LIMIT = 25  # BatchWriteItem accepts at most 25 put/delete requests
+TRANSACT_WRITE_LIMIT = 100  # TransactWriteItems accepts at most 100 actions
+
+_serializer = None  # boto3 TypeSerializer, created on first use
 
 
 def create_dynamodb_table():
     """Creates a DynamoDB table with the specified schema."""
 
-    dynamodb = boto3.resource('dynamodb')
+    dynamodb = get_resource('dynamodb')
 
     table = dynamodb.create_table(
         TableName='boto3_sdk_exchange_rates',
@@ -68,102 +82,463 @@ def create_dynamodb_table():
     print(f"Table {table.table_name} created successfully.")
 
 
-def display_csv_with_header(csv_file_path):
-    """Reads a CSV file and displays it in the console with a formatted header row."""
+def iter_source_rows(source_path):
+    """Streams row dictionaries from a CSV file, or from a Parquet file/dataset shaped like the CSV export."""
+    if source_path.endswith('.csv') or os.path.isfile(source_path) and not source_path.endswith('.parquet'):
+        with open(source_path, 'r', newline='', encoding='utf-8') as csvfile:
+            yield from csv.DictReader(csvfile)
+    else:
+        import columnar  # pandas/pyarrow are only needed for Parquet sources
+        yield from columnar.iter_rate_records(source_path)
+
+
+def _batch_rows(rows, key_names, batch_size=BATCH_WRITE_LIMIT):
+    """Groups streamed row dictionaries into BatchWriteItem-sized batches without materializing the input.
+
+    Rows repeating a primary key inside one batch are collapsed (last row wins), because
+    BatchWriteItem rejects duplicate keys in a single request while put_item simply overwrites.
+    """
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, batch_size))
+        if not chunk:
+            return
+        batch = {tuple(row.get(name) for name in key_names): row for row in chunk}
+        yield list(batch.values())
+
+
+def _write_batch(table_name, items, max_retries=8, base_delay=0.05):
+    """
+    Writes up to 25 items with BatchWriteItem, retrying UnprocessedItems with jittered exponential backoff.
+
+    Returns:
+        tuple: The number of items written and the consumed write capacity units.
+    """
+    dynamodb = get_resource('dynamodb')
+    request_items = {table_name: [{'PutRequest': {'Item': item}} for item in items]}
+    consumed_wcu = 0.0
+
+    for attempt in range(max_retries + 1):
+        response = dynamodb.batch_write_item(RequestItems=request_items, ReturnConsumedCapacity='TOTAL')
+        consumed_wcu += sum(c.get('CapacityUnits', 0) for c in response.get('ConsumedCapacity', []))
+        request_items = response.get('UnprocessedItems') or {}
+        if not request_items:
+            return len(items), consumed_wcu
+        time.sleep(min(base_delay * 2 ** attempt, 5.0) * random.uniform(0.5, 1.0))
+
+    unprocessed = len(request_items.get(table_name, []))
+    raise RuntimeError(f"{unprocessed} items still unprocessed after {max_retries} retries")
+
+
+def get_key_names(table_name):
+    """Returns the table's primary key attribute names, partition key first."""
+    return [key['AttributeName'] for key in get_resource('dynamodb').Table(table_name).key_schema]
+
+
+def bulk_put_items(table_name, items, max_workers=8, max_retries=8, key_names=None):
+    """
+    Writes an iterable of items with 25-item BatchWriteItem calls spread over a worker pool.
+
+    Only a bounded number of batches is in flight, so arbitrarily long generators stream through
+    with flat memory.
+
+    Args:
+        table_name (str): Name of the DynamoDB table.
+        items (iterable): Item dictionaries.
+        max_workers (int): Number of concurrent BatchWriteItem workers.
+        max_retries (int): Retries for UnprocessedItems before a batch is reported as failed.
+        key_names (list): Primary key attribute names. Looked up from the table if not given.
+
+    Returns:
+        dict: Rows written, failed rows, failed primary keys, elapsed seconds, rows per second and consumed WCU.
+    """
+    key_names = key_names or get_key_names(table_name)
+    stats = {'rows': 0, 'failed_rows': 0, 'failed_keys': [], 'consumed_wcu': 0.0}
+    pending = {}  # In-flight batch future -> batch items
+
+    def collect(future):
+        batch = pending.pop(future)
+        try:
+            count, wcu = future.result()
+            stats['rows'] += count
+            stats['consumed_wcu'] += wcu
+        except Exception as e:
+            print(f"Error writing batch of {len(batch)} items: {e}")
+            stats['failed_rows'] += len(batch)
+            stats['failed_keys'].extend(tuple(item.get(name) for name in key_names) for item in batch)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for batch in _batch_rows(items, key_names):
+            if len(pending) >= max_workers * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future)
+            pending[executor.submit(_write_batch, table_name, batch, max_retries)] = batch
+        for future in list(pending):
+            collect(future)
+
+    query_cache.get_default_cache().invalidate(table_name)
+    elapsed = time.perf_counter() - start
+    stats['seconds'] = round(elapsed, 3)
+    stats['rows_per_sec'] = round(stats['rows'] / elapsed, 1) if elapsed else 0.0
+    return stats
+
+
+def bulk_load_items_from_csv_to_table(table_name, csv_file_path, max_workers=8, max_retries=8, update_rollups=False):
+    """
+    Streams a CSV file into the DynamoDB table with 25-item BatchWriteItem calls spread over a worker pool.
+
+    Args:
+        table_name (str): Name of the DynamoDB table.
+        csv_file_path (str): Path to the CSV file, or a Parquet file/dataset written by json_to_parquet.
+        max_workers (int): Number of concurrent BatchWriteItem workers.
+        max_retries (int): Retries for UnprocessedItems before a batch is reported as failed.
+        update_rollups (bool): Fold the loaded rates into the rollup store with a second streaming pass
+            over the file once the load is done. Not included in the reported timings.
+
+    Returns:
+        dict: Rows written, failed rows, elapsed seconds, rows per second and consumed WCU.
+    """
+    stats = bulk_put_items(table_name, iter_source_rows(csv_file_path), max_workers, max_retries)
+    if update_rollups:
+        _update_rollups(csv_file_path, stats['failed_keys'],
+                        get_key_names(table_name) if stats['failed_keys'] else None)
+    print(f"Loaded {stats['rows']} items ({stats['failed_rows']} failed) from {csv_file_path} to DynamoDB table "
+          f"'{table_name}' in {stats['seconds']}s: {stats['rows_per_sec']} rows/sec, "
+          f"{stats['consumed_wcu']} WCU consumed.")
+    return stats
+
+
+def _update_rollups(source_path, failed_keys=(), key_names=None):
+    """Folds a loaded file into the rate rollups in a second streaming pass, leaving out rows that failed to load."""
+    failed = set(failed_keys)
+    rows = iter_source_rows(source_path)
+    if failed:
+        rows = (row for row in rows if tuple(row.get(name) for name in key_names) not in failed)
     try:
-        with open(csv_file_path, 'r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.reader(csvfile)
-            data = list(reader)  # Read all rows into a list
-            if data:
-                headers = data[0]  # First row is the header
-                rows = data[1:]  # Remaining rows are data
-                print(tabulate(rows, headers=headers, tablefmt="grid"))  # Use tabulate for formatted output
-            else:
-                print("CSV file is empty.")
-    except FileNotFoundError:
-        print(f"Error: File '{csv_file_path}' not found.")
+        rollups.get_default_store().add_rates(rows)
     except Exception as e:
-        print(f"An error occurred: {e}")
+        print(f"Error updating rate rollups: {e}")
 
 
-def load_items_from_csv_to_table(table_name, csv_file_path):
-    """Loads items from a CSV file into the DynamoDB table."""
+def load_items_from_csv_to_table(table_name, csv_file_path, bulk=False, max_workers=8, update_rollups=False):
+    """
+    Loads items from a CSV file into the DynamoDB table, optionally through the batched bulk path.
+
+    With update_rollups the loaded rates are also folded into the rollup store (see rollups.py).
+    """
+    if bulk:
+        return bulk_load_items_from_csv_to_table(table_name, csv_file_path, max_workers=max_workers,
+                                                 update_rollups=update_rollups)
+
     display_csv_with_header(csv_file_path)
     print()
-    dynamodb = boto3.resource('dynamodb')
+    dynamodb = get_resource('dynamodb')
     table = dynamodb.Table(table_name)
 
     with open(csv_file_path, 'r') as csvfile:
         reader = csv.DictReader(csvfile)
         for row in reader:
             table.put_item(Item=row)
+    query_cache.get_default_cache().invalidate(table_name)
+    if update_rollups:
+        _update_rollups(csv_file_path)
     print(f"Items loaded from {csv_file_path} to DynamoDB table '{table_name}'.")
 
 
 def add_item(table_name, currency, rate, exchange_date):
     """Adds a new item to the DynamoDB table."""
-    dynamodb = boto3.resource('dynamodb')
+    dynamodb = get_resource('dynamodb')
     table = dynamodb.Table(table_name)
     table.put_item(Item={'Currency': currency, 'Rate': rate, 'ExchangeDate': exchange_date})
+    # put_item may overwrite an item with another date, so entries for every date of the currency go
+    query_cache.get_default_cache().invalidate(table_name, currency)
     print(f"Item added: Currency={currency}, Rate={rate}, ExchangeDate={exchange_date}")
 
 
-def edit_item(table_name, currency, old_rate, new_rate, new_exchange_date=None):
-    dynamodb = boto3.resource('dynamodb')
-    table = dynamodb.Table(table_name)
+def _serialize(item):
+    global _serializer
+    if _serializer is None:
+        from boto3.dynamodb.types import TypeSerializer
+        _serializer = TypeSerializer()
+    return {name: _serializer.serialize(value) for name, value in item.items()}
+
 
-    # Delete the old item
-    table.delete_item(Key={'Currency': currency, 'Rate': old_rate})
+def _edit_actions(table_name, currency, old_rate, new_rate, new_exchange_date=None):
+    """Builds the TransactWriteItems actions for one edit; the old item must exist for the edit to apply."""
+    old_key = _serialize({'Currency': currency, 'Rate': old_rate})
+    if new_rate == old_rate:
+        if not new_exchange_date:
+            return [{'ConditionCheck': {'TableName': table_name, 'Key': old_key,
+                                        'ConditionExpression': 'attribute_exists(Currency)'}}]
+        return [{'Update': {'TableName': table_name, 'Key': old_key,
+                            'UpdateExpression': 'SET ExchangeDate = :ed',
+                            'ConditionExpression': 'attribute_exists(Currency)',
+                            'ExpressionAttributeValues': _serialize({':ed': new_exchange_date})}}]
 
-    # Create a new item with the updated rate
     new_item = {'Currency': currency, 'Rate': new_rate}
     if new_exchange_date:
         new_item['ExchangeDate'] = new_exchange_date
-    table.put_item(Item=new_item)
+    return [
+        {'Delete': {'TableName': table_name, 'Key': old_key, 'ConditionExpression': 'attribute_exists(Currency)'}},
+        {'Put': {'TableName': table_name, 'Item': _serialize(new_item)}},
+    ]
+
+
+def _edit_keys(edit):
+    """Primary keys touched by an edit; one transaction may not touch the same item twice."""
+    currency, old_rate, new_rate = edit[:3]
+    return {(currency, old_rate), (currency, new_rate)}
+
+
+def _run_edit_transaction(table_name, edits, max_retries=5):
+    """
+    Applies a group of edits in one TransactWriteItems call.
 
-    print(f"Item updated: Currency={currency}, Rate={new_rate}, ExchangeDate={new_exchange_date}")
+    Edits whose condition fails are reported and dropped, and the rest of the group is retried,
+    so one stale edit does not block the others. Transaction conflicts with concurrent writers
+    are retried with backoff.
+
+    Returns:
+        tuple: Applied edits and a list of (edit, reason code, message) for rejected edits.
+    """
+    client = get_client('dynamodb')
+    edits = list(edits)
+    rejected = []
+    attempt = 0
+
+    while edits:
+        actions, owners = [], []
+        for index, edit in enumerate(edits):
+            edit_actions = _edit_actions(table_name, *edit)
+            actions.extend(edit_actions)
+            owners.extend([index] * len(edit_actions))
+        try:
+            client.transact_write_items(TransactItems=actions)
+            return edits, rejected
+        except client.exceptions.TransactionCanceledException as e:
+            reasons = e.response.get('CancellationReasons', [])
+            failed = {}
+            for owner, reason in zip(owners, reasons):
+                if reason.get('Code') not in (None, 'None', 'TransactionConflict'):
+                    failed.setdefault(owner, (reason.get('Code'), reason.get('Message', '')))
+            if not failed:
+                # Only conflicts with concurrent transactions: back off and retry the same group
+                attempt += 1
+                if attempt > max_retries:
+                    rejected.extend((edit, 'TransactionConflict', str(e)) for edit in edits)
+                    return [], rejected
+                time.sleep(min(0.05 * 2 ** attempt, 2.0) * random.uniform(0.5, 1.0))
+                continue
+            rejected.extend((edits[owner], code, message) for owner, (code, message) in failed.items())
+            edits = [edit for index, edit in enumerate(edits) if index not in failed]
+    return [], rejected
+
+
+def edit_item(table_name, currency, old_rate, new_rate, new_exchange_date=None):
+    """Changes an item's rate (its sort key) atomically: the delete and put commit in one transaction."""
+    applied, rejected = _run_edit_transaction(table_name, [(currency, old_rate, new_rate, new_exchange_date)])
+    query_cache.get_default_cache().invalidate(table_name, currency)
+    if applied:
+        print(f"Item updated: Currency={currency}, Rate={new_rate}, ExchangeDate={new_exchange_date}")
+    for _, code, message in rejected:
+        print(f"Error updating item Currency={currency}, Rate={old_rate}: {code} {message}")
+    return bool(applied)
+
+
+def edit_items(table_name, edits, max_workers=8):
+    """
+    Applies many rate corrections as concurrent transactions of up to 100 actions each.
+
+    Edits touching a key already used earlier in the current wave start a new wave; waves run
+    one after another so chained corrections (A -> B, then B -> C) keep their order.
+
+    Args:
+        table_name (str): Name of the DynamoDB table.
+        edits (iterable): (currency, old_rate, new_rate[, new_exchange_date]) tuples.
+        max_workers (int): Transactions sent concurrently.
+
+    Returns:
+        dict: Number of applied edits and a list of (edit, reason code, message) conflicts.
+    """
+    waves, group, group_actions, wave_keys = [[]], [], 0, set()
+    for edit in edits:
+        edit = tuple(edit) + (None,) * (4 - len(edit))
+        keys = _edit_keys(edit)
+        size = len(_edit_actions(table_name, *edit))
+        if keys & wave_keys:
+            # The key was already touched in this wave: close it so the edits apply in order
+            if group:
+                waves[-1].append(group)
+            waves.append([])
+            group, group_actions, wave_keys = [], 0, set()
+        elif group_actions + size > TRANSACT_WRITE_LIMIT:
+            waves[-1].append(group)
+            group, group_actions = [], 0
+        group.append(edit)
+        group_actions += size
+        wave_keys |= keys
+    if group:
+        waves[-1].append(group)
+
+    report = {'applied': 0, 'conflicts': []}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for wave in waves:
+            for applied, rejected in executor.map(lambda g: _run_edit_transaction(table_name, g), wave):
+                report['applied'] += len(applied)
+                report['conflicts'].extend(rejected)
+                for currency in {edit[0] for edit in applied}:
+                    query_cache.get_default_cache().invalidate(table_name, currency)
+
+    for edit, code, message in report['conflicts']:
+        print(f"Edit {edit} rejected: {code} {message}")
+    print(f"Applied {report['applied']} edits to '{table_name}', {len(report['conflicts'])} rejected.")
+    return report
 
 
 def delete_item(table_name, currency, rate):
     """Deletes an item from the DynamoDB table."""
-    dynamodb = boto3.resource('dynamodb')
+    dynamodb = get_resource('dynamodb')
     table = dynamodb.Table(table_name)
 
     table.delete_item(Key={'Currency': currency, 'Rate': rate})
+    query_cache.get_default_cache().invalidate(table_name, currency)
     print(f"Item deleted: Currency={currency}, Rate={rate}")
 
 
-def query_items(table_name, currency=None, exchange_date=None):
-    """Queries items from the DynamoDB table."""
-    dynamodb = boto3.resource('dynamodb')
-    table = dynamodb.Table(table_name)
+def paginate(operation, **kwargs):
+    """Calls a Table query/scan operation repeatedly, following LastEvaluatedKey and yielding each page's items."""
+    while True:
+        response = operation(**kwargs)
+        yield from response.get('Items', [])
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            return
+        kwargs['ExclusiveStartKey'] = last_key
 
-    if currency and exchange_date:
-        response = table.query(
-            IndexName='ExchangeDateIndex',
-            KeyConditionExpression='ExchangeDate = :ed and Currency = :c',
-            ExpressionAttributeValues={':ed': exchange_date, ':c': currency}
-        )
 
+def _scan_segment(table_name, segment, total_segments, pages, stop, scan_kwargs):
+    """Scans one segment of the table in a worker thread, handing each page to the consumer queue."""
+    try:
+        table = get_resource('dynamodb').Table(table_name)
+        kwargs = dict(scan_kwargs, Segment=segment, TotalSegments=total_segments)
+        while not stop.is_set():
+            response = table.scan(**kwargs)
+            pages.put(response.get('Items', []))
+            kwargs['ExclusiveStartKey'] = response.get('LastEvaluatedKey')
+            if not kwargs['ExclusiveStartKey']:
+                break
+    except Exception as e:
+        pages.put(e)
+    finally:
+        pages.put(None)  # Segment finished marker
+
+
+def parallel_scan(table_name, total_segments=4, **scan_kwargs):
+    """
+    Scans the whole table with parallel Segment/TotalSegments workers and yields items as pages arrive.
+
+    Args:
+        table_name (str): Name of the DynamoDB table.
+        total_segments (int): Number of segments, each scanned by its own thread.
+        **scan_kwargs: Extra Table.scan arguments (e.g. FilterExpression, ProjectionExpression).
+
+    Yields:
+        dict: Table items in no particular order.
+    """
+    # A small bounded queue keeps memory flat: scanners block until the consumer catches up
+    pages = queue.Queue(maxsize=total_segments * 2)
+    stop = threading.Event()
+    workers = [threading.Thread(target=_scan_segment, daemon=True,
+                                args=(table_name, segment, total_segments, pages, stop, scan_kwargs))
+               for segment in range(total_segments)]
+    for worker in workers:
+        worker.start()
+
+    try:
+        running = total_segments
+        while running:
+            page = pages.get()
+            if page is None:
+                running -= 1
+            elif isinstance(page, Exception):
+                raise page
+            else:
+                yield from page
+    finally:
+        stop.set()
+        # Drain so producers blocked on a full queue can observe the stop flag and exit
+        while any(worker.is_alive() for worker in workers):
+            try:
+                pages.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+
+def iter_query_items(table_name, currency=None, exchange_date=None, total_segments=4):
+    """
+    Streams items from the DynamoDB table, following LastEvaluatedKey across all result pages.
+
+    Args:
+        table_name (str): Name of the DynamoDB table.
+        currency (str): Partition key value to query by.
+        exchange_date (str): ExchangeDateIndex key value to query by.
+        total_segments (int): Parallel scan segments used when neither key is given.
+
+    Yields:
+        dict: Matching table items.
+    """
+    if not currency and not exchange_date:
+        yield from parallel_scan(table_name, total_segments=total_segments)
+        return
+
+    table = get_resource('dynamodb').Table(table_name)
+
+    if currency and exchange_date:
+        kwargs = dict(IndexName='ExchangeDateIndex',
+                      KeyConditionExpression='ExchangeDate = :ed and Currency = :c',
+                      ExpressionAttributeValues={':ed': exchange_date, ':c': currency})
     elif currency:
-        response = table.query(
-            KeyConditionExpression='Currency = :c',
-            ExpressionAttributeValues={':c': currency}
-        )
-
-    elif exchange_date:
-        response = table.query(
-            IndexName='ExchangeDateIndex',
-            KeyConditionExpression='ExchangeDate = :ed',
-            ExpressionAttributeValues={':ed': exchange_date}
-        )
+        kwargs = dict(KeyConditionExpression='Currency = :c',
+                      ExpressionAttributeValues={':c': currency})
     else:
-        response = table.scan()
+        kwargs = dict(IndexName='ExchangeDateIndex',
+                      KeyConditionExpression='ExchangeDate = :ed',
+                      ExpressionAttributeValues={':ed': exchange_date})
+
+    yield from paginate(table.query, **kwargs)
+
+
+def query_items(table_name, currency=None, exchange_date=None, total_segments=4, use_cache=False):
+    """
+    Queries all items (every page) from the DynamoDB table.
 
-    items = response.get('Items', [])
+    With use_cache, results are served from the in-process query_cache (LRU with TTL), which
+    add_item, edit_item, edit_items, delete_item and the CSV loaders invalidate on write.
+    """
+    if not use_cache:
+        return list(iter_query_items(table_name, currency, exchange_date, total_segments))
+
+    cache = query_cache.get_default_cache()
+    key = cache.make_key(table_name, currency, exchange_date)
+    items = cache.get(key)
+    if items is None:
+        items = list(iter_query_items(table_name, currency, exchange_date, total_segments))
+        cache.put(key, items)
     return items
 
 
+def query_rate_stats(currencies=None, level='month', start=None, end=None):
+    """
+    Returns per-currency mean/min/max/last rates per day, month or year from the rollup store.
+
+    Reads one row per bucket instead of scanning the table; the rollups cover every rate loaded with
+    load_items_from_csv_to_table or fetched with get_uah_exchange_combined_rates with update_rollups=True.
+    """
+    return rollups.get_default_store().get_rollups(currencies, level, start, end)
+
+
 def search_items():
     response = query_items("boto3_sdk_exchange_rates", currency='EUR')
     print("EUR Rates:")
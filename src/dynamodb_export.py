@@ -0,0 +1,186 @@
+import csv
+import io
+import json
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from aws_clients import get_client
+import dynamodb
+
+EXPORT_FIELDS = ["Currency", "Rate", "Exchange Date"]
+COMPRESSIONS = {"gzip": ".gz", "zstd": ".zst", None: ""}
+CONTENT_TYPES = {"gzip": "application/gzip", "zstd": "application/zstd", None: "text/csv"}
+DEFAULT_CHUNK_BYTES = 256 * 1024 * 1024  # Compressed size at which a chunk file is closed
+DEFAULT_PART_BYTES = 8 * 1024 * 1024  # Multipart part size; S3 requires at least 5 MB for all but the last part
+FLUSH_CSV_BYTES = 64 * 1024  # Serialized rows handed to the compressor at a time
+
+
+def _compressor(compression, level=None):
+    """Returns a streaming compressor with compress()/flush(), or None for plain CSV."""
+    if compression == "gzip":
+        return zlib.compressobj(6 if level is None else level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    if compression == "zstd":
+        import zstandard  # Only needed for zstd exports
+        return zstandard.ZstdCompressor(level=3 if level is None else level).compressobj()
+    if compression is None:
+        return None
+    raise ValueError(f"Unsupported compression '{compression}', expected one of {list(COMPRESSIONS)}")
+
+
+class _MultipartChunk:
+    """One chunk file streamed to S3 as a multipart upload with a bounded number of parts in flight."""
+
+    def __init__(self, bucket_name, key, executor, max_in_flight, part_bytes, content_type="text/csv"):
+        self.s3_client = get_client("s3")
+        self.bucket_name = bucket_name
+        self.key = key
+        self.executor = executor
+        self.max_in_flight = max_in_flight
+        self.part_bytes = part_bytes
+        self.upload_id = self.s3_client.create_multipart_upload(Bucket=bucket_name, Key=key,
+                                                                ContentType=content_type)["UploadId"]
+        self.buffer = bytearray()
+        self.in_flight = set()
+        self.parts = []
+        self.size = 0
+
+    def write(self, data):
+        self.buffer += data
+        self.size += len(data)
+        while len(self.buffer) >= self.part_bytes:
+            part, self.buffer = bytes(self.buffer[:self.part_bytes]), self.buffer[self.part_bytes:]
+            self._submit(part)
+
+    def _submit(self, data):
+        # Waiting here is the backpressure that keeps memory at max_in_flight parts
+        while len(self.in_flight) >= self.max_in_flight:
+            done, self.in_flight = wait(self.in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                self.parts.append(future.result())
+        part_number = len(self.parts) + len(self.in_flight) + 1
+        self.in_flight.add(self.executor.submit(self._upload_part, part_number, data))
+
+    def _upload_part(self, part_number, data):
+        response = self.s3_client.upload_part(Bucket=self.bucket_name, Key=self.key, UploadId=self.upload_id,
+                                              PartNumber=part_number, Body=data)
+        return {"PartNumber": part_number, "ETag": response["ETag"]}
+
+    def close(self):
+        """Uploads the remaining bytes as the last part and completes the upload."""
+        if self.buffer or not (self.parts or self.in_flight):
+            self._submit(bytes(self.buffer))
+            self.buffer = bytearray()
+        for future in self.in_flight:
+            self.parts.append(future.result())
+        self.in_flight = set()
+        self.s3_client.complete_multipart_upload(
+            Bucket=self.bucket_name, Key=self.key, UploadId=self.upload_id,
+            MultipartUpload={"Parts": sorted(self.parts, key=lambda part: part["PartNumber"])})
+
+    def abort(self):
+        for future in self.in_flight:
+            future.cancel()
+        self.s3_client.abort_multipart_upload(Bucket=self.bucket_name, Key=self.key, UploadId=self.upload_id)
+
+
+def _export_row(item, fields):
+    """Row values for the CSV; items written by add_item spell the date attribute 'ExchangeDate'."""
+    if "Exchange Date" in fields and "Exchange Date" not in item:
+        item = dict(item, **{"Exchange Date": item.get("ExchangeDate", "")})
+    return [item.get(field, "") for field in fields]
+
+
+def export_table_to_s3(table_name, bucket_name, prefix, compression="gzip", chunk_bytes=DEFAULT_CHUNK_BYTES,
+                       part_bytes=DEFAULT_PART_BYTES, total_segments=4, max_uploads=4, fields=EXPORT_FIELDS,
+                       compression_level=None):
+    """
+    Exports a DynamoDB table to S3 as compressed, size-bounded CSV chunks, streaming end to end.
+
+    Items from a parallel scan are serialized and compressed on the fly into the current chunk, which is
+    sent as a multipart upload while it fills; once it reaches chunk_bytes (compressed, approximately)
+    the upload is completed and the next chunk starts. Only a few parts are buffered at any time, so
+    memory does not grow with the table. Every chunk has a header row and can be loaded on its own.
+    A manifest.json listing the chunks is written last.
+
+    Args:
+        table_name (str): Name of the DynamoDB table.
+        bucket_name (str): Target S3 bucket.
+        prefix (str): Key prefix; chunks are named '<prefix><table_name>-00000.csv.gz' and so on.
+        compression (str): 'gzip', 'zstd' (needs the zstandard package) or None.
+        chunk_bytes (int): Approximate compressed size of each chunk file.
+        part_bytes (int): Multipart part size, at least 5 MB.
+        total_segments (int): Parallel scan segments.
+        max_uploads (int): Parts uploaded concurrently (and buffered) per export.
+        fields (list): CSV columns. Defaults to the columns of the exchange rate CSV.
+        compression_level (int): Compressor level, defaults to gzip 6 / zstd 3.
+
+    Returns:
+        dict: Rows, chunk list (key, rows, bytes), compressed bytes, seconds, rows per second and MB/s.
+    """
+    _compressor(compression)  # Fail on unknown compressions before anything is uploaded
+    suffix = ".csv" + COMPRESSIONS[compression]
+    report = {"rows": 0, "chunks": [], "bytes": 0}
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max_uploads) as executor:
+        chunk = compressor = None
+        chunk_rows = 0
+        text = io.StringIO()
+        writer = csv.writer(text)
+
+        def flush_text():
+            data = text.getvalue().encode("utf-8")
+            text.seek(0)
+            text.truncate()
+            if data:
+                chunk.write(compressor.compress(data) if compressor else data)
+
+        def finish_chunk():
+            flush_text()
+            if compressor:
+                chunk.write(compressor.flush())
+            chunk.close()
+            report["chunks"].append({"key": chunk.key, "rows": chunk_rows, "bytes": chunk.size})
+            report["bytes"] += chunk.size
+
+        try:
+            for item in dynamodb.parallel_scan(table_name, total_segments=total_segments):
+                if chunk is None:
+                    key = f"{prefix}{table_name}-{len(report['chunks']):05d}{suffix}"
+                    chunk = _MultipartChunk(bucket_name, key, executor, max_uploads, part_bytes,
+                                            CONTENT_TYPES[compression])
+                    compressor = _compressor(compression, compression_level)
+                    chunk_rows = 0
+                    writer.writerow(fields)
+                writer.writerow(_export_row(item, fields))
+                chunk_rows += 1
+                report["rows"] += 1
+                if text.tell() >= FLUSH_CSV_BYTES:
+                    flush_text()
+                    if chunk.size >= chunk_bytes:
+                        finish_chunk()
+                        chunk = None
+            if chunk is not None:
+                finish_chunk()
+                chunk = None
+        except Exception:
+            if chunk is not None:
+                chunk.abort()
+            raise
+
+    manifest = {"table": table_name, "compression": compression, "fields": list(fields), **report}
+    get_client("s3").put_object(Bucket=bucket_name, Key=f"{prefix}manifest.json",
+                                Body=json.dumps(manifest, indent=2).encode("utf-8"), ContentType="application/json")
+
+    elapsed = time.perf_counter() - start
+    report["seconds"] = round(elapsed, 3)
+    report["rows_per_sec"] = round(report["rows"] / elapsed, 1) if elapsed else 0.0
+    report["mb_per_sec"] = round(report["bytes"] / (1024 * 1024) / elapsed, 2) if elapsed else 0.0
+    print(f"Exported {report['rows']} items from '{table_name}' to s3://{bucket_name}/{prefix} in "
+          f"{len(report['chunks'])} chunks ({report['bytes']} bytes) in {report['seconds']}s: "
+          f"{report['rows_per_sec']} rows/sec.")
+    return report
+
+
+if __name__ == "__main__":
+    export_table_to_s3("boto3_sdk_exchange_rates", "bucket-s3", "exports/exchange_rates/")
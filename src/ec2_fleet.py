@@ -0,0 +1,201 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from aws_clients import get_client
+import ec2_inventory
+
+REGION = "us-east-1"
+DEFAULT_IMAGE_ID = "ami-05b10e08d247fb927"
+DEFAULT_INSTANCE_TYPE = "t2.micro"
+DEFAULT_KEY_NAME = "ec2-key-pair"
+INSTANCE_IDS_PER_CALL = 1000  # Instance IDs sent in one Stop/Terminate/DescribeInstances request
+DEFAULT_LAUNCH_CHUNK = 100  # Instances requested per RunInstances call
+DEFAULT_MAX_WORKERS = 4
+FAILED_STATES = {"running": {"shutting-down", "terminated", "stopping", "stopped"},
+                 "stopped": {"shutting-down", "terminated"},
+                 "terminated": set()}
+
+
+def _chunks(items, size):
+    items = list(items)
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+def percentiles(values, points=(50, 90, 99)):
+    """Nearest-rank percentiles of a list of numbers, plus the maximum; empty input gives an empty dict."""
+    ordered = sorted(values)
+    if not ordered:
+        return {}
+    result = {f"p{point}": round(ordered[min(len(ordered) - 1, max(0, -(-point * len(ordered) // 100) - 1))], 2)
+              for point in points}
+    result["max"] = round(ordered[-1], 2)
+    return result
+
+
+def wait_for_state(instance_ids, target_state, poll_interval=5, timeout=900, max_workers=DEFAULT_MAX_WORKERS,
+                   region_name=REGION, started=None):
+    """
+    Waits for many instances to reach a state, polling them in bulk.
+
+    Each poll describes the still-pending instances with one paginated DescribeInstances call per
+    1,000 IDs, and the chunks are polled concurrently. Instances EC2 does not know about yet
+    (InvalidInstanceID.NotFound right after launch) are kept pending rather than failing the wait;
+    a chunk containing them is bisected, so k unknown IDs cost O(k log n) extra calls.
+
+    Args:
+        instance_ids (list): Instances to watch.
+        target_state (str): 'running', 'stopped' or 'terminated'.
+        poll_interval (float): Seconds between polls.
+        timeout (float): Seconds before giving up on the remaining instances.
+        max_workers (int): DescribeInstances chunks polled concurrently.
+        region_name (str): AWS region.
+        started (float): time.monotonic() at which the operation began. Defaults to now.
+
+    Returns:
+        dict: 'ready' maps instance ID to seconds until it reached the state; 'failed' maps IDs that
+        ended in an incompatible state (or never answered before the timeout) to their last state.
+    """
+    ec2_client = get_client("ec2", region_name=region_name)
+    started = started or time.monotonic()
+    pending = set(instance_ids)
+    ready, failed = {}, {}
+
+    def describe(chunk):
+        states = {}
+        try:
+            for page in ec2_client.get_paginator("describe_instances").paginate(InstanceIds=chunk):
+                for reservation in page["Reservations"]:
+                    for instance in reservation["Instances"]:
+                        states[instance["InstanceId"]] = instance["State"]["Name"]
+            return states
+        except ec2_client.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] != "InvalidInstanceID.NotFound":
+                raise
+        # EC2 is eventually consistent: IDs just returned by RunInstances may not be describable yet.
+        # One unknown ID fails the whole call, so the chunk is split in halves until the unknown IDs
+        # are isolated; they stay pending until they show up or the timeout is reached.
+        if len(chunk) > 1:
+            middle = len(chunk) // 2
+            states.update(describe(chunk[:middle]))
+            states.update(describe(chunk[middle:]))
+        return states
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending:
+            states = {}
+            for chunk_states in executor.map(describe, _chunks(sorted(pending), INSTANCE_IDS_PER_CALL)):
+                states.update(chunk_states)
+            elapsed = time.monotonic() - started
+            for instance_id, state in states.items():
+                if state == target_state:
+                    ready[instance_id] = elapsed
+                    pending.discard(instance_id)
+                elif state in FAILED_STATES.get(target_state, set()):
+                    failed[instance_id] = state
+                    pending.discard(instance_id)
+            if pending and elapsed + poll_interval > timeout:
+                failed.update({instance_id: states.get(instance_id, "unknown") for instance_id in pending})
+                break
+            if pending:
+                time.sleep(poll_interval)
+
+    return {"ready": ready, "failed": failed}
+
+
+def _report(action, result):
+    times = percentiles(result["ready"].values())
+    print(f"{action}: {len(result['ready'])} ready, {len(result['failed'])} failed, time-to-ready (s) {times}")
+    result["percentiles"] = times
+    return result
+
+
+def launch_fleet(count, image_id=DEFAULT_IMAGE_ID, instance_type=DEFAULT_INSTANCE_TYPE, key_name=DEFAULT_KEY_NAME,
+                 tags=None, launch_chunk=DEFAULT_LAUNCH_CHUNK, allow_partial=True, max_workers=DEFAULT_MAX_WORKERS,
+                 wait=True, region_name=REGION):
+    """
+    Launches a fleet with concurrent, batched RunInstances calls and optionally waits until it runs.
+
+    Each call asks for up to launch_chunk instances (MaxCount). With allow_partial, MinCount is 1,
+    so a capacity shortfall yields a smaller fleet instead of failing the whole chunk.
+
+    Args:
+        count (int): Number of instances to launch.
+        image_id (str): AMI ID.
+        instance_type (str): Instance type.
+        key_name (str): Key pair name.
+        tags (dict): Tags applied to every instance at launch.
+        launch_chunk (int): Instances requested per RunInstances call.
+        allow_partial (bool): Accept fewer instances than requested per call (MinCount=1).
+        max_workers (int): RunInstances calls (and later poll chunks) in flight.
+        wait (bool): Wait for 'running' and report time-to-ready percentiles.
+        region_name (str): AWS region.
+
+    Returns:
+        dict: 'instance_ids' plus, when waiting, 'ready', 'failed' and 'percentiles'.
+    """
+    ec2_client = get_client("ec2", region_name=region_name)
+    tag_specifications = [{"ResourceType": "instance",
+                           "Tags": [{"Key": key, "Value": value} for key, value in tags.items()]}] if tags else []
+    started = time.monotonic()
+
+    def launch(size):
+        response = ec2_client.run_instances(ImageId=image_id, MinCount=1 if allow_partial else size, MaxCount=size,
+                                            InstanceType=instance_type, KeyName=key_name,
+                                            TagSpecifications=tag_specifications)
+        return [instance["InstanceId"] for instance in response["Instances"]]
+
+    sizes = [min(launch_chunk, count - start) for start in range(0, count, launch_chunk)]
+    instance_ids = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(launch, size) for size in sizes]
+        for future in futures:
+            try:
+                instance_ids.extend(future.result())
+            except Exception as e:
+                print(f"Error running instances: {e}")
+    ec2_inventory.invalidate()
+    print(f"Launched {len(instance_ids)} of {count} instances")
+
+    result = {"instance_ids": instance_ids}
+    if wait and instance_ids:
+        result.update(wait_for_state(instance_ids, "running", max_workers=max_workers,
+                                     region_name=region_name, started=started))
+        _report("Launch", result)
+    return result
+
+
+def _change_fleet_state(operation, target_state, instance_ids, wait, max_workers, region_name):
+    ec2_client = get_client("ec2", region_name=region_name)
+    started = time.monotonic()
+    call = getattr(ec2_client, operation)
+
+    response_key = "StoppingInstances" if operation == "stop_instances" else "TerminatingInstances"
+
+    def change(chunk):
+        return [state_change["InstanceId"] for state_change in call(InstanceIds=chunk)[response_key]]
+
+    changed = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(change, chunk) for chunk in _chunks(instance_ids, INSTANCE_IDS_PER_CALL)]
+        for future in futures:
+            try:
+                changed.extend(future.result())
+            except Exception as e:
+                print(f"Error calling {operation}: {e}")
+    ec2_inventory.invalidate()
+
+    result = {"instance_ids": changed}
+    if wait and changed:
+        result.update(wait_for_state(changed, target_state, max_workers=max_workers,
+                                     region_name=region_name, started=started))
+        _report(operation, result)
+    return result
+
+
+def stop_fleet(instance_ids, wait=True, max_workers=DEFAULT_MAX_WORKERS, region_name=REGION):
+    """Stops many instances with StopInstances calls of up to 1,000 IDs and optionally waits for 'stopped'."""
+    return _change_fleet_state("stop_instances", "stopped", instance_ids, wait, max_workers, region_name)
+
+
+def terminate_fleet(instance_ids, wait=True, max_workers=DEFAULT_MAX_WORKERS, region_name=REGION):
+    """Terminates many instances with TerminateInstances calls of up to 1,000 IDs and optionally waits."""
+    return _change_fleet_state("terminate_instances", "terminated", instance_ids, wait, max_workers, region_name)
@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import defaultdict
+from aws_clients import get_client
+
+REGION = "us-east-1"
+DEFAULT_TTL = 15  # seconds a snapshot is reused
+
+_snapshots = {}  # (region, filters) -> (fetched_at, Inventory)
+_snapshots_lock = threading.Lock()
+
+
+def build_filters(states=None, instance_types=None, tags=None):
+    """Translates state/type/tag criteria into DescribeInstances server-side filters."""
+    filters = []
+    if states:
+        filters.append({"Name": "instance-state-name", "Values": list(states)})
+    if instance_types:
+        filters.append({"Name": "instance-type", "Values": list(instance_types)})
+    for key, value in (tags or {}).items():
+        filters.append({"Name": f"tag:{key}", "Values": list(value) if isinstance(value, (list, tuple)) else [value]})
+    return filters
+
+
+def _summarize(instance):
+    """Keeps the fields orchestration needs; IPs are None when not assigned (e.g. stopped instances)."""
+    return {
+        "InstanceId": instance["InstanceId"],
+        "InstanceType": instance["InstanceType"],
+        "State": instance["State"]["Name"],
+        "PublicIpAddress": instance.get("PublicIpAddress"),
+        "PrivateIpAddress": instance.get("PrivateIpAddress"),
+        "LaunchTime": instance.get("LaunchTime"),
+        "Tags": {tag["Key"]: tag["Value"] for tag in instance.get("Tags", [])},
+    }
+
+
+class Inventory:
+    """Snapshot of EC2 instances with in-memory indexes by state, type and tag."""
+
+    def __init__(self, instances):
+        self.instances = {instance["InstanceId"]: instance for instance in instances}
+        self.by_state = defaultdict(set)
+        self.by_type = defaultdict(set)
+        self.by_tag = defaultdict(set)
+        for instance_id, instance in self.instances.items():
+            self.by_state[instance["State"]].add(instance_id)
+            self.by_type[instance["InstanceType"]].add(instance_id)
+            for key, value in instance["Tags"].items():
+                self.by_tag[(key, value)].add(instance_id)
+
+    def ids(self, state=None, instance_type=None, tags=None):
+        """Returns sorted instance IDs matching every given criterion, answered from the indexes."""
+        matches = set(self.instances)
+        if state:
+            matches &= self.by_state.get(state, set())
+        if instance_type:
+            matches &= self.by_type.get(instance_type, set())
+        for key, value in (tags or {}).items():
+            matches &= self.by_tag.get((key, value), set())
+        return sorted(matches)
+
+    def find(self, state=None, instance_type=None, tags=None):
+        """Like ids(), but returns the instance summaries."""
+        return [self.instances[instance_id] for instance_id in self.ids(state, instance_type, tags)]
+
+    def __len__(self):
+        return len(self.instances)
+
+
+def get_inventory(states=None, instance_types=None, tags=None, ttl=DEFAULT_TTL, refresh=False, region_name=REGION):
+    """
+    Returns an indexed snapshot of the instances matching the criteria, cached for ttl seconds.
+
+    All criteria are pushed to DescribeInstances as filters and every result page is read.
+
+    Args:
+        states (list): Instance state names, e.g. ['running'].
+        instance_types (list): Instance types, e.g. ['t2.micro'].
+        tags (dict): Tag key to value (or list of values).
+        ttl (float): Seconds a cached snapshot for the same criteria is reused.
+        refresh (bool): Ignore the cached snapshot.
+        region_name (str): AWS region.
+    """
+    filters = build_filters(states, instance_types, tags)
+    key = (region_name, repr(filters))
+    with _snapshots_lock:
+        cached = _snapshots.get(key)
+        if cached and not refresh and time.monotonic() - cached[0] < ttl:
+            return cached[1]
+
+    instances = []
+    paginator = get_client("ec2", region_name=region_name).get_paginator("describe_instances")
+    for page in paginator.paginate(Filters=filters):
+        for reservation in page["Reservations"]:
+            instances.extend(_summarize(instance) for instance in reservation["Instances"])
+
+    inventory = Inventory(instances)
+    with _snapshots_lock:
+        _snapshots[key] = (time.monotonic(), inventory)
+    return inventory
+
+
+def invalidate():
+    """Drops every cached snapshot; call after launching or changing the state of instances."""
+    with _snapshots_lock:
+        _snapshots.clear()
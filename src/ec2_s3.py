@@ -1,40 +1,37 @@
-import requests
 import json
 import csv
-import boto3
 import os
-import pandas as pd
-import matplotlib.pyplot as plt
 from datetime import datetime
+import s3_transfer
+import nbu_fetcher
+import rate_cache
+import rollups
 
 
-def get_uah_exchange_rate(date_str, currency_code):
+def get_uah_exchange_rate(date_str, currency_code, use_cache=True):
     """
     Retrieves UAH exchange rate for a specific currency from the NBU API for a specific date.
 
     Args:
         date_str (str): The date in YYYYMMDD format.
         currency_code (str): The currency code (USD or EUR).
+        use_cache (bool): Serve the rate from the local rate cache when possible.
 
     Returns:
         JSON: A dictionary containing the exchange rate, or None if an error occurs.
     """
-    url = f"https://bank.gov.ua/NBUStatService/v1/statdirectory/exchange?valcode={currency_code}&date={date_str}&json"
+    cache = rate_cache.get_default_cache() if use_cache else None
+    cached = cache.get(date_str, currency_code) if cache else None
+    if cached:
+        return {currency_code: cached}
+
+    import requests
 
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-
-        if data:
-            return {
-                data[0]["cc"]: {
-                    "rate": data[0]["rate"],
-                    "exchangedate": data[0]["exchangedate"]
-                }
-            }
-        else:
-            return None
+        currency_rate = nbu_fetcher.fetch_exchange_rate(date_str, currency_code)
+        if cache and currency_rate:
+            cache.put(date_str, currency_code, currency_rate[currency_code])
+        return currency_rate
 
     except requests.exceptions.RequestException as e:
         print(f"Error fetching {currency_code} data: {e}")
@@ -44,18 +41,58 @@ def get_uah_exchange_rate(date_str, currency_code):
         return None
 
 
-def get_uah_exchange_combined_rates(str_dates, currency_codes):    
+def get_uah_exchange_combined_rates(str_dates, currency_codes, max_workers=nbu_fetcher.DEFAULT_MAX_WORKERS,
+                                    rate_limit=nbu_fetcher.DEFAULT_RATE_LIMIT, mode=None, use_cache=True,
+                                    update_rollups=False):
+    """
+    Retrieves UAH exchange rates for every (date, currency) pair with the fewest NBU requests.
+
+    Cached rates are reused; only the dates and currencies with missing or expired entries are fetched.
+
+    Args:
+        str_dates (list): Dates in YYYYMMDD format.
+        currency_codes (list): Currency codes, e.g. ["USD", "EUR"].
+        max_workers (int): Maximum number of NBU requests in flight.
+        rate_limit (float): Maximum NBU requests started per second.
+        mode (str): Force 'pair', 'date' or 'period' requests instead of the cheapest plan.
+        use_cache (bool): Read from and populate the local rate cache.
+        update_rollups (bool): Also fold the records into the rollup store (see rollups.py).
+
+    Returns:
+        list: Records with Currency, Rate and Exchange Date keys, ordered by date, then currency.
+    """
+    cache = rate_cache.get_default_cache() if use_cache else None
+    if cache:
+        grid, missing = cache.get_many(str_dates, currency_codes)
+    else:
+        grid, missing = {}, [(date, currency) for date in str_dates for currency in currency_codes]
+
+    if missing:
+        # Fetch the smallest date x currency sub-grid that covers every missing cell
+        missing_dates = list(dict.fromkeys(date for date, _ in missing))
+        missing_currencies = list(dict.fromkeys(currency for _, currency in missing))
+        fetched = nbu_fetcher.fetch_rate_grid(missing_dates, missing_currencies, mode=mode,
+                                              max_workers=max_workers, rate_limit=rate_limit)
+        if cache:
+            cache.put_many(fetched)
+        grid.update(fetched)
+
     combined_rates = []
     for date in str_dates:
         for currency in currency_codes:
-            currency_rate = get_uah_exchange_rate(date, currency)
+            currency_rate = grid.get((date, currency))
             if currency_rate:
                 # Append each record as a dictionary to the list
                 combined_rates.append({
                     "Currency": currency,
-                    "Rate": currency_rate[currency]["rate"],
-                    "Exchange Date": currency_rate[currency]["exchangedate"]
+                    "Rate": currency_rate["rate"],
+                    "Exchange Date": currency_rate["exchangedate"]
                 })
+    if update_rollups:
+        try:
+            rollups.get_default_store().add_rates(combined_rates)
+        except Exception as e:
+            print(f"Error updating rate rollups: {e}")
     return combined_rates
 
 
@@ -87,7 +124,35 @@ def json_to_csv(data, filename):
         print(f"Error writing to CSV: {e}")
 
 
-def upload_file_to_s3(bucket_name, file_path, object_name=None):
+def json_to_parquet(data, dirname, bucket_name=None, prefix=None):
+    """
+    Converts JSON exchange rate data to a Parquet dataset partitioned by year and currency.
+
+    Args:
+        data (list): The JSON data containing exchange rates.
+        dirname (str): The name of the dataset directory to create.
+        bucket_name (str): If given, the dataset is also uploaded to this S3 bucket.
+        prefix (str): S3 key prefix for the upload. If not specified, the directory name is used.
+    """
+    if not data:
+        print("No data to convert to Parquet.")
+        return
+
+    dataset_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), dirname)
+
+    try:
+        import columnar  # pandas/pyarrow are only loaded by the functions that need them
+        columnar.write_rates_dataset(data, dataset_dir)
+        print(f"Data written to {dataset_dir}")
+
+        if bucket_name:
+            columnar.upload_rates_dataset_to_s3(dataset_dir, bucket_name, prefix or dirname)
+
+    except Exception as e:
+        print(f"Error writing to Parquet: {e}")
+
+
+def upload_file_to_s3(bucket_name, file_path, object_name=None, config=None):
     """
     Upload a file to an S3 bucket.
 
@@ -95,80 +160,75 @@ def upload_file_to_s3(bucket_name, file_path, object_name=None):
         bucket_name (str): Name of the S3 bucket.
         file_path (str): Path to the file to upload.
         object_name (str): S3 object name. If not specified, the file name is used.
+        config (TransferConfig): Multipart/concurrency settings, see s3_transfer.make_transfer_config.
     """
 
     if object_name is None:
         object_name = os.path.basename(file_path)
 
     try:
-        s3_client = boto3.client('s3')
+        stats = s3_transfer.upload_file(bucket_name, file_path, object_name, config=config)
 
-        with open(file_path, "rb") as f:
-            s3_client.upload_fileobj(f, bucket_name, object_name)
-
-        print(f"File '{file_path}' uploaded to '{bucket_name}/{object_name}'")
+        print(f"File '{file_path}' uploaded to '{bucket_name}/{object_name}' ({stats['mb_per_sec']} MB/s)")
 
     except Exception as e:
         print(f"Error uploading file: {e}")
 
 
-def download_file_from_s3(bucket_name, object_name):
+def download_file_from_s3(bucket_name, object_name, config=None):
     """
     Downloads a file from an S3 bucket.
 
     Args:
         bucket_name (str): Name of the S3 bucket.
         object_name (str): S3 object name.
+        config (TransferConfig): Multipart/concurrency settings, see s3_transfer.make_transfer_config.
     """
 
     local_file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "s3_exchange_rates.csv")
 
     try:
-        s3_client = boto3.client('s3')
-
-        s3_client.download_file(bucket_name, object_name, local_file_path)
+        stats = s3_transfer.download_file(bucket_name, object_name, local_file_path, config=config)
 
-        print(f"File '{object_name}' downloaded from '{bucket_name}' to '{local_file_path}'")
+        print(f"File '{object_name}' downloaded from '{bucket_name}' to '{local_file_path}' "
+              f"({stats['mb_per_sec']} MB/s)")
 
     except Exception as e:
         print(f"Error downloading file: {e}")
 
 
-def plot_uah_exchange_rates(csv_file, specified_year):
-    """Plots UAH exchange rates against USD and EUR for specified year with exact values near markers."""
+def plot_uah_exchange_rates(csv_file, specified_year, currencies=('USD', 'EUR'), freq='monthly', output_file=None,
+                            use_rollups=False):
+    """
+    Plots UAH exchange rates against the given currencies for specified year with exact values near markers.
+
+    csv_file may also be a Parquet file or a partitioned dataset (local or s3://), in which case
+    only the specified year's partitions for those currencies are read. With use_rollups (or
+    csv_file=None) the averages come straight from the rollup store, one row per plotted point.
+    For many charts at once use plotting.render_charts, which renders them in a process pool.
+
+    Args:
+        csv_file (str): Rates source, or None to read the rollup store.
+        specified_year (int): Year to plot.
+        currencies (tuple): Currency codes to plot.
+        freq (str): 'daily', 'monthly' or 'yearly' averages.
+        output_file (str): Image path. Defaults to '<year>_uah_exchange_rates.png'.
+        use_rollups (bool): Read precomputed averages from the rollup store instead of csv_file.
+    """
+    output_file = output_file or f"{specified_year}_uah_exchange_rates.png"
 
     try:
-        df = pd.read_csv(csv_file)
-        df['Exchange Date'] = pd.to_datetime(df['Exchange Date'], format='%d.%m.%Y')
-        df_specified_year = df[df['Exchange Date'].dt.year == specified_year]
-        df_specified_year['Month'] = df_specified_year['Exchange Date'].dt.month
-        pivot_df = df_specified_year.pivot_table(index='Month', columns='Currency', values='Rate')
-
-        plt.figure(figsize=(12, 6))
-
-        # Plot USD
-        plt.plot(pivot_df.index, pivot_df['USD'], marker='o', label='USD/UAH')
-        for x, y in zip(pivot_df.index, pivot_df['USD']):
-            plt.text(x, y, f'{y:.2f}', ha='center', va='bottom')  # Display USD values
-
-        # Plot EUR
-        plt.plot(pivot_df.index, pivot_df['EUR'], marker='o', label='EUR/UAH')
-        for x, y in zip(pivot_df.index, pivot_df['EUR']):
-            plt.text(x, y, f'{y:.2f}', ha='center', va='top')  # Display EUR values
-
-        plt.title(f'UAH Exchange Rates ({specified_year})')
-        plt.xlabel('Month')
-        plt.ylabel('Exchange Rate')
-        plt.xticks(range(1, 13))
-        plt.legend()
-        plt.grid(False)
-        plt.tight_layout() # Adjust plot to fit labels
-        
-        #plt.show()
+        import columnar
+        import plotting
+        if use_rollups or csv_file is None:
+            pivot_df = rollups.get_default_store().pivot(list(currencies), f"{specified_year}-01-01",
+                                                         f"{specified_year}-12-31", freq=freq)
+        else:
+            df_specified_year = columnar.read_rates(csv_file, years=[specified_year], currencies=list(currencies))
+            pivot_df = plotting.aggregate_rates(df_specified_year, currencies, freq=freq)
 
-        plt.savefig("2022_uah_exchange_rates.png") # Save the figure
-        plt.close() # Close to prevent showing the plot
-        print("Plot saved to 2022_uah_exchange_rates.png")
+        plotting.render_chart(pivot_df, output_file, f'UAH Exchange Rates ({specified_year})')
+        print(f"Plot saved to {output_file}")
 
     except FileNotFoundError:
         print(f"Error: CSV file '{csv_file}' not found.")
@@ -179,11 +239,12 @@ def plot_uah_exchange_rates(csv_file, specified_year):
 
 
 def plot_uah_current_exchange_rate(csv_file):
-    """Plots current UAH exchange rate."""
+    """Plots current UAH exchange rate from a CSV file or a Parquet file/dataset."""
 
     try:
-        df = pd.read_csv(csv_file)
-        df['Exchange Date'] = pd.to_datetime(df['Exchange Date'], format='%d.%m.%Y')
+        import columnar
+        import matplotlib.pyplot as plt
+        df = columnar.read_rates(csv_file)
         df.plot(x='Currency', y='Rate', kind='bar', title=f"UAH Exchange Rates ({df['Exchange Date'].iloc[0].strftime('%d.%m.%Y')})")
         # Add values above the bars.
         for index, value in enumerate(df['Rate']):
@@ -1,13 +1,20 @@
 import os
-import boto3
-import csv
-from tabulate import tabulate
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from aws_clients import get_client
+from csv_preview import display_csv_with_header, display_s3_csv_with_header
+import s3_transfer
+import ec2_inventory
+
+DELETE_OBJECTS_LIMIT = 1000  # Maximum keys per DeleteObjects request
+RETRYABLE_DELETE_ERRORS = {'SlowDown', 'InternalError', 'ServiceUnavailable', 'OperationAborted'}
 
 
 ### EC2 Instances BEGIN ###
 def create_key_pair(): 
     try:
-        ec2_client = boto3.client("ec2", region_name="us-east-1")
+        ec2_client = get_client("ec2", region_name="us-east-1")
         key_pair = ec2_client.create_key_pair(KeyName="ec2-key-pair-2")
         private_key = key_pair["KeyMaterial"]
         with os.fdopen(os.open("aws_ec2_key.pem", os.O_WRONLY | os.O_CREAT, 0o400), "w+") as handle:
@@ -18,9 +25,10 @@ def create_key_pair():
 
 def create_instance(): 
     try:
-        ec2_client = boto3.client("ec2", region_name="us-east-1")
+        ec2_client = get_client("ec2", region_name="us-east-1")
         instances = ec2_client.run_instances(ImageId="ami-05b10e08d247fb927", MinCount=1, 
                                             MaxCount=1, InstanceType="t2.micro", KeyName="ec2-key-pair")
+        ec2_inventory.invalidate()
         print(instances["Instances"][0]["InstanceId"])
 
     except Exception as e:
@@ -28,20 +36,15 @@ def create_instance():
 
 def get_running_instances():
     try:
-        ec2_client = boto3.client("ec2", region_name="us-east-1")
-        reservations = ec2_client.describe_instances(Filters=[
-            {"Name": "instance-state-name", "Values": ["running"]}, 
-            {"Name": "instance-type", "Values": ["t2.micro"]}
-        ]).get("Reservations")
+        inventory = ec2_inventory.get_inventory(states=["running"], instance_types=["t2.micro"])
         instances_id = []
-        for reservation in reservations:
-            for instance in reservation["Instances"]:
-                instance_id = instance["InstanceId"]
-                instance_type = instance["InstanceType"]
-                public_ip = instance["PublicIpAddress"]
-                private_ip = instance["PrivateIpAddress"]
-                print(f"{instance_id}, {instance_type}, {public_ip}, {private_ip}")
-                instances_id.append(instance_id)
+        for instance in inventory.find():
+            instance_id = instance["InstanceId"]
+            instance_type = instance["InstanceType"]
+            public_ip = instance["PublicIpAddress"]
+            private_ip = instance["PrivateIpAddress"]
+            print(f"{instance_id}, {instance_type}, {public_ip}, {private_ip}")
+            instances_id.append(instance_id)
         return instances_id
 
     except Exception as e:
@@ -51,8 +54,9 @@ def get_running_instances():
 def stop_instance():
     try:
         instance_id = get_running_instances()[0]
-        ec2_client = boto3.client("ec2", region_name="us-east-1") 
+        ec2_client = get_client("ec2", region_name="us-east-1") 
         response = ec2_client.stop_instances(InstanceIds=[instance_id])
+        ec2_inventory.invalidate()
         print(response)
 
     except IndexError:
@@ -62,16 +66,8 @@ def stop_instance():
 
 def get_stopped_instances():
     try:
-        ec2_client = boto3.client("ec2", region_name="us-east-1")
-        reservations = ec2_client.describe_instances(Filters=[
-            {"Name": "instance-state-name", "Values": ["stopped"]}, 
-            {"Name": "instance-type", "Values": ["t2.micro"]}
-        ]).get("Reservations")
-        instances_id = []
-        for reservation in reservations:
-            for instance in reservation["Instances"]:
-                instances_id.append(instance["InstanceId"])
-        return instances_id
+        inventory = ec2_inventory.get_inventory(states=["stopped"], instance_types=["t2.micro"])
+        return inventory.ids()
 
     except Exception as e:
         print(f"Error describing stopped instances: {e}")
@@ -80,8 +76,9 @@ def get_stopped_instances():
 def terminate_instance(): 
     try:
         instance_id = get_stopped_instances()[0]
-        ec2_client = boto3.client("ec2", region_name="us-east-1") 
+        ec2_client = get_client("ec2", region_name="us-east-1") 
         response = ec2_client.terminate_instances(InstanceIds=[instance_id])
+        ec2_inventory.invalidate()
         print(response)
     
     except Exception as e:
@@ -92,7 +89,7 @@ def terminate_instance():
 ### S3 Buckets BEGIN ###
 def create_s3_bucket(bucket_name):
     try:
-        s3_client = boto3.client('s3', region_name="us-east-1")
+        s3_client = get_client('s3', region_name="us-east-1")
         location = {'LocationConstraint': "us-west-2"}
         response = s3_client.create_bucket(Bucket=bucket_name, CreateBucketConfiguration=location)
         print(response)
@@ -102,7 +99,7 @@ def create_s3_bucket(bucket_name):
 
 def get_existing_s3_buckets():
     try:
-        s3 = boto3.client('s3')
+        s3 = get_client('s3')
         response = s3.list_buckets()
         print('Existing buckets:')
         for bucket in response['Buckets']:
@@ -111,69 +108,130 @@ def get_existing_s3_buckets():
     except Exception as e:
         print(f"Error getting bucket list: {e}")
 
-def upload_file_to_s3(bucket_name, file_path, object_name=None):
+def upload_file_to_s3(bucket_name, file_path, object_name=None, config=None):
     if object_name is None:
         object_name = os.path.basename(file_path)
 
     try:
-        s3_client = boto3.client('s3')
-        s3_client.upload_file(file_path, bucket_name, object_name)
+        s3_transfer.upload_file(bucket_name, file_path, object_name, config=config)
         print(f"File {object_name} has been uploaded to S3")
 
     except Exception as e:
         print(f"Error uploading file: {e}")
 
-def download_file_from_s3(bucket_name, object_name):
+def download_file_from_s3(bucket_name, object_name, config=None):
     local_file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), object_name)
 
     try:
-        s3_client = boto3.client('s3')
-        s3_client.download_file(bucket_name, object_name, local_file_path)
+        s3_transfer.download_file(bucket_name, object_name, local_file_path, config=config)
         print(f"File {object_name} has been downloaded from S3")
 
     except Exception as e:
         print(f"Error downloading file: {e}")
 
-def display_csv_with_header(csv_file_path):
-    try:
-        with open(csv_file_path, 'r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.reader(csvfile)
-            data = list(reader)  # Read all rows into a list
-            if data:
-                headers = data[0]  # First row is the header
-                rows = data[1:]  # Remaining rows are data
-                print(tabulate(rows, headers=headers, tablefmt="grid"))  # Use tabulate for formatted output
+def _iter_bucket_objects(s3_client, bucket_name):
+    # Yields (DeleteObjects entry, size) pairs page by page; versioned buckets also list every
+    # noncurrent version and delete marker, otherwise the bucket can never be emptied
+    versioning = s3_client.get_bucket_versioning(Bucket=bucket_name).get('Status')
+    if versioning in ('Enabled', 'Suspended'):
+        for page in s3_client.get_paginator('list_object_versions').paginate(Bucket=bucket_name):
+            for version in page.get('Versions', []):
+                yield {'Key': version['Key'], 'VersionId': version['VersionId']}, version.get('Size', 0)
+            for marker in page.get('DeleteMarkers', []):
+                yield {'Key': marker['Key'], 'VersionId': marker['VersionId']}, 0
+    else:
+        for page in s3_client.get_paginator('list_objects_v2').paginate(Bucket=bucket_name):
+            for obj in page.get('Contents', []):
+                yield {'Key': obj['Key']}, obj.get('Size', 0)
+
+def _iter_delete_batches(s3_client, bucket_name):
+    batch = []
+    for entry in _iter_bucket_objects(s3_client, bucket_name):
+        batch.append(entry)
+        if len(batch) == DELETE_OBJECTS_LIMIT:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _delete_batch(bucket_name, batch, max_retries=5):
+    # Returns (objects deleted, bytes reclaimed, objects failed); throttling and internal
+    # errors reported per key in a partially failed response are retried with backoff
+    s3_client = get_client('s3')
+    pending = {(entry['Key'], entry.get('VersionId')): (entry, size) for entry, size in batch}
+    deleted = reclaimed = failed = 0
+
+    for attempt in range(max_retries + 1):
+        response = s3_client.delete_objects(
+            Bucket=bucket_name,
+            Delete={'Objects': [entry for entry, _ in pending.values()], 'Quiet': True}
+        )
+        errors = {(error['Key'], error.get('VersionId')): error for error in response.get('Errors', [])}
+        retry = {}
+        for key, (entry, size) in pending.items():
+            error = errors.get(key) or errors.get((key[0], None))
+            if error is None:
+                deleted += 1
+                reclaimed += size
+            elif error.get('Code') in RETRYABLE_DELETE_ERRORS and attempt < max_retries:
+                retry[key] = (entry, size)
             else:
-                print("CSV file is empty.")
-    except FileNotFoundError:
-        print(f"Error: File '{csv_file_path}' not found.")
-    except Exception as e:
-        print(f"An error occurred: {e}")
+                failed += 1
+                print(f"Error deleting {key[0]}: {error.get('Code')} {error.get('Message')}")
+        pending = retry
+        if not pending:
+            break
+        time.sleep(random.uniform(0, 0.2 * 2 ** attempt))
+
+    return deleted, reclaimed, failed
+
+def delete_all_objects_in_s3_bucket(bucket_name, max_workers=8):
+    totals = {'objects': 0, 'bytes': 0, 'failed': 0}
+    pending = {}  # In-flight batch future -> number of entries in the batch
+
+    def collect(future):
+        batch_size = pending.pop(future)
+        try:
+            deleted, reclaimed, failed = future.result()
+        except Exception as e:
+            print(f"Error deleting batch from S3 bucket: {e}")
+            deleted, reclaimed, failed = 0, 0, batch_size
+        totals['objects'] += deleted
+        totals['bytes'] += reclaimed
+        totals['failed'] += failed
+        if deleted:
+            print(f"Deleted {deleted} objects from S3 bucket...")
 
-def delete_all_objects_in_s3_bucket(bucket_name):
     try:
-        s3_client = boto3.client('s3')
-        objects_list = s3_client.list_objects(Bucket=bucket_name)
-        if 'Contents' in objects_list:
-            objects_to_delete = [{'Key': obj['Key']} for obj in objects_list['Contents']]
-
-            while objects_to_delete:
-                batch = objects_to_delete[:1000] # get a batch of up to 1000
-                del objects_to_delete[:1000]  # remove the processed batch
-
-                s3_client.delete_objects(
-                    Bucket=bucket_name,
-                    Delete={'Objects': batch, 'Quiet': True}
-                )
-                print(f"Deleted {len(batch)} objects from S3 bucket...")
+        s3_client = get_client('s3')
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for batch in _iter_delete_batches(s3_client, bucket_name):
+                # Bounded in-flight batches: listing never runs far ahead of deletion
+                if len(pending) >= max_workers * 2:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        collect(future)
+                pending[executor.submit(_delete_batch, bucket_name, batch)] = len(batch)
+            for future in list(pending):
+                collect(future)
+
+        elapsed = time.perf_counter() - start
+        totals['seconds'] = round(elapsed, 3)
+        totals['objects_per_sec'] = round(totals['objects'] / elapsed, 1) if elapsed else 0.0
+        print(f"Purged {totals['objects']} objects ({totals['failed']} failed) from {bucket_name} in "
+              f"{totals['seconds']}s: {totals['objects_per_sec']} objects/sec, "
+              f"{totals['bytes'] / (1024 * 1024):.2f} MB reclaimed")
+        return totals
 
     except Exception as e:
         print(f"Error deleting objects in S3 bucket: {e}")
+        return totals
 
 def destroy_s3_bucket(bucket_name):
     try:
         delete_all_objects_in_s3_bucket(bucket_name)
-        s3_client = boto3.client('s3')
+        s3_client = get_client('s3')
         response = s3_client.delete_bucket(Bucket=bucket_name)
         print(response)
 
@@ -196,4 +254,5 @@ if __name__ == "__main__":
     #upload_file_to_s3('new-bucket-s3', 'src/dynamodb_exchange_rates.csv', 's3-data.csv')
     #download_file_from_s3('new-bucket-s3', 's3-data.csv')
     #display_csv_with_header('src/s3-data.csv')
+    #display_s3_csv_with_header('new-bucket-s3', 's3-data.csv', mode='tail')
     #destroy_s3_bucket('new-bucket-s3')
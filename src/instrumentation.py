@@ -0,0 +1,312 @@
+import json
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlparse
+import aws_clients
+
+METRIC_PREFIX = "boto3_snippets"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+THROTTLE_ERROR_CODES = {"Throttling", "ThrottlingException", "ThrottledException", "RequestThrottled",
+                        "RequestThrottledException", "TooManyRequestsException", "SlowDown",
+                        "ProvisionedThroughputExceededException", "RequestLimitExceeded"}
+COUNTERS = {
+    "calls": "API calls completed",
+    "errors": "API calls that raised after all retries or returned an error status",
+    "retries": "Retried attempts",
+    "throttles": "Attempts rejected with a throttling error",
+    "bytes_sent": "Request body bytes",
+    "bytes_received": "Response body bytes",
+    "consumed_capacity_units": "DynamoDB capacity units consumed",
+    "unprocessed_items": "DynamoDB batch items returned unprocessed",
+}
+
+logger = logging.getLogger(__name__)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus layout."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile (inf if it is beyond the last bucket)."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Metrics:
+    """Thread-safe latency histograms and counters keyed by (source, operation)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+
+    def observe(self, source, operation, seconds):
+        with self._lock:
+            histogram = self.histograms.get((source, operation))
+            if histogram is None:
+                histogram = self.histograms[(source, operation)] = Histogram()
+            histogram.observe(seconds)
+
+    def inc(self, name, source, operation, amount=1):
+        if not amount:
+            return
+        key = (name, source, operation)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def summary(self):
+        """
+        Returns one record per (source, operation) with call count, latency estimates and every counter.
+
+        Latency percentiles are bucket upper bounds, so they are accurate to the bucket resolution.
+        """
+        with self._lock:
+            keys = set(self.histograms) | {(source, operation) for _, source, operation in self.counters}
+            records = []
+            for source, operation in sorted(keys):
+                histogram = self.histograms.get((source, operation), Histogram())
+                record = {
+                    "source": source,
+                    "operation": operation,
+                    "latency_mean_s": round(histogram.sum / histogram.count, 6) if histogram.count else None,
+                    "latency_p50_s": histogram.quantile(0.5),
+                    "latency_p90_s": histogram.quantile(0.9),
+                    "latency_p99_s": histogram.quantile(0.99),
+                }
+                for name in COUNTERS:
+                    record[name] = self.counters.get((name, source, operation), 0)
+                records.append(record)
+            return records
+
+    def to_prometheus(self):
+        """Renders every metric in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            name = f"{METRIC_PREFIX}_call_duration_seconds"
+            lines += [f"# HELP {name} API call latency including retries", f"# TYPE {name} histogram"]
+            for (source, operation), histogram in sorted(self.histograms.items()):
+                labels = f'source="{source}",operation="{operation}"'
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+                lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+            for counter, help_text in COUNTERS.items():
+                name = f"{METRIC_PREFIX}_{counter}_total"
+                samples = sorted((key[1:], value) for key, value in self.counters.items() if key[0] == counter)
+                if not samples:
+                    continue
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                for (source, operation), value in samples:
+                    lines.append(f'{name}{{source="{source}",operation="{operation}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+_metrics = Metrics()
+_enabled = False
+_enable_lock = threading.Lock()
+_hooked_sessions = []
+
+
+def get_metrics():
+    """Returns the process-wide metrics collected while instrumentation is enabled."""
+    return _metrics
+
+
+def _body_size(body):
+    """Size of a botocore request body: bytes, str or a seekable file object."""
+    if body is None:
+        return 0
+    if isinstance(body, (bytes, bytearray)):
+        return len(body)
+    if isinstance(body, str):
+        return len(body.encode("utf-8"))
+    try:
+        position = body.tell()
+        body.seek(0, os.SEEK_END)
+        size = body.tell() - position
+        body.seek(position)
+        return size
+    except (AttributeError, OSError, ValueError):
+        return 0
+
+
+def _response_size(http_response, model):
+    """Response body size from Content-Length; non-streaming bodies are already read, so they are measured."""
+    length = http_response.headers.get("content-length")
+    if length is not None:
+        return int(length)
+    return 0 if model.has_streaming_output else len(http_response.content or b"")
+
+
+def _consumed_capacity(parsed):
+    """Total CapacityUnits reported by a DynamoDB response (a single entry or one per table)."""
+    consumed = parsed.get("ConsumedCapacity")
+    if not consumed:
+        return 0
+    entries = consumed if isinstance(consumed, list) else [consumed]
+    return sum(entry.get("CapacityUnits", 0) for entry in entries)
+
+
+def _before_call(model, params, context, **kwargs):
+    # params is the serialized request dict here, not the caller's arguments
+    context["instrumentation_start"] = time.perf_counter()
+    context["instrumentation_bytes_sent"] = _body_size(params.get("body"))
+
+
+def _after_call(http_response, parsed, model, context, **kwargs):
+    source, operation = model.service_model.service_name, model.name
+    started = context.get("instrumentation_start")
+    if started is not None:
+        _metrics.observe(source, operation, time.perf_counter() - started)
+    _metrics.inc("calls", source, operation)
+    if http_response.status_code >= 400:
+        _metrics.inc("errors", source, operation)
+    _metrics.inc("retries", source, operation, parsed.get("ResponseMetadata", {}).get("RetryAttempts", 0))
+    _metrics.inc("bytes_sent", source, operation, context.get("instrumentation_bytes_sent", 0))
+    _metrics.inc("bytes_received", source, operation, _response_size(http_response, model))
+    _metrics.inc("consumed_capacity_units", source, operation, _consumed_capacity(parsed))
+    unprocessed = parsed.get("UnprocessedItems") or {}
+    _metrics.inc("unprocessed_items", source, operation, sum(len(requests) for requests in unprocessed.values()))
+
+
+def _after_call_error(exception, context, event_name, **kwargs):
+    # event_name is 'after-call-error.<service-id>.<Operation>'
+    _, source, operation = event_name.split(".", 2)
+    started = context.get("instrumentation_start")
+    if started is not None:
+        _metrics.observe(source, operation, time.perf_counter() - started)
+    _metrics.inc("calls", source, operation)
+    _metrics.inc("errors", source, operation)
+
+
+def _needs_retry(response, operation, **kwargs):
+    # Emitted once per attempt; only the throttles are counted here, retries come from RetryAttempts
+    if response is None:
+        return
+    http_response, parsed = response
+    code = parsed.get("Error", {}).get("Code")
+    if code in THROTTLE_ERROR_CODES or http_response.status_code == 429:
+        _metrics.inc("throttles", operation.service_model.service_name, operation.name)
+
+
+def _nbu_response_hook(response, *args, **kwargs):
+    """requests response hook recording every NBU attempt (fetch_json retries show up as separate attempts)."""
+    operation = urlparse(response.url).path.rsplit("/", 1)[-1]
+    _metrics.observe("nbu", operation, response.elapsed.total_seconds())
+    _metrics.inc("calls", "nbu", operation)
+    _metrics.inc("bytes_received", "nbu", operation, len(response.content))
+    if response.status_code == 429:
+        _metrics.inc("throttles", "nbu", operation)
+    if response.status_code >= 400:
+        _metrics.inc("errors", "nbu", operation)
+
+
+def _nbu_retry_hook(endpoint):
+    # Called by fetch_json only when another attempt follows, like botocore's RetryAttempts
+    _metrics.inc("retries", "nbu", endpoint)
+
+
+_BOTOCORE_HANDLERS = (
+    ("before-call", _before_call),
+    ("after-call", _after_call),
+    ("after-call-error", _after_call_error),
+    ("needs-retry", _needs_retry),
+)
+
+
+def enable(nbu_session=None):
+    """
+    Starts collecting metrics from every AWS client of the registry and from the NBU requests session.
+
+    Nothing is hooked until this is called, so disabled instrumentation costs nothing on the hot paths.
+    Cached AWS clients are rebuilt with the handlers attached.
+
+    Args:
+        nbu_session (requests.Session): Session to hook. Defaults to nbu_fetcher's shared session.
+    """
+    global _enabled
+    with _enable_lock:
+        if _enabled:
+            return
+        for event_name, handler in _BOTOCORE_HANDLERS:
+            aws_clients.register_event_handler(event_name, handler)
+        import nbu_fetcher
+        nbu_fetcher.register_retry_hook(_nbu_retry_hook)
+        if nbu_session is None:
+            nbu_session = nbu_fetcher.get_session()
+        nbu_session.hooks["response"].append(_nbu_response_hook)
+        _hooked_sessions.append(nbu_session)
+        _enabled = True
+
+
+def disable():
+    """Detaches every hook added by enable(); metrics collected so far are kept."""
+    global _enabled
+    with _enable_lock:
+        if not _enabled:
+            return
+        for event_name, handler in _BOTOCORE_HANDLERS:
+            aws_clients.unregister_event_handler(event_name, handler)
+        import nbu_fetcher
+        nbu_fetcher.unregister_retry_hook(_nbu_retry_hook)
+        while _hooked_sessions:
+            session = _hooked_sessions.pop()
+            if _nbu_response_hook in session.hooks["response"]:
+                session.hooks["response"].remove(_nbu_response_hook)
+        _enabled = False
+
+
+def is_enabled():
+    """Tells whether enable() hooks are currently attached."""
+    return _enabled
+
+
+def log_metrics(log=None, level=logging.INFO):
+    """Emits one structured (JSON) log line per source and operation."""
+    log = log or logger
+    for record in _metrics.summary():
+        log.log(level, json.dumps(record))
+
+
+def write_prometheus(path):
+    """
+    Writes the metrics to a Prometheus text file, e.g. for the node_exporter textfile collector.
+
+    The file is replaced atomically so a scrape never reads a partial write.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(_metrics.to_prometheus())
+    os.replace(tmp_path, path)
@@ -0,0 +1,314 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+# Override with a local stand-in server, e.g. NBU_API_URL=http://127.0.0.1:8000/NBUStatService/v1/statdirectory
+NBU_API_URL = os.environ.get("NBU_API_URL", "https://bank.gov.ua/NBUStatService/v1/statdirectory")
+# Site API serving one currency over a whole date range (exchange_site?start=...&end=...&valcode=...)
+NBU_PERIOD_URL = os.environ.get("NBU_PERIOD_URL", "https://bank.gov.ua/NBU_Exchange")
+DEFAULT_TIMEOUT = 10  # seconds
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_RATE_LIMIT = 10.0  # requests per second
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+MAX_PERIOD_DAYS = 366  # Longest range requested from the period endpoint in one call
+PERIOD_LOOKBACK_DAYS = 7  # Extra days fetched before a range so weekend/holiday dates can be filled forward
+FETCH_MODES = ("pair", "date", "period")
+
+_session = None
+_pool_size = 0
+_session_lock = threading.Lock()
+_retry_hooks = []  # Called as hook(endpoint) each time fetch_json is about to make another attempt
+
+
+class TokenBucket:
+    """Thread-safe token bucket limiting how many requests start per second."""
+
+    def __init__(self, rate, capacity=None):
+        """
+        Args:
+            rate (float): Tokens added per second. None or 0 disables limiting.
+            capacity (float): Maximum burst size. Defaults to one second's worth of tokens.
+        """
+        self.rate = rate
+        self.capacity = capacity or max(rate or 1.0, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a token is available and consumes it."""
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def get_session(pool_size=DEFAULT_MAX_WORKERS * 2):
+    """
+    Returns the shared keep-alive requests session used for all NBU calls.
+
+    The connection pool holds at least pool_size connections: asking for a larger pool than the
+    current one mounts a new adapter on the same session, so hooks and settings are kept.
+    """
+    global _session, _pool_size
+    with _session_lock:
+        if _session is None or pool_size > _pool_size:
+            import requests  # Deferred so importing this module stays cheap for callers that never fetch
+            from requests.adapters import HTTPAdapter
+
+            session = _session or requests.Session()
+            # The previous adapter is not closed: requests in flight may still be using its connections
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session, _pool_size = session, pool_size
+        return _session
+
+
+def register_retry_hook(hook):
+    """Registers hook(endpoint), called by fetch_json only when a failed attempt is actually retried."""
+    _retry_hooks.append(hook)
+
+
+def unregister_retry_hook(hook):
+    """Removes a hook added with register_retry_hook."""
+    if hook in _retry_hooks:
+        _retry_hooks.remove(hook)
+
+
+def fetch_json(endpoint, params, session=None, timeout=DEFAULT_TIMEOUT, retries=3, backoff=0.5,
+               rate_limiter=None, base_url=None):
+    """
+    Performs a GET against an NBU API endpoint and returns the decoded JSON body.
+
+    Connection errors, timeouts and 429/5xx responses are retried with full-jitter exponential backoff.
+
+    Args:
+        endpoint (str): Endpoint name below NBU_API_URL, e.g. 'exchange'.
+        params (dict): Query parameters; the 'json' flag is added automatically.
+        session (requests.Session): Session to use. Defaults to the shared session.
+        timeout (float): Per-request timeout in seconds.
+        retries (int): Number of retries after the first attempt.
+        backoff (float): Base backoff in seconds.
+        rate_limiter (TokenBucket): Optional limiter acquired before every attempt.
+        base_url (str): API root. Defaults to NBU_API_URL.
+
+    Raises:
+        requests.exceptions.RequestException: If the request still fails after all retries.
+        ValueError: If the response body is not valid JSON.
+    """
+    import requests
+
+    session = session or get_session()
+    url = f"{base_url or NBU_API_URL}/{endpoint}"
+    params = dict(params, json="")
+
+    for attempt in range(retries + 1):
+        if rate_limiter:
+            rate_limiter.acquire()
+        try:
+            response = session.get(url, params=params, timeout=timeout)
+            if response.status_code in RETRY_STATUS_CODES and attempt < retries:
+                retry_after = response.headers.get("Retry-After", "")
+                delay = float(retry_after) if retry_after.isdigit() else random.uniform(0, backoff * 2 ** attempt)
+                for hook in _retry_hooks:
+                    hook(endpoint)
+                time.sleep(delay)
+                continue
+            response.raise_for_status()
+            return response.json()
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt == retries:
+                raise
+            for hook in _retry_hooks:
+                hook(endpoint)
+            time.sleep(random.uniform(0, backoff * 2 ** attempt))
+
+
+def parse_exchange_rate(data):
+    """Reduces an NBU exchange response to {cc: {'rate', 'exchangedate'}}, or None if it is empty."""
+    if not data:
+        return None
+    return {
+        data[0]["cc"]: {
+            "rate": data[0]["rate"],
+            "exchangedate": data[0]["exchangedate"]
+        }
+    }
+
+
+def fetch_exchange_rate(date_str, currency_code, session=None, rate_limiter=None, **kwargs):
+    """Fetches one currency's UAH rate for one YYYYMMDD date. Raises on HTTP or decoding errors."""
+    data = fetch_json("exchange", {"valcode": currency_code, "date": date_str},
+                      session=session, rate_limiter=rate_limiter, **kwargs)
+    return parse_exchange_rate(data)
+
+
+def fetch_exchange_rates(pairs, max_workers=DEFAULT_MAX_WORKERS, rate_limit=DEFAULT_RATE_LIMIT, **kwargs):
+    """
+    Fetches many (date, currency) rates concurrently over one keep-alive session.
+
+    Args:
+        pairs (iterable): (date_str, currency_code) tuples, dates in YYYYMMDD format.
+        max_workers (int): Maximum number of requests in flight.
+        rate_limit (float): Maximum requests started per second. None disables limiting.
+        **kwargs: Passed to fetch_json (timeout, retries, backoff).
+
+    Returns:
+        list: One entry per input pair, in input order: the parsed rate dictionary, or None
+        if the currency was not published for that date or the request failed.
+    """
+    import requests
+
+    session = get_session(pool_size=max_workers)
+    rate_limiter = TokenBucket(rate_limit)
+
+    def fetch(pair):
+        date_str, currency_code = pair
+        try:
+            return fetch_exchange_rate(date_str, currency_code, session=session,
+                                       rate_limiter=rate_limiter, **kwargs)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Error fetching {currency_code} data for {date_str}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(fetch, pairs))
+
+
+def plan_requests(dates, currencies, mode=None, max_period_days=MAX_PERIOD_DAYS):
+    """
+    Plans the fewest NBU requests covering a (dates x currencies) grid.
+
+    Three request shapes are available: one currency on one date ('pair'), every currency on one
+    date ('date'), and one currency over a date range ('period'). Unless a mode is forced, the
+    shape with the lowest request count wins; ties go to the smaller payload (pair, date, period).
+
+    Args:
+        dates (list): Dates in YYYYMMDD format.
+        currencies (list): Currency codes.
+        mode (str): Force 'pair', 'date' or 'period' instead of choosing automatically.
+        max_period_days (int): Longest range covered by a single period request.
+
+    Returns:
+        list: Request tuples ('pair', date, currency), ('date', date) or ('period', start, end, currency).
+    """
+    dates = sorted(set(dates))
+    currencies = list(dict.fromkeys(currencies))
+
+    # Group the dates into ranges no longer than max_period_days
+    windows = []
+    for date_str in dates:
+        day = datetime.strptime(date_str, "%Y%m%d")
+        if windows and (day - windows[-1][0]).days < max_period_days:
+            windows[-1][1] = day
+        else:
+            windows.append([day, day])
+
+    plans = {
+        "pair": lambda: [("pair", date_str, currency) for date_str in dates for currency in currencies],
+        "date": lambda: [("date", date_str) for date_str in dates],
+        "period": lambda: [("period", start.strftime("%Y%m%d"), end.strftime("%Y%m%d"), currency)
+                           for start, end in windows for currency in currencies],
+    }
+    if mode is None:
+        costs = {"pair": len(dates) * len(currencies), "date": len(dates), "period": len(windows) * len(currencies)}
+        mode = min(FETCH_MODES, key=lambda name: (costs[name], FETCH_MODES.index(name)))
+    elif mode not in plans:
+        raise ValueError(f"Unknown fetch mode '{mode}', expected one of {FETCH_MODES}")
+    return plans[mode]()
+
+
+def _run_request(request, session, rate_limiter, **kwargs):
+    """Executes one planned request and returns its records as (date YYYYMMDD, currency, rate, exchangedate)."""
+    kind = request[0]
+    if kind == "period":
+        _, start, end, currency = request
+        lookback = datetime.strptime(start, "%Y%m%d") - timedelta(days=PERIOD_LOOKBACK_DAYS)
+        data = fetch_json("exchange_site", {"start": lookback.strftime("%Y%m%d"), "end": end, "valcode": currency,
+                                            "sort": "exchangedate", "order": "asc"},
+                          session=session, rate_limiter=rate_limiter, base_url=NBU_PERIOD_URL, **kwargs)
+    elif kind == "date":
+        data = fetch_json("exchange", {"date": request[1]}, session=session, rate_limiter=rate_limiter, **kwargs)
+    else:
+        data = fetch_json("exchange", {"valcode": request[2], "date": request[1]},
+                          session=session, rate_limiter=rate_limiter, **kwargs)
+
+    records = []
+    for item in data or []:
+        day = datetime.strptime(item["exchangedate"], "%d.%m.%Y")
+        # The period endpoint quotes 'rate' per 'units'; 'rate_per_unit' matches the statdirectory 'rate'
+        records.append((day.strftime("%Y%m%d"), item["cc"], item.get("rate_per_unit", item["rate"]),
+                        item["exchangedate"]))
+    return records
+
+
+def fetch_rate_grid(dates, currencies, mode=None, max_workers=DEFAULT_MAX_WORKERS, rate_limit=DEFAULT_RATE_LIMIT,
+                    **kwargs):
+    """
+    Fetches a whole (dates x currencies) grid with the fewest requests and filters the results locally.
+
+    Period responses only list the days a rate was set, so requested dates missing from them
+    (weekends, holidays) take the most recent earlier rate, which is what NBU reports for those dates.
+
+    Args:
+        dates (list): Dates in YYYYMMDD format.
+        currencies (list): Currency codes.
+        mode (str): Force 'pair', 'date' or 'period' instead of letting plan_requests choose.
+        max_workers (int): Maximum number of requests in flight.
+        rate_limit (float): Maximum requests started per second. None disables limiting.
+        **kwargs: Passed to fetch_json (timeout, retries, backoff).
+
+    Returns:
+        dict: {(date_str, currency_code): {'rate', 'exchangedate'}} for every grid cell NBU published.
+    """
+    import requests
+
+    plan = plan_requests(dates, currencies, mode=mode)
+    session = get_session(pool_size=max_workers)
+    rate_limiter = TokenBucket(rate_limit)
+    wanted_dates, wanted_currencies = set(dates), set(currencies)
+
+    def run(request):
+        try:
+            return _run_request(request, session, rate_limiter, **kwargs)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Error fetching NBU data for {request}: {e}")
+            return []
+
+    grid = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for request, records in zip(plan, executor.map(run, plan)):
+            if request[0] == "period":
+                _fill_period(grid, request, records, wanted_dates)
+                continue
+            for date_str, currency, rate, exchangedate in records:
+                if currency in wanted_currencies and date_str in wanted_dates:
+                    grid[(date_str, currency)] = {"rate": rate, "exchangedate": exchangedate}
+    return grid
+
+
+def _fill_period(grid, request, records, wanted_dates):
+    """Maps a period response onto the requested dates of its range, filling gaps from the previous rate."""
+    _, start, end, currency = request
+    by_date = {date_str: rate for date_str, cc, rate, _ in records if cc == currency}
+    known = sorted(by_date)
+    index, last_rate = 0, None
+    for date_str in sorted(d for d in wanted_dates if start <= d <= end):
+        while index < len(known) and known[index] <= date_str:
+            last_rate = by_date[known[index]]
+            index += 1
+        if last_rate is not None:
+            day = datetime.strptime(date_str, "%Y%m%d")
+            grid[(date_str, currency)] = {"rate": last_rate, "exchangedate": day.strftime("%d.%m.%Y")}
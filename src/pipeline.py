@@ -0,0 +1,313 @@
+import abc
+import csv
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+import ec2_s3
+import nbu_fetcher
+import s3_transfer
+
+DEFAULT_BATCH_DATES = 31  # Dates fetched per batch handed down the pipeline
+DEFAULT_QUEUE_SIZE = 2  # Batches buffered between two stages before the producer blocks
+_DONE = object()  # End-of-stream marker passed down every queue
+
+
+class Channel:
+    """Bounded queue between two stages that measures how long each side waits on the other."""
+
+    def __init__(self, name, maxsize=DEFAULT_QUEUE_SIZE):
+        self.name = name
+        self._queue = queue.Queue(maxsize=maxsize)
+        self.maxsize = maxsize
+        self.items = 0
+        self.max_depth = 0
+        self.put_blocked_seconds = 0.0  # Producer waiting for room: the consumer is the bottleneck
+        self.get_waiting_seconds = 0.0  # Consumer waiting for data: the producer is the bottleneck
+
+    def put(self, item, stop):
+        start = time.perf_counter()
+        sent = False
+        while not stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                sent = True
+                break
+            except queue.Full:
+                continue
+        self.put_blocked_seconds += time.perf_counter() - start
+        # An item dropped because the pipeline stopped never reached the consumer, so it is not counted
+        if sent and item is not _DONE:
+            self.items += 1
+            self.max_depth = max(self.max_depth, self._queue.qsize())
+
+    def get(self, stop):
+        start = time.perf_counter()
+        while not stop.is_set():
+            try:
+                item = self._queue.get(timeout=0.1)
+                break
+            except queue.Empty:
+                continue
+        else:
+            item = _DONE
+        self.get_waiting_seconds += time.perf_counter() - start
+        return item
+
+    def stats(self):
+        return {"items": self.items, "capacity": self.maxsize, "max_depth": self.max_depth,
+                "put_blocked_s": round(self.put_blocked_seconds, 3),
+                "get_waiting_s": round(self.get_waiting_seconds, 3)}
+
+
+class Stage(threading.Thread, abc.ABC):
+    """
+    Pipeline stage running in its own thread: reads from an input channel, calls handle() per item and
+    finish() at end of stream. A failure stops the whole pipeline and is re-raised by run_pipeline.
+    """
+
+    def __init__(self, name, stop, inbox=None, outbox=None):
+        super().__init__(name=name, daemon=True)
+        self.stop = stop
+        self.inbox = inbox
+        self.outbox = outbox
+        self.busy_seconds = 0.0
+        self.processed = 0
+        self.error = None
+
+    def emit(self, item):
+        if self.outbox is not None:
+            self.outbox.put(item, self.stop)
+
+    def run(self):
+        started = time.perf_counter()
+        try:
+            for item in self.source():
+                start = time.perf_counter()
+                self.handle(item)
+                self.busy_seconds += time.perf_counter() - start
+                self.processed += 1
+            if not self.stop.is_set():  # Partial results are not finished after another stage failed
+                start = time.perf_counter()
+                self.finish()
+                self.busy_seconds += time.perf_counter() - start
+        except Exception as e:
+            self.error = e
+            self.stop.set()
+        finally:
+            self.emit(_DONE)
+            self.wall_seconds = time.perf_counter() - started
+
+    def source(self):
+        while True:
+            item = self.inbox.get(self.stop)
+            if item is _DONE:
+                return
+            yield item
+
+    @abc.abstractmethod
+    def handle(self, item):
+        """Processes one item from the input channel."""
+
+    def finish(self):
+        pass
+
+    def stats(self):
+        return {"processed": self.processed, "busy_s": round(self.busy_seconds, 3),
+                "wall_s": round(self.wall_seconds, 3), "error": repr(self.error) if self.error else None}
+
+
+class FetchStage(Stage):
+    """Fetches the rates batch by batch through the cached, planned NBU fetcher."""
+
+    def __init__(self, stop, outbox, date_batches, currency_codes, fetch_kwargs):
+        super().__init__("fetch", stop, outbox=outbox)
+        self.date_batches = date_batches
+        self.currency_codes = currency_codes
+        self.fetch_kwargs = fetch_kwargs
+
+    def source(self):
+        # Stop calling NBU as soon as another stage has failed; its results would only be dropped
+        for dates in self.date_batches:
+            if self.stop.is_set():
+                return
+            yield dates
+
+    def handle(self, dates):
+        records = ec2_s3.get_uah_exchange_combined_rates(dates, self.currency_codes, **self.fetch_kwargs)
+        if records:
+            self.emit(records)
+
+
+class SerializeStage(Stage):
+    """Appends each batch to the CSV as it arrives, forwards the records, and queues the finished file."""
+
+    def __init__(self, stop, inbox, outbox, uploads, csv_path):
+        import columnar  # pandas/pyarrow are only loaded once a pipeline runs
+
+        super().__init__("serialize", stop, inbox=inbox, outbox=outbox)
+        self.uploads = uploads
+        self.csv_path = csv_path
+        self.rows = 0
+        self._file = open(csv_path, "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=columnar.RATE_COLUMNS)
+        self._writer.writeheader()
+
+    def handle(self, records):
+        self._writer.writerows(records)
+        self.rows += len(records)
+        self.emit(records)
+
+    def finish(self):
+        self._file.close()
+        self.uploads.put(self.csv_path, self.stop)
+
+    def run(self):
+        try:
+            super().run()
+        finally:
+            self._file.close()
+            # The upload channel has two producers, so this stage signals its own end separately
+            self.uploads.put(_DONE, self.stop)
+
+
+class PlotStage(Stage):
+    """
+    Renders one chart per year from the records already in memory, as soon as the year is complete.
+
+    Batches arrive in date order, so a year is complete once a later year shows up.
+    """
+
+    def __init__(self, stop, inbox, uploads, currency_codes, freq, output_dir):
+        super().__init__("plot", stop, inbox=inbox, outbox=uploads)
+        self.currency_codes = currency_codes
+        self.freq = freq
+        self.output_dir = output_dir
+        self.years = {}  # year -> records not yet plotted
+
+    def handle(self, records):
+        for record in records:
+            self.years.setdefault(int(record["Exchange Date"][-4:]), []).append(record)
+        latest = max(self.years)
+        for year in sorted(self.years):
+            if year < latest:
+                self._render(year)
+
+    def finish(self):
+        for year in sorted(self.years):
+            self._render(year)
+
+    def _render(self, year):
+        import columnar
+        import plotting
+
+        pivot = plotting.aggregate_rates(columnar.rates_to_frame(self.years.pop(year)), self.currency_codes,
+                                         freq=self.freq)
+        output_file = os.path.join(self.output_dir, f"{year}_uah_exchange_rates.png")
+        plotting.render_chart(pivot, output_file, f"UAH Exchange Rates ({year})")
+        self.emit(output_file)
+
+
+class UploadStage(Stage):
+    """Uploads every file it receives; it finishes once both the serializer and the plotter are done."""
+
+    def __init__(self, stop, inbox, bucket_name, producers=2):
+        super().__init__("upload", stop, inbox=inbox)
+        self.bucket_name = bucket_name
+        self.producers = producers
+        self.uploaded = []
+        self.bytes = 0
+
+    def source(self):
+        finished = 0
+        while finished < self.producers:
+            item = self.inbox.get(self.stop)
+            if item is _DONE:
+                finished += 1
+                if self.stop.is_set():
+                    return
+            else:
+                yield item
+
+    def handle(self, path):
+        stats = s3_transfer.upload_file(self.bucket_name, path, os.path.basename(path), verbose=False)
+        self.uploaded.append(os.path.basename(path))
+        self.bytes += stats["bytes"]
+
+
+def run_pipeline(str_dates, currency_codes, bucket_name, csv_name="exchange_rates.csv", freq="monthly",
+                 batch_dates=DEFAULT_BATCH_DATES, queue_size=DEFAULT_QUEUE_SIZE, output_dir=".",
+                 max_workers=nbu_fetcher.DEFAULT_MAX_WORKERS, rate_limit=nbu_fetcher.DEFAULT_RATE_LIMIT):
+    """
+    Runs the ec2_s3 main flow as overlapping stages: fetch -> CSV -> plot -> upload.
+
+    Each stage runs in its own thread and hands batches down bounded queues, so a later batch is
+    fetched while an earlier one is written, charted and uploaded, and a slow stage throttles the
+    ones feeding it. Charts are drawn from the records already in memory, so the CSV is never
+    downloaded back from S3.
+
+    Args:
+        str_dates (list): Dates in YYYYMMDD format.
+        currency_codes (list): Currency codes, e.g. ["USD", "EUR"].
+        bucket_name (str): S3 bucket receiving the CSV and the charts.
+        csv_name (str): CSV file name, written next to this module like json_to_csv does.
+        freq (str): Chart aggregation: 'daily', 'monthly' or 'yearly'.
+        batch_dates (int): Dates per fetch batch.
+        queue_size (int): Batches buffered between stages.
+        output_dir (str): Directory for the chart images.
+        max_workers (int): Maximum number of NBU requests in flight.
+        rate_limit (float): Maximum NBU requests started per second.
+
+    Returns:
+        dict: Records, uploaded files and bytes, wall seconds, and per-stage and per-queue statistics.
+    """
+    csv_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), csv_name)
+    dates = sorted(str_dates)
+    date_batches = [dates[i:i + batch_dates] for i in range(0, len(dates), batch_dates)]
+
+    stop = threading.Event()
+    fetched = Channel("fetch->serialize", queue_size)
+    serialized = Channel("serialize->plot", queue_size)
+    files = Channel("files->upload", queue_size)
+    stages = [
+        FetchStage(stop, fetched, date_batches, currency_codes, {"max_workers": max_workers,
+                                                                  "rate_limit": rate_limit}),
+        SerializeStage(stop, fetched, serialized, files, csv_path),
+        PlotStage(stop, serialized, files, currency_codes, freq, output_dir),
+        UploadStage(stop, files, bucket_name),
+    ]
+
+    start = time.perf_counter()
+    for stage in stages:
+        stage.start()
+    for stage in stages:
+        stage.join()
+    elapsed = time.perf_counter() - start
+
+    serializer, uploader = stages[1], stages[3]
+    report = {
+        "records": serializer.rows,
+        "uploaded": uploader.uploaded,
+        "uploaded_bytes": uploader.bytes,
+        "seconds": round(elapsed, 3),
+        "stages": {stage.name: stage.stats() for stage in stages},
+        "queues": {channel.name: channel.stats() for channel in (fetched, serialized, files)},
+    }
+    print(f"Pipeline finished in {report['seconds']}s: {report['records']} records, "
+          f"{len(report['uploaded'])} files uploaded to '{bucket_name}'.")
+    for name, stats in report["stages"].items():
+        print(f"  {name:<10} processed={stats['processed']:<5} busy={stats['busy_s']}s wall={stats['wall_s']}s")
+    for name, stats in report["queues"].items():
+        print(f"  {name:<18} items={stats['items']:<5} max_depth={stats['max_depth']}/{stats['capacity']} "
+              f"put_blocked={stats['put_blocked_s']}s get_waiting={stats['get_waiting_s']}s")
+
+    errors = [stage.error for stage in stages if stage.error]
+    if errors:
+        raise errors[0]
+    return report
+
+
+if __name__ == "__main__":
+    dates_for_2022 = [(datetime(2022, month, 1)).strftime("%Y%m%d") for month in range(1, 13)]
+    run_pipeline(dates_for_2022, ["USD", "EUR"], "bucket-s3")
@@ -0,0 +1,129 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib
+matplotlib.use("Agg")  # Non-interactive backend: no display needed, safe in worker processes
+from matplotlib.figure import Figure
+import pandas as pd
+import columnar
+
+FREQUENCIES = {"daily": "D", "monthly": "MS", "yearly": "YS"}
+DEFAULT_FIGSIZE = (12, 6)
+MAX_LABELED_POINTS = 60  # Per-point value labels are skipped on denser charts
+
+_figure = None  # Reused by every chart rendered in this process
+
+
+def aggregate_rates(df, currencies=None, start=None, end=None, freq="monthly", how="mean"):
+    """
+    Filters and resamples rates into one column per currency in a single vectorized pass.
+
+    Args:
+        df (DataFrame): Rates with Currency, Rate and Exchange Date (datetime64) columns.
+        currencies (list): Currencies to keep. Defaults to every currency present.
+        start (str or datetime): First date to include.
+        end (str or datetime): Last date to include.
+        freq (str): 'daily', 'monthly' or 'yearly'.
+        how (str): Aggregation applied within each period, e.g. 'mean', 'last', 'max'.
+
+    Returns:
+        DataFrame: Indexed by period start, one column per currency.
+    """
+    mask = pd.Series(True, index=df.index)
+    if currencies is not None:
+        mask &= df["Currency"].isin(list(currencies))
+    if start is not None:
+        mask &= df["Exchange Date"] >= pd.Timestamp(start)
+    if end is not None:
+        mask &= df["Exchange Date"] <= pd.Timestamp(end)
+
+    pivot = df[mask].pivot_table(index=pd.Grouper(key="Exchange Date", freq=FREQUENCIES[freq]),
+                                 columns="Currency", values="Rate", aggfunc=how)
+    pivot = pivot.dropna(how="all")
+    if currencies is not None:
+        pivot = pivot.reindex(columns=[c for c in currencies if c in pivot.columns])
+    return pivot
+
+
+def _get_figure(figsize):
+    """Returns this process's reusable figure, cleared and resized."""
+    global _figure
+    if _figure is None:
+        _figure = Figure(figsize=figsize)
+    else:
+        _figure.clf()
+        _figure.set_size_inches(figsize)
+    return _figure
+
+
+def render_chart(pivot, output_file, title, annotate=True, figsize=DEFAULT_FIGSIZE, ylabel="Exchange Rate"):
+    """
+    Renders an aggregated rates table as a line chart and saves it.
+
+    Args:
+        pivot (DataFrame): Output of aggregate_rates.
+        output_file (str): Image path; the format follows the extension.
+        title (str): Chart title.
+        annotate (bool): Print each point's value next to its marker (skipped above MAX_LABELED_POINTS).
+        figsize (tuple): Figure size in inches.
+        ylabel (str): Y axis label.
+
+    Returns:
+        str: The saved image path.
+    """
+    figure = _get_figure(figsize)
+    ax = figure.add_subplot()
+    for position, currency in enumerate(pivot.columns):
+        series = pivot[currency].dropna()
+        ax.plot(series.index, series.values, marker="o", label=f"{currency}/UAH")
+        if annotate and len(series) <= MAX_LABELED_POINTS:
+            va = "bottom" if position % 2 == 0 else "top"
+            for x, y in zip(series.index, series.values):
+                ax.annotate(f"{y:.2f}", (x, y), ha="center", va=va)
+
+    ax.set_title(title)
+    ax.set_xlabel("Date")
+    ax.set_ylabel(ylabel)
+    ax.legend()
+    figure.autofmt_xdate()
+    figure.tight_layout()
+    figure.savefig(output_file)
+    return output_file
+
+
+def _render_task(task):
+    pivot, output_file, title, annotate, figsize = task
+    return render_chart(pivot, output_file, title, annotate, figsize)
+
+
+def render_charts(source, specs, processes=None, output_dir="."):
+    """
+    Renders many charts in a process pool from one read of the rates data.
+
+    The data is loaded and aggregated once in the calling process; workers only receive the
+    small per-chart tables and draw them on a reused Agg figure.
+
+    Args:
+        source (str or DataFrame): CSV/Parquet source accepted by columnar.read_rates, or a loaded DataFrame.
+        specs (list): Chart dictionaries with optional keys currencies, start, end, freq ('daily',
+            'monthly', 'yearly'), how, title, output_file and annotate.
+        processes (int): Worker processes. Defaults to the CPU count; 1 renders in this process.
+        output_dir (str): Directory for charts without an explicit output_file.
+
+    Returns:
+        list: Saved image paths in spec order.
+    """
+    df = source if isinstance(source, pd.DataFrame) else columnar.read_rates(source)
+    tasks = []
+    for index, spec in enumerate(specs):
+        freq = spec.get("freq", "monthly")
+        pivot = aggregate_rates(df, spec.get("currencies"), spec.get("start"), spec.get("end"),
+                                freq, spec.get("how", "mean"))
+        title = spec.get("title") or f"UAH Exchange Rates ({freq}, {', '.join(map(str, pivot.columns))})"
+        output_file = spec.get("output_file") or os.path.join(output_dir, f"uah_exchange_rates_{index}.png")
+        tasks.append((pivot, output_file, title, spec.get("annotate", True), spec.get("figsize", DEFAULT_FIGSIZE)))
+
+    if processes == 1 or len(tasks) <= 1:
+        return [_render_task(task) for task in tasks]
+    workers = processes or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_render_task, tasks, chunksize=max(1, len(tasks) // (4 * workers))))
@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL = 30  # seconds
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+class QueryCache:
+    """
+    In-process LRU cache with a TTL for query_items results.
+
+    Entries are keyed by (table, index, currency, exchange_date), i.e. by table, index and key
+    condition. A full-table scan is cached under currency=None and exchange_date=None.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        """
+        Args:
+            max_entries (int): Least recently used entries are evicted above this size.
+            ttl (float): Seconds an entry is served before it is re-queried.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+        self._entries = OrderedDict()  # key -> (stored_at, items)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(table_name, currency=None, exchange_date=None):
+        index = 'ExchangeDateIndex' if exchange_date else None
+        return table_name, index, currency, exchange_date
+
+    def get(self, key):
+        """Returns a copy of the cached item list, or None on a miss or expired entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                    self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(entry[1])
+
+    def put(self, key, items):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), list(items))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, table_name, currency=None, exchange_date=None):
+        """
+        Drops every entry that may contain an item written with this currency and exchange date.
+
+        An exchange_date of None means the written item's date is unknown (e.g. a delete by key),
+        so entries for any date are dropped. A currency of None drops the whole table.
+        """
+        with self._lock:
+            stale = [key for key in self._entries
+                     if key[0] == table_name
+                     and (currency is None or key[2] is None or key[2] == currency)
+                     and (exchange_date is None or key[3] is None or key[3] == exchange_date)]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Returns hit/miss/eviction/invalidation counters and the current number of entries."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'invalidations': self.invalidations, 'entries': len(self._entries)}
+
+
+def get_default_cache():
+    """Returns the process-wide query cache used by dynamodb.query_items(use_cache=True)."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = QueryCache()
+        return _default_cache
@@ -0,0 +1,129 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+DEFAULT_CACHE_PATH = os.environ.get(
+    "NBU_RATE_CACHE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "nbu_rates_cache.sqlite"))
+DEFAULT_VOLATILE_TTL = 3600  # seconds a current-day (or future) rate is trusted
+DEFAULT_MAX_VOLATILE_ENTRIES = 1000
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+class RateCache:
+    """
+    SQLite store of NBU rates keyed by (currency, date).
+
+    Published rates for past dates never change and are kept forever. Entries fetched on or
+    before their own date ("volatile", e.g. today's rate) expire after a TTL and are capped
+    in number, evicting the oldest fetches first.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, volatile_ttl=DEFAULT_VOLATILE_TTL,
+                 max_volatile_entries=DEFAULT_MAX_VOLATILE_ENTRIES):
+        """
+        Args:
+            path (str): SQLite database file, or ':memory:'.
+            volatile_ttl (float): Seconds before a volatile entry has to be fetched again.
+            max_volatile_entries (int): Maximum number of volatile entries kept.
+        """
+        self.path = path
+        self.volatile_ttl = volatile_ttl
+        self.max_volatile_entries = max_volatile_entries
+        self.hits = self.misses = self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS rates (
+                currency TEXT NOT NULL,
+                date TEXT NOT NULL,
+                rate REAL NOT NULL,
+                exchangedate TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                volatile INTEGER NOT NULL,
+                PRIMARY KEY (currency, date)
+            )""")
+        self._conn.commit()
+
+    def get_many(self, dates, currencies):
+        """
+        Looks up a (dates x currencies) grid.
+
+        Returns:
+            tuple: A {(date_str, currency): {'rate', 'exchangedate'}} dictionary of cached cells
+            and the list of (date_str, currency) pairs that still have to be fetched.
+        """
+        expires_before = time.time() - self.volatile_ttl
+        found, missing = {}, []
+        with self._lock:
+            for date_str in dates:
+                for currency in currencies:
+                    row = self._conn.execute(
+                        "SELECT rate, exchangedate, fetched_at, volatile FROM rates WHERE currency = ? AND date = ?",
+                        (currency, date_str)).fetchone()
+                    if row and not (row[3] and row[2] < expires_before):
+                        found[(date_str, currency)] = {"rate": row[0], "exchangedate": row[1]}
+                    else:
+                        missing.append((date_str, currency))
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def get(self, date_str, currency):
+        """Returns the cached {'rate', 'exchangedate'} for one date and currency, or None."""
+        found, _ = self.get_many([date_str], [currency])
+        return found.get((date_str, currency))
+
+    def put_many(self, grid):
+        """Stores a {(date_str, currency): {'rate', 'exchangedate'}} dictionary of fetched rates."""
+        now = time.time()
+        today = datetime.now().strftime("%Y%m%d")
+        rows = [(currency, date_str, rate["rate"], rate["exchangedate"], now, int(date_str >= today))
+                for (date_str, currency), rate in grid.items()]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO rates VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._evict_volatile(now)
+            self._conn.commit()
+
+    def put(self, date_str, currency, rate):
+        """Stores one fetched {'rate', 'exchangedate'} dictionary."""
+        self.put_many({(date_str, currency): rate})
+
+    def _evict_volatile(self, now):
+        """Drops expired volatile entries, then the oldest ones above max_volatile_entries."""
+        evicted = self._conn.execute("DELETE FROM rates WHERE volatile = 1 AND fetched_at < ?",
+                                     (now - self.volatile_ttl,)).rowcount
+        evicted += self._conn.execute("""
+            DELETE FROM rates WHERE volatile = 1 AND rowid NOT IN (
+                SELECT rowid FROM rates WHERE volatile = 1 ORDER BY fetched_at DESC LIMIT ?)""",
+                                      (self.max_volatile_entries,)).rowcount
+        self.evictions += evicted
+
+    def stats(self):
+        """Returns hit/miss/eviction counters and the current number of cached entries."""
+        with self._lock:
+            entries, volatile = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(volatile), 0) FROM rates").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "entries": entries, "volatile_entries": volatile}
+
+    def clear(self):
+        """Removes every cached rate."""
+        with self._lock:
+            self._conn.execute("DELETE FROM rates")
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+def get_default_cache():
+    """Returns the process-wide cache stored at DEFAULT_CACHE_PATH."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = RateCache()
+        return _default_cache
@@ -0,0 +1,173 @@
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from aws_clients import get_client, get_resource
+import dynamodb
+
+HISTORY_TABLE = "boto3_sdk_rate_history"
+DATE_INDEX = "DateIndex"
+KEY_NAMES = ["Currency", "Date"]
+DATE_FORMATS = ("%Y-%m-%d", "%Y%m%d", "%d.%m.%Y")
+
+
+def to_iso_date(value):
+    """Normalizes YYYY-MM-DD, YYYYMMDD or dd.mm.yyyy (NBU/CSV format) dates to sortable YYYY-MM-DD."""
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized date '{value}'")
+
+
+def to_history_item(item):
+    """
+    Converts a row of the CSV export or an item of the original table to the history layout.
+
+    Both 'Exchange Date' (CSV) and 'ExchangeDate' (add_item) spellings are accepted.
+
+    Returns:
+        dict: Currency, ISO Date and numeric Rate, or None if the date or rate cannot be parsed.
+    """
+    exchange_date = item.get("Exchange Date") or item.get("ExchangeDate")
+    try:
+        return {
+            "Currency": item["Currency"],
+            "Date": to_iso_date(exchange_date),
+            "Rate": Decimal(str(item["Rate"])),
+        }
+    except (KeyError, TypeError, ValueError, InvalidOperation):
+        return None
+
+
+def create_rate_history_table(table_name=HISTORY_TABLE):
+    """
+    Creates the time-series table: one item per currency per day, sorted by ISO date.
+
+    Currency (HASH) + Date (RANGE, YYYY-MM-DD) lets a single Query return any date range of a
+    currency in order, and Rate is stored as a number. DateIndex (Date HASH, Currency RANGE)
+    serves "all currencies on a date" lookups. The table is on-demand, so migrations and
+    backfills are not throttled by a fixed provisioned rate.
+    """
+    dynamodb_resource = get_resource("dynamodb")
+
+    table = dynamodb_resource.create_table(
+        TableName=table_name,
+        KeySchema=[
+            {"AttributeName": "Currency", "KeyType": "HASH"},
+            {"AttributeName": "Date", "KeyType": "RANGE"},
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "Currency", "AttributeType": "S"},
+            {"AttributeName": "Date", "AttributeType": "S"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+        GlobalSecondaryIndexes=[
+            {
+                "IndexName": DATE_INDEX,
+                "KeySchema": [
+                    {"AttributeName": "Date", "KeyType": "HASH"},
+                    {"AttributeName": "Currency", "KeyType": "RANGE"},
+                ],
+                "Projection": {"ProjectionType": "ALL"},
+            },
+        ],
+    )
+
+    print(f"Table status: {table.table_status}")
+    table.wait_until_exists()
+    print(f"Table {table.table_name} created successfully.")
+
+
+def query_range(currency, start, end, table_name=HISTORY_TABLE):
+    """
+    Returns a currency's rates between two dates (inclusive), oldest first, with one BETWEEN key query.
+
+    Args:
+        currency (str): Currency code, e.g. 'EUR'.
+        start (str): First date, as YYYY-MM-DD, YYYYMMDD or dd.mm.yyyy.
+        end (str): Last date, in any of the same formats.
+        table_name (str): History table name.
+
+    Returns:
+        list: Items with Currency, Date (YYYY-MM-DD) and Rate (Decimal).
+    """
+    from boto3.dynamodb.conditions import Key
+
+    table = get_resource("dynamodb").Table(table_name)
+    condition = Key("Currency").eq(currency) & Key("Date").between(to_iso_date(start), to_iso_date(end))
+    return list(dynamodb.paginate(table.query, KeyConditionExpression=condition))
+
+
+def query_date(date, table_name=HISTORY_TABLE):
+    """Returns every currency's rate for one date through DateIndex."""
+    from boto3.dynamodb.conditions import Key
+
+    table = get_resource("dynamodb").Table(table_name)
+    condition = Key("Date").eq(to_iso_date(date))
+    return list(dynamodb.paginate(table.query, IndexName=DATE_INDEX, KeyConditionExpression=condition))
+
+
+def _convert(items, report):
+    """Maps source items to the history layout, counting the ones that cannot be converted."""
+    for item in items:
+        report["scanned"] += 1
+        history_item = to_history_item(item)
+        if history_item is None:
+            report["skipped"] += 1
+            continue
+        yield history_item
+
+
+def load_history_from_csv(csv_file_path, table_name=HISTORY_TABLE, max_workers=8):
+    """Streams a CSV export (or Parquet dataset) into the history table through bulk_put_items."""
+    report = {"scanned": 0, "skipped": 0}
+    stats = dynamodb.bulk_put_items(table_name, _convert(dynamodb.iter_source_rows(csv_file_path), report),
+                                    max_workers=max_workers, key_names=KEY_NAMES)
+    report.update(written=stats["rows"], failed=stats["failed_rows"], consumed_wcu=stats["consumed_wcu"])
+    print(f"Loaded {report['written']} of {report['scanned']} rows from {csv_file_path} into '{table_name}' "
+          f"({report['skipped']} unparseable, {report['failed']} failed).")
+    return report
+
+
+def migrate_to_history_table(source_table="boto3_sdk_exchange_rates", target_table=HISTORY_TABLE,
+                             total_segments=8, max_workers=8, create=True):
+    """
+    Copies the original table into the history layout.
+
+    The source is read with a parallel segmented scan and the converted items stream straight into
+    concurrent BatchWriteItem workers, so memory stays flat however large the table is. Items sharing
+    a currency and date collapse into one (the last one scanned wins).
+
+    Args:
+        source_table (str): Table with the original Currency/Rate layout.
+        target_table (str): History table name.
+        total_segments (int): Parallel scan segments.
+        max_workers (int): Concurrent BatchWriteItem workers.
+        create (bool): Create the target table first if it does not exist.
+
+    Returns:
+        dict: Items scanned, written, skipped (unparseable) and failed, consumed WCU and elapsed seconds.
+    """
+    if create:
+        try:
+            get_client("dynamodb").describe_table(TableName=target_table)
+        except get_client("dynamodb").exceptions.ResourceNotFoundException:
+            create_rate_history_table(target_table)
+
+    report = {"scanned": 0, "skipped": 0}
+    start = time.perf_counter()
+    items = dynamodb.parallel_scan(source_table, total_segments=total_segments)
+    stats = dynamodb.bulk_put_items(target_table, _convert(items, report), max_workers=max_workers,
+                                    key_names=KEY_NAMES)
+    report.update(written=stats["rows"], failed=stats["failed_rows"], consumed_wcu=stats["consumed_wcu"],
+                  seconds=round(time.perf_counter() - start, 3))
+    print(f"Migrated '{source_table}' to '{target_table}': {report['scanned']} scanned, {report['written']} "
+          f"written, {report['skipped']} skipped, {report['failed']} failed in {report['seconds']}s.")
+    return report
+
+
+if __name__ == "__main__":
+    migrate_to_history_table()
+    for item in query_range("EUR", "2022-03-01", "2022-06-30"):
+        print(item)
@@ -0,0 +1,243 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+DEFAULT_ROLLUP_PATH = os.environ.get(
+    "RATE_ROLLUPS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "rate_rollups.sqlite"))
+LEVELS = {"day": 10, "month": 7, "year": 4}  # Length of the ISO date prefix naming each bucket
+FREQUENCY_LEVELS = {"daily": "day", "monthly": "month", "yearly": "year"}
+PERIOD_FORMATS = {"day": "%Y-%m-%d", "month": "%Y-%m", "year": "%Y"}
+STATISTICS = ("mean", "min", "max", "last", "count")
+DATE_FORMATS = ("%d.%m.%Y", "%Y-%m-%d", "%Y%m%d")
+DEFAULT_CHUNK_ROWS = 5000  # Records staged per transaction
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def _iso_date(value):
+    """Normalizes dd.mm.yyyy (NBU/CSV), YYYY-MM-DD or YYYYMMDD dates to YYYY-MM-DD."""
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).strftime("%Y-%m-%d")
+        except (TypeError, ValueError):
+            continue
+    raise ValueError(f"Unrecognized date '{value}'")
+
+
+class RollupStore:
+    """
+    SQLite store of per-currency rate statistics for every day, month and year seen.
+
+    Each bucket keeps count, sum, min, max and the last rate, so mean/min/max/last for any range
+    are read from a handful of rows instead of being recomputed from raw rates. Day buckets hold
+    the latest rate ingested for that date and are the source of truth: a new day is folded into
+    its month and year incrementally, while a changed day makes its month and year be recomputed
+    from their day buckets.
+    """
+
+    def __init__(self, path=DEFAULT_ROLLUP_PATH):
+        """
+        Args:
+            path (str): SQLite database file, or ':memory:'.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS rollups (
+                level TEXT NOT NULL,
+                currency TEXT NOT NULL,
+                period TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                sum REAL NOT NULL,
+                min REAL NOT NULL,
+                max REAL NOT NULL,
+                last_date TEXT NOT NULL,
+                last_rate REAL NOT NULL,
+                PRIMARY KEY (level, currency, period)
+            )""")
+        # Per-connection scratch tables used while a chunk of records is applied
+        self._conn.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS staged (
+                currency TEXT NOT NULL,
+                period TEXT NOT NULL,
+                rate REAL NOT NULL,
+                previous REAL,
+                PRIMARY KEY (currency, period)
+            )""")
+        self._conn.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS stale (
+                level TEXT NOT NULL,
+                currency TEXT NOT NULL,
+                period TEXT NOT NULL,
+                PRIMARY KEY (level, currency, period)
+            )""")
+        self._conn.commit()
+
+    def add_rates(self, records, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """
+        Folds exchange rate records into the rollups, chunk_rows records at a time.
+
+        Each chunk is staged with one executemany and applied with a few set-based statements, so memory
+        stays at one chunk however many records stream in, and the lock is released between chunks.
+
+        Args:
+            records (iterable): Records with Currency, Rate and Exchange Date (or ExchangeDate) keys,
+                as produced by get_uah_exchange_combined_rates or read from the CSV export.
+            chunk_rows (int): Records staged and committed together.
+
+        Returns:
+            int: Number of days added or changed; records repeating a stored rate are skipped. A day
+            repeated in several chunks is counted once per chunk.
+        """
+        changed = 0
+        chunk = []
+        for record in records:
+            try:
+                date = _iso_date(record.get("Exchange Date") or record.get("ExchangeDate"))
+                chunk.append((record["Currency"], date, float(record["Rate"])))
+            except (KeyError, TypeError, ValueError):
+                continue  # Rows without a usable date or rate are left out of the statistics
+            if len(chunk) >= chunk_rows:
+                changed += self._add_chunk(chunk)
+                chunk = []
+        if chunk:
+            changed += self._add_chunk(chunk)
+        return changed
+
+    def _add_chunk(self, chunk):
+        """Applies one chunk of (currency, iso_date, rate) rows in a single transaction."""
+        with self._lock:
+            try:
+                # A later row for the same day replaces an earlier one, like the day bucket itself
+                self._conn.executemany("INSERT OR REPLACE INTO staged (currency, period, rate) VALUES (?, ?, ?)",
+                                       chunk)
+                self._conn.execute("""
+                    UPDATE staged SET previous = (SELECT last_rate FROM rollups WHERE level = 'day'
+                                                  AND currency = staged.currency AND period = staged.period)""")
+                self._conn.execute("DELETE FROM staged WHERE previous = rate")
+                changed = self._conn.execute("SELECT COUNT(*) FROM staged").fetchone()[0]
+                self._conn.execute("""
+                    INSERT OR REPLACE INTO rollups
+                    SELECT 'day', currency, period, 1, rate, rate, rate, period, rate FROM staged""")
+                for level in ("month", "year"):
+                    length = LEVELS[level]
+                    # A changed day makes its month and year be recomputed from the day buckets
+                    self._conn.execute("""
+                        INSERT OR IGNORE INTO stale SELECT ?, currency, substr(period, 1, ?)
+                        FROM staged WHERE previous IS NOT NULL""", (level, length))
+                    # New days are folded in; SQLite takes the bare "rate" from the row holding MAX(period)
+                    self._conn.execute("""
+                        INSERT INTO rollups
+                        SELECT ?, currency, substr(period, 1, ?) AS bucket, COUNT(*), SUM(rate), MIN(rate),
+                               MAX(rate), MAX(period), rate
+                        FROM staged
+                        WHERE previous IS NULL AND NOT EXISTS (
+                            SELECT 1 FROM stale WHERE stale.level = ? AND stale.currency = staged.currency
+                            AND stale.period = substr(staged.period, 1, ?))
+                        GROUP BY currency, bucket
+                        ON CONFLICT (level, currency, period) DO UPDATE SET
+                            count = count + excluded.count,
+                            sum = sum + excluded.sum,
+                            min = MIN(min, excluded.min),
+                            max = MAX(max, excluded.max),
+                            last_rate = CASE WHEN excluded.last_date >= last_date
+                                        THEN excluded.last_rate ELSE last_rate END,
+                            last_date = MAX(last_date, excluded.last_date)""", (level, length, level, length))
+                for level, currency, period in self._conn.execute("SELECT * FROM stale").fetchall():
+                    self._recompute(level, currency, period)
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+            finally:
+                self._conn.execute("DELETE FROM staged")
+                self._conn.execute("DELETE FROM stale")
+                self._conn.commit()
+        return changed
+
+    def _recompute(self, level, currency, period):
+        """Rebuilds a month or year bucket from its day buckets after a day changed."""
+        self._conn.execute("""
+            INSERT OR REPLACE INTO rollups
+            SELECT ?, currency, ?, COUNT(*), SUM(last_rate), MIN(last_rate), MAX(last_rate), MAX(period),
+                   (SELECT last_rate FROM rollups WHERE level = 'day' AND currency = ? AND period LIKE ? || '%'
+                    ORDER BY period DESC LIMIT 1)
+            FROM rollups WHERE level = 'day' AND currency = ? AND period LIKE ? || '%'
+            GROUP BY currency""", (level, period, currency, period, currency, period))
+
+    def get_rollups(self, currencies=None, level="month", start=None, end=None):
+        """
+        Returns rollup rows, ordered by currency and period.
+
+        Args:
+            currencies (list): Currencies to return. Defaults to all.
+            level (str): 'day', 'month' or 'year'.
+            start (str): First date to include (any supported format); buckets are matched by their period.
+            end (str): Last date to include.
+
+        Returns:
+            list: Dictionaries with Currency, Period, Count, Mean, Min, Max, Last and LastDate keys.
+        """
+        sql = "SELECT currency, period, count, sum, min, max, last_rate, last_date FROM rollups WHERE level = ?"
+        params = [level]
+        if currencies:
+            sql += f" AND currency IN ({', '.join('?' * len(currencies))})"
+            params += list(currencies)
+        if start:
+            sql += " AND period >= ?"
+            params.append(_iso_date(start)[:LEVELS[level]])
+        if end:
+            sql += " AND period <= ?"
+            params.append(_iso_date(end)[:LEVELS[level]])
+        sql += " ORDER BY currency, period"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [{"Currency": currency, "Period": period, "Count": count, "Mean": total / count, "Min": low,
+                 "Max": high, "Last": last_rate, "LastDate": last_date}
+                for currency, period, count, total, low, high, last_rate, last_date in rows]
+
+    def pivot(self, currencies=None, start=None, end=None, freq="monthly", how="mean"):
+        """
+        Returns rollups in the shape of plotting.aggregate_rates: indexed by period start, one column per currency.
+
+        Args:
+            currencies (list): Currencies to include. Defaults to every stored currency.
+            start (str): First date to include.
+            end (str): Last date to include.
+            freq (str): 'daily', 'monthly' or 'yearly'.
+            how (str): 'mean', 'min', 'max', 'last' or 'count'.
+        """
+        import pandas as pd  # Only needed when rollups are turned into charts
+
+        if how not in STATISTICS:
+            raise ValueError(f"Unsupported statistic '{how}', expected one of {STATISTICS}")
+        level = FREQUENCY_LEVELS[freq]
+        rows = self.get_rollups(currencies, level, start, end)
+        df = pd.DataFrame.from_records(rows, columns=["Currency", "Period", "Count", "Mean", "Min", "Max", "Last"])
+        df["Period"] = pd.to_datetime(df["Period"], format=PERIOD_FORMATS[level])
+        pivot = df.pivot(index="Period", columns="Currency", values=how.capitalize())
+        pivot.index.name = "Exchange Date"
+        if currencies is not None:
+            pivot = pivot.reindex(columns=[c for c in currencies if c in pivot.columns])
+        return pivot
+
+    def clear(self):
+        """Removes every rollup."""
+        with self._lock:
+            self._conn.execute("DELETE FROM rollups")
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+def get_default_store():
+    """Returns the process-wide rollup store at DEFAULT_ROLLUP_PATH (override with RATE_ROLLUPS)."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = RollupStore()
+        return _default_store
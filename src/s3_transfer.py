@@ -0,0 +1,214 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from aws_clients import get_client
+
+MB = 1024 * 1024
+DEFAULT_MULTIPART_THRESHOLD = 8 * MB
+DEFAULT_CHUNK_SIZE = 8 * MB
+DEFAULT_MAX_CONCURRENCY = 10
+DEFAULT_SYNC_WORKERS = 8
+
+
+def make_transfer_config(multipart_threshold=DEFAULT_MULTIPART_THRESHOLD, chunk_size=DEFAULT_CHUNK_SIZE,
+                         max_concurrency=DEFAULT_MAX_CONCURRENCY, use_threads=True):
+    """
+    Builds the TransferConfig used for multipart, parallel uploads and downloads.
+
+    Args:
+        multipart_threshold (int): File size in bytes from which multipart transfers are used.
+        chunk_size (int): Size in bytes of each multipart part / ranged GET.
+        max_concurrency (int): Parts transferred in parallel for one file.
+        use_threads (bool): Set to False to transfer parts sequentially in the calling thread.
+    """
+    from boto3.s3.transfer import TransferConfig
+
+    return TransferConfig(multipart_threshold=multipart_threshold, multipart_chunksize=chunk_size,
+                          max_concurrency=max_concurrency, use_threads=use_threads)
+
+
+class TransferProgress:
+    """Thread-safe boto3 transfer callback that tracks bytes moved and reports throughput."""
+
+    def __init__(self, label, total_bytes=None, report_interval=1.0, verbose=True):
+        """
+        Args:
+            label (str): Name printed with every progress line, e.g. the object key.
+            total_bytes (int): Expected size, used for percentages when known.
+            report_interval (float): Minimum seconds between progress lines.
+            verbose (bool): Set to False to only collect numbers without printing.
+        """
+        self.label = label
+        self.total_bytes = total_bytes
+        self.report_interval = report_interval
+        self.verbose = verbose
+        self.bytes_transferred = 0
+        self.started = time.perf_counter()
+        self._last_report = self.started
+        self._lock = threading.Lock()
+
+    def __call__(self, bytes_amount):
+        with self._lock:
+            self.bytes_transferred += bytes_amount
+            now = time.perf_counter()
+            finished = self.total_bytes is not None and self.bytes_transferred >= self.total_bytes
+            if self.verbose and (finished or now - self._last_report >= self.report_interval):
+                self._last_report = now
+                print(self._format_line(now))
+
+    def _format_line(self, now):
+        done = f"{self.bytes_transferred / MB:.1f} MB"
+        if self.total_bytes:
+            done += f" / {self.total_bytes / MB:.1f} MB ({100 * self.bytes_transferred / self.total_bytes:.0f}%)"
+        return f"{self.label}: {done} at {self.throughput(now) / MB:.2f} MB/s"
+
+    def throughput(self, now=None):
+        """Average bytes per second since the transfer started."""
+        elapsed = (now or time.perf_counter()) - self.started
+        return self.bytes_transferred / elapsed if elapsed > 0 else 0.0
+
+    def summary(self):
+        """Returns bytes, seconds and MB/s for the transfer so far."""
+        elapsed = time.perf_counter() - self.started
+        return {"bytes": self.bytes_transferred, "seconds": round(elapsed, 3),
+                "mb_per_sec": round(self.throughput() / MB, 2)}
+
+
+def upload_file(bucket_name, file_path, object_name=None, config=None, verbose=True):
+    """
+    Uploads a file with multipart, parallel parts straight from disk.
+
+    Args:
+        bucket_name (str): Name of the S3 bucket.
+        file_path (str): Path to the file to upload.
+        object_name (str): S3 object name. If not specified, the file name is used.
+        config (TransferConfig): Transfer settings. Defaults to make_transfer_config().
+        verbose (bool): Print progress lines while uploading.
+
+    Returns:
+        dict: Bytes, seconds and MB/s of the upload.
+    """
+    object_name = object_name or os.path.basename(file_path)
+    progress = TransferProgress(f"{bucket_name}/{object_name}", os.path.getsize(file_path), verbose=verbose)
+    get_client('s3').upload_file(file_path, bucket_name, object_name,
+                                 Config=config or make_transfer_config(), Callback=progress)
+    return progress.summary()
+
+
+def download_file(bucket_name, object_name, file_path, config=None, verbose=True, total_bytes=None):
+    """
+    Downloads an object with parallel ranged GETs, streaming parts to disk.
+
+    Args:
+        bucket_name (str): Name of the S3 bucket.
+        object_name (str): S3 object name.
+        file_path (str): Local destination path.
+        config (TransferConfig): Transfer settings. Defaults to make_transfer_config().
+        verbose (bool): Print progress lines while downloading.
+        total_bytes (int): Object size if already known, saving a HeadObject call.
+
+    Returns:
+        dict: Bytes, seconds and MB/s of the download.
+    """
+    s3_client = get_client('s3')
+    if total_bytes is None:
+        total_bytes = s3_client.head_object(Bucket=bucket_name, Key=object_name)['ContentLength']
+    progress = TransferProgress(f"{bucket_name}/{object_name}", total_bytes, verbose=verbose)
+    s3_client.download_file(bucket_name, object_name, file_path,
+                            Config=config or make_transfer_config(), Callback=progress)
+    return progress.summary()
+
+
+def _list_objects(bucket_name, prefix):
+    """Returns {key: (size, last_modified timestamp)} for every object under a prefix, across all pages."""
+    objects = {}
+    paginator = get_client('s3').get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            objects[obj['Key']] = (obj['Size'], obj['LastModified'].timestamp())
+    return objects
+
+
+def _run_transfers(transfers, max_workers):
+    """Runs (label, callable) transfers on a worker pool and aggregates their summaries."""
+    started = time.perf_counter()
+    total_bytes = failed = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(transfer): label for label, transfer in transfers}
+        for future, label in futures.items():
+            try:
+                total_bytes += future.result()['bytes']
+            except Exception as e:
+                failed += 1
+                print(f"Error transferring {label}: {e}")
+    elapsed = time.perf_counter() - started
+    return {"files": len(transfers) - failed, "failed": failed, "bytes": total_bytes, "seconds": round(elapsed, 3),
+            "mb_per_sec": round(total_bytes / MB / elapsed, 2) if elapsed > 0 else 0.0}
+
+
+def sync_directory_to_s3(local_dir, bucket_name, prefix="", max_workers=DEFAULT_SYNC_WORKERS, config=None):
+    """
+    Uploads every file under a directory to an S3 prefix, many files at a time.
+
+    Files whose object already exists with the same size and a newer modification time are skipped.
+
+    Args:
+        local_dir (str): Directory to upload recursively.
+        bucket_name (str): Name of the S3 bucket.
+        prefix (str): Key prefix, e.g. 'exports/2022/'.
+        max_workers (int): Files transferred concurrently.
+        config (TransferConfig): Per-file transfer settings.
+
+    Returns:
+        dict: Files moved, failures, skipped files, bytes, seconds and aggregate MB/s.
+    """
+    remote = _list_objects(bucket_name, prefix)
+    transfers, skipped = [], 0
+    for root, _, files in os.walk(local_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            key = prefix + os.path.relpath(path, local_dir).replace(os.sep, '/')
+            stat = os.stat(path)
+            if key in remote and remote[key][0] == stat.st_size and remote[key][1] >= int(stat.st_mtime):
+                skipped += 1
+                continue
+            transfers.append((key, lambda path=path, key=key: upload_file(bucket_name, path, key, config,
+                                                                          verbose=False)))
+
+    report = dict(_run_transfers(transfers, max_workers), skipped=skipped)
+    print(f"Synced {local_dir} to s3://{bucket_name}/{prefix}: {report}")
+    return report
+
+
+def sync_s3_prefix_to_directory(bucket_name, prefix, local_dir, max_workers=DEFAULT_SYNC_WORKERS, config=None):
+    """
+    Downloads every object under an S3 prefix into a directory, many objects at a time.
+
+    Local files with the same size and a newer modification time are skipped.
+
+    Args:
+        bucket_name (str): Name of the S3 bucket.
+        prefix (str): Key prefix to download.
+        local_dir (str): Destination directory; key paths below the prefix are recreated.
+        max_workers (int): Objects transferred concurrently.
+        config (TransferConfig): Per-object transfer settings.
+
+    Returns:
+        dict: Files moved, failures, skipped files, bytes, seconds and aggregate MB/s.
+    """
+    transfers, skipped = [], 0
+    for key, (size, last_modified) in _list_objects(bucket_name, prefix).items():
+        if key.endswith('/'):
+            continue  # Folder placeholder objects
+        path = os.path.join(local_dir, *key[len(prefix):].lstrip('/').split('/'))
+        if os.path.exists(path) and os.path.getsize(path) == size and os.path.getmtime(path) >= last_modified:
+            skipped += 1
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        transfers.append((key, lambda key=key, path=path, size=size: download_file(
+            bucket_name, key, path, config, verbose=False, total_bytes=size)))
+
+    report = dict(_run_transfers(transfers, max_workers), skipped=skipped)
+    print(f"Synced s3://{bucket_name}/{prefix} to {local_dir}: {report}")
+    return report
@@ -0,0 +1,58 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+BENCHMARKS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks')
+sys.path.insert(0, SRC_DIR)
+
+# Fake credentials and throwaway local caches, set before any src module reads them at import
+_workdir = tempfile.mkdtemp(prefix="tests_")
+os.environ.update({
+    "AWS_ACCESS_KEY_ID": "testing",
+    "AWS_SECRET_ACCESS_KEY": "testing",
+    "AWS_SESSION_TOKEN": "testing",
+    "AWS_DEFAULT_REGION": "us-east-1",
+    "NBU_RATE_CACHE": os.path.join(_workdir, "nbu_rates.sqlite"),
+    "RATE_ROLLUPS": os.path.join(_workdir, "rollups.sqlite"),
+})
+
+
+@pytest.fixture
+def aws():
+    """Runs the test against moto's in-memory AWS; registry clients are rebuilt inside the mock."""
+    from moto import mock_aws
+    import aws_clients
+
+    with mock_aws():
+        aws_clients.reset()
+        yield
+    aws_clients.reset()
+
+
+@pytest.fixture
+def s3_bucket(aws):
+    """An empty bucket in moto's in-memory S3."""
+    import aws_clients
+
+    aws_clients.get_client('s3').create_bucket(Bucket="test-bucket")
+    return "test-bucket"
+
+
+@pytest.fixture
+def fake_nbu(monkeypatch):
+    """benchmarks/fake_nbu.py on a free port, with nbu_fetcher (and child processes) pointed at it."""
+    sys.path.insert(0, BENCHMARKS_DIR)
+    from fake_nbu import start_fake_nbu
+    import nbu_fetcher
+
+    server = start_fake_nbu()
+    monkeypatch.setattr(nbu_fetcher, "NBU_API_URL", server.api_url)
+    monkeypatch.setattr(nbu_fetcher, "NBU_PERIOD_URL", server.period_url)
+    monkeypatch.setenv("NBU_API_URL", server.api_url)
+    monkeypatch.setenv("NBU_PERIOD_URL", server.period_url)
+    yield server
+    server.shutdown()
+    server.server_close()
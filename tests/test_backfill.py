@@ -0,0 +1,87 @@
+import csv
+import io
+import socket
+import threading
+from datetime import datetime
+
+import backfill
+from aws_clients import get_client
+
+BUCKET = "backfill-bucket"
+DATES = backfill.date_range("20240101", "20240110")
+CURRENCIES = ["USD", "EUR"]
+
+
+def _merged_records(output_key):
+    body = get_client("s3").get_object(Bucket=BUCKET, Key=output_key)["Body"].read().decode("utf-8")
+    return list(csv.DictReader(io.StringIO(body)))
+
+
+def _check_merged(records, fake_rate):
+    assert [(r["Exchange Date"], r["Currency"]) for r in records] == [
+        (datetime.strptime(date, "%Y%m%d").strftime("%d.%m.%Y"), currency) for date in DATES for currency in CURRENCIES]
+    for record in records:
+        expected = fake_rate(record["Currency"], datetime.strptime(record["Exchange Date"], "%d.%m.%Y"))
+        assert float(record["Rate"]) == expected
+
+
+def _start_job(job_id):
+    get_client("s3").create_bucket(Bucket=BUCKET)
+    return backfill.start_backfill(BUCKET, job_id, DATES, CURRENCIES, shard_days=3)
+
+
+def _run_workers(job_id, count, **kwargs):
+    processed = {}
+    threads = [threading.Thread(target=lambda name=f"worker-{i}": processed.__setitem__(
+        name, backfill.run_worker(BUCKET, job_id, worker_id=name, use_cache=False, **kwargs))) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return processed
+
+
+def test_workers_take_over_expired_lease_and_merge(aws, fake_nbu):
+    from fake_nbu import fake_rate
+
+    shards = _start_job("expired")
+    # A worker that died holding shard 00001: its lease has already run out
+    assert backfill.claim_shard("expired", "00001", "dead-worker", lease_seconds=-1)
+
+    processed = _run_workers("expired", 2)
+
+    assert sorted(shard for shards_done in processed.values() for shard in shards_done) == \
+        [shard["shard_id"] for shard in shards]
+    assert set(backfill.get_shard_states("expired").values()) == {"done"}
+    result = backfill.merge_backfill(BUCKET, "expired")
+    assert (result["rows"], result["pending"], result["failed"]) == (len(DATES) * len(CURRENCIES), [], [])
+    _check_merged(_merged_records(result["output_key"]), fake_rate)
+
+
+def test_failing_shard_is_marked_failed(aws, fake_nbu):
+    _start_job("broken")
+    get_client("s3").put_object(Bucket=BUCKET, Key=backfill._job_key("broken", "shards", "00002.json"), Body=b"{")
+
+    # Every claim's lease is already expired: without the attempt limit the worker would retry shard 00002 forever
+    processed = _run_workers("broken", 1, lease_seconds=-1, max_attempts=2)
+
+    assert processed == {"worker-0": ["00000", "00001", "00003"]}
+    assert backfill.get_shard_states("broken") == {"00000": "done", "00001": "done", "00002": "failed",
+                                                   "00003": "done"}
+    result = backfill.merge_backfill(BUCKET, "broken")
+    assert (result["rows"], result["pending"], result["failed"]) == (0, ["00002"], ["00002"])
+
+
+def test_run_local_end_to_end(fake_nbu):
+    from fake_nbu import fake_rate
+    import aws_clients
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    result = backfill.run_local(BUCKET, "local", DATES, CURRENCIES, workers=2, shard_days=3, port=port)
+
+    assert (result["rows"], result["pending"]) == (len(DATES) * len(CURRENCIES), [])
+    assert result["output_key"] == "backfill/local/exchange_rates.csv"
+    aws_clients.reset()
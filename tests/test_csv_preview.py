@@ -0,0 +1,47 @@
+import pytest
+
+import csv_preview
+from aws_clients import get_client
+
+# The last data row repeats the header text
+CSV_TEXT = "Currency,Rate\nUSD,41.2\nCurrency,Rate\nEUR,43.5\nCurrency,Rate\n"
+
+
+def _read_range(data):
+    return lambda start, end: data[start:end]
+
+
+def _printed_rows(output):
+    """Data rows of a printed grid: every '| ...' line after the header separator."""
+    body = output.split("=+\n", 1)[1]
+    return [[cell.strip() for cell in line.strip("|").split("|")] for line in body.splitlines() if line.startswith("|")]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 16, 1024])
+def test_tail_lines_drops_only_the_real_header(chunk_size):
+    data = CSV_TEXT.encode()
+
+    lines = csv_preview._tail_lines(_read_range(data), len(data), 10, chunk_size, skip_header=True)
+    assert lines == ["USD,41.2\n", "Currency,Rate\n", "EUR,43.5\n", "Currency,Rate\n"]
+
+    # A window that stops short of the start drops the partial first line, never a complete data row
+    assert csv_preview._tail_lines(_read_range(data), len(data), 2, chunk_size, skip_header=True) == \
+        ["EUR,43.5\n", "Currency,Rate\n"]
+
+
+def test_tail_preview_keeps_rows_equal_to_the_header(tmp_path, capsys):
+    path = tmp_path / "rates.csv"
+    path.write_text(CSV_TEXT)
+
+    csv_preview.display_csv_with_header(str(path), mode="tail", rows=3)
+
+    assert _printed_rows(capsys.readouterr().out) == [["Currency", "Rate"], ["EUR", "43.5"], ["Currency", "Rate"]]
+
+
+def test_s3_tail_preview_keeps_rows_equal_to_the_header(s3_bucket, capsys):
+    get_client("s3").put_object(Bucket=s3_bucket, Key="rates.csv", Body=CSV_TEXT.encode())
+
+    csv_preview.display_s3_csv_with_header(s3_bucket, "rates.csv", mode="tail", rows=10, chunk_size=8)
+
+    assert _printed_rows(capsys.readouterr().out) == [
+        ["USD", "41.2"], ["Currency", "Rate"], ["EUR", "43.5"], ["Currency", "Rate"]]
@@ -0,0 +1,27 @@
+import dynamodb
+import query_cache
+
+TABLE = "boto3_sdk_exchange_rates"
+
+
+def _write_csv(path, rows):
+    lines = ["Currency,Rate,ExchangeDate"] + [",".join(row) for row in rows]
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def test_serial_load_invalidates_cached_queries(aws, tmp_path):
+    dynamodb.create_dynamodb_table()
+    dynamodb.add_item(TABLE, "USD", "41.1", "01.01.2025")
+    cache = query_cache.get_default_cache()
+    cache.clear()
+
+    assert len(dynamodb.query_items(TABLE, currency="USD", use_cache=True)) == 1
+    assert len(dynamodb.query_items(TABLE, currency="USD", use_cache=True)) == 1
+    misses = cache.stats()['misses']
+
+    csv_path = _write_csv(tmp_path / "rates.csv", [("USD", "41.2", "02.01.2025"), ("EUR", "43.5", "02.01.2025")])
+    dynamodb.load_items_from_csv_to_table(TABLE, csv_path)
+
+    assert len(dynamodb.query_items(TABLE, currency="USD", use_cache=True)) == 2
+    assert cache.stats()['misses'] == misses + 1
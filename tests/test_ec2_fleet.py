@@ -0,0 +1,49 @@
+import aws_clients
+import ec2_fleet
+from aws_clients import get_client
+
+UNKNOWN_ID = "i-0123456789abcdef0"
+
+
+def _run_instances(count):
+    response = get_client("ec2", region_name=ec2_fleet.REGION).run_instances(
+        ImageId=ec2_fleet.DEFAULT_IMAGE_ID, InstanceType=ec2_fleet.DEFAULT_INSTANCE_TYPE, MinCount=count,
+        MaxCount=count)
+    return [instance["InstanceId"] for instance in response["Instances"]]
+
+
+def test_unknown_instance_is_isolated_by_bisection(aws):
+    instance_ids = _run_instances(64)
+    calls = []
+
+    def count_call(**kwargs):
+        calls.append(1)
+
+    aws_clients.register_event_handler("before-call.ec2.DescribeInstances", count_call)
+    try:
+        result = ec2_fleet.wait_for_state(instance_ids + [UNKNOWN_ID], "running", poll_interval=0, timeout=0)
+    finally:
+        aws_clients.unregister_event_handler("before-call.ec2.DescribeInstances", count_call)
+
+    assert sorted(result["ready"]) == sorted(instance_ids)
+    assert result["failed"] == {UNKNOWN_ID: "unknown"}
+    # Halving 65 IDs down to the unknown one, instead of describing all 65 one by one
+    assert len(calls) <= 1 + 2 * 7
+
+
+def test_known_instances_use_one_call_per_chunk(aws, monkeypatch):
+    instance_ids = _run_instances(10)
+    monkeypatch.setattr(ec2_fleet, "INSTANCE_IDS_PER_CALL", 4)
+    calls = []
+
+    def count_call(params, **kwargs):
+        calls.append(len(params["InstanceIds"]))
+
+    aws_clients.register_event_handler("provide-client-params.ec2.DescribeInstances", count_call)
+    try:
+        result = ec2_fleet.wait_for_state(instance_ids, "running", poll_interval=0, timeout=0)
+    finally:
+        aws_clients.unregister_event_handler("provide-client-params.ec2.DescribeInstances", count_call)
+
+    assert sorted(result["ready"]) == sorted(instance_ids) and result["failed"] == {}
+    assert sorted(calls) == [2, 4, 4]
@@ -0,0 +1,53 @@
+import socket
+
+import pytest
+import requests
+
+import instrumentation
+import nbu_fetcher
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    monkeypatch.setattr(nbu_fetcher.time, "sleep", lambda seconds: None)
+    instrumentation.get_metrics().reset()
+    instrumentation.enable()
+    yield instrumentation.get_metrics()
+    instrumentation.disable()
+    instrumentation.get_metrics().reset()
+
+
+def _record(metrics, operation):
+    return next(record for record in metrics.summary() if (record["source"], record["operation"]) == ("nbu", operation))
+
+
+def test_nbu_retries_exclude_the_final_attempt(fake_nbu, metrics):
+    fake_nbu.error_rate = 1.0
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        nbu_fetcher.fetch_json("exchange", {"valcode": "USD", "date": "20240102"}, retries=2)
+
+    record = _record(metrics, "exchange")
+    # Three attempts, of which only the first two were followed by another one
+    assert (record["calls"], record["errors"], record["retries"]) == (3, 3, 2)
+
+
+def test_nbu_retries_count_connection_errors(metrics):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        base_url = f"http://127.0.0.1:{sock.getsockname()[1]}"  # Nothing listens once the socket is closed
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        nbu_fetcher.fetch_json("exchange", {"date": "20240102"}, retries=1, base_url=base_url)
+
+    assert _record(metrics, "exchange")["retries"] == 1
+
+
+def test_disable_detaches_the_retry_hook(fake_nbu, metrics):
+    instrumentation.disable()
+    fake_nbu.error_rate = 1.0
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        nbu_fetcher.fetch_json("exchange", {"valcode": "USD", "date": "20240102"}, retries=1)
+
+    assert metrics.summary() == []
@@ -0,0 +1,174 @@
+import time
+from datetime import datetime
+
+import pytest
+import requests
+
+import nbu_fetcher
+
+
+@pytest.fixture(autouse=True)
+def fresh_session(monkeypatch):
+    """Each test starts without the shared session, so pool sizes do not leak between tests."""
+    monkeypatch.setattr(nbu_fetcher, "_session", None)
+    monkeypatch.setattr(nbu_fetcher, "_pool_size", 0)
+
+
+def _expected(currency, date_str):
+    from fake_nbu import fake_rate
+
+    day = datetime.strptime(date_str, "%Y%m%d")
+    return {currency: {"rate": fake_rate(currency, day), "exchangedate": day.strftime("%d.%m.%Y")}}
+
+
+def test_results_follow_input_order(fake_nbu):
+    fake_nbu.latency = 0.01
+    pairs = [(f"202401{day:02d}", currency) for day in range(1, 11) for currency in ("USD", "EUR", "XXX")]
+
+    results = nbu_fetcher.fetch_exchange_rates(pairs, max_workers=8, rate_limit=None)
+
+    # XXX is not published, so its slots stay None in place
+    assert results == [None if currency == "XXX" else _expected(currency, date) for date, currency in pairs]
+    assert fake_nbu.requests == len(pairs)
+
+
+@pytest.mark.parametrize("status", [503, 429])
+def test_retryable_status_is_retried_with_jitter(fake_nbu, monkeypatch, status):
+    from fake_nbu import rate_record
+
+    fake_nbu.error_rate, fake_nbu.error_status = 1.0, status
+    delays = []
+
+    def sleep(seconds):
+        delays.append(seconds)
+        if len(delays) == 2:
+            fake_nbu.error_rate = 0.0  # The third attempt succeeds
+
+    monkeypatch.setattr(nbu_fetcher.time, "sleep", sleep)
+    data = nbu_fetcher.fetch_json("exchange", {"valcode": "USD", "date": "20240102"}, retries=3, backoff=0.5)
+
+    assert data == [rate_record("USD", datetime(2024, 1, 2))]
+    assert fake_nbu.requests == 3
+    # Full jitter: each delay is drawn from [0, backoff * 2 ** attempt]
+    assert 0 <= delays[0] <= 0.5 and 0 <= delays[1] <= 1.0
+
+
+def test_gives_up_after_retries(fake_nbu, monkeypatch):
+    fake_nbu.error_rate = 1.0
+    monkeypatch.setattr(nbu_fetcher.time, "sleep", lambda seconds: None)
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        nbu_fetcher.fetch_json("exchange", {"valcode": "USD", "date": "20240102"}, retries=2)
+    assert fake_nbu.requests == 3
+
+    # fetch_exchange_rates reports the failed pair as None instead of raising
+    assert nbu_fetcher.fetch_exchange_rates([("20240102", "USD")], rate_limit=None, retries=0) == [None]
+
+
+def test_token_bucket_limits_request_starts():
+    bucket = nbu_fetcher.TokenBucket(rate=20, capacity=1)
+    started = time.perf_counter()
+    for _ in range(11):
+        bucket.acquire()
+    # One token up front, then ten more at 20 per second
+    assert time.perf_counter() - started >= 0.45
+
+
+def test_rate_limit_applies_across_workers(fake_nbu):
+    pairs = [(f"202401{day:02d}", "USD") for day in range(1, 31)]
+
+    started = time.perf_counter()
+    nbu_fetcher.fetch_exchange_rates(pairs, max_workers=8, rate_limit=20)
+
+    # A one second burst of 20 requests, then the remaining 10 at 20 per second
+    assert time.perf_counter() - started >= 0.45
+    assert fake_nbu.requests == len(pairs)
+
+
+def test_session_pool_grows_on_demand():
+    session = nbu_fetcher.get_session(pool_size=16)
+    assert session.get_adapter("http://127.0.0.1")._pool_maxsize == 16
+
+    assert nbu_fetcher.get_session(pool_size=32) is session
+    assert session.get_adapter("http://127.0.0.1")._pool_maxsize == 32
+    assert session.get_adapter("https://bank.gov.ua")._pool_maxsize == 32
+
+    # A smaller request keeps the larger pool
+    assert nbu_fetcher.get_session(pool_size=4) is session
+    assert session.get_adapter("http://127.0.0.1")._pool_maxsize == 32
+
+
+def test_plan_prefers_fewest_requests():
+    dates = [f"202401{day:02d}" for day in range(1, 31)]
+
+    # One currency over a month: a single period request
+    assert nbu_fetcher.plan_requests(dates, ["USD"]) == [("period", "20240101", "20240130", "USD")]
+    # Many currencies on a few dates: one all-currency request per date
+    assert nbu_fetcher.plan_requests(["20240103", "20240102"], ["USD", "EUR", "GBP"]) == \
+        [("date", "20240102"), ("date", "20240103")]
+    # One cell: every shape costs one request and the smallest payload wins
+    assert nbu_fetcher.plan_requests(["20240102"], ["USD"]) == [("pair", "20240102", "USD")]
+    # Duplicate dates and currencies are planned once
+    assert nbu_fetcher.plan_requests(["20240102", "20240102"], ["USD", "USD"]) == [("pair", "20240102", "USD")]
+
+
+def test_plan_splits_long_ranges_and_honours_forced_mode():
+    dates = ["20230101", "20230601", "20240101", "20240301"]
+
+    assert nbu_fetcher.plan_requests(dates, ["USD"], mode="period", max_period_days=366) == [
+        ("period", "20230101", "20240101", "USD"), ("period", "20240301", "20240301", "USD")]
+    assert nbu_fetcher.plan_requests(dates[:1], ["USD", "EUR"], mode="pair") == [
+        ("pair", "20230101", "USD"), ("pair", "20230101", "EUR")]
+    with pytest.raises(ValueError):
+        nbu_fetcher.plan_requests(dates, ["USD"], mode="weekly")
+
+
+def _period_records(*days):
+    """Period response records (date, currency, rate, exchangedate) for USD with the rate set to the day number."""
+    return [(day, "USD", float(day[-2:]), f"{day[6:]}.{day[4:6]}.{day[:4]}") for day in days]
+
+
+def test_fill_period_carries_rates_over_weekends_and_holidays():
+    grid = {}
+    # Friday 05.01, then nothing until Tuesday 09.01 (Monday 08.01 treated as a holiday)
+    records = _period_records("20240104", "20240105", "20240109")
+    wanted = {"20240105", "20240106", "20240107", "20240108", "20240109", "20240120"}
+
+    nbu_fetcher._fill_period(grid, ("period", "20240105", "20240109", "USD"), records, wanted)
+
+    assert {date: cell["rate"] for (date, _), cell in grid.items()} == {
+        "20240105": 5.0, "20240106": 5.0, "20240107": 5.0, "20240108": 5.0, "20240109": 9.0}
+    # Filled dates carry their own date, as NBU reports them
+    assert grid[("20240107", "USD")]["exchangedate"] == "07.01.2024"
+
+
+def test_fill_period_gap_at_range_start():
+    grid = {}
+    # The range starts on Saturday 06.01; the lookback days supply Friday's rate
+    nbu_fetcher._fill_period(grid, ("period", "20240106", "20240108", "USD"),
+                             _period_records("20240105", "20240108"), {"20240106", "20240107", "20240108"})
+    assert {date: cell["rate"] for (date, _), cell in grid.items()} == {
+        "20240106": 5.0, "20240107": 5.0, "20240108": 8.0}
+
+    # Without any earlier rate the leading gap stays empty rather than borrowing a later one
+    grid = {}
+    nbu_fetcher._fill_period(grid, ("period", "20240106", "20240108", "USD"),
+                             _period_records("20240108"), {"20240106", "20240107", "20240108"})
+    assert list(grid) == [("20240108", "USD")]
+
+
+def test_fill_period_single_day_range():
+    grid = {}
+    nbu_fetcher._fill_period(grid, ("period", "20240107", "20240107", "USD"),
+                             _period_records("20240105", "20240108"), {"20240107"})
+    assert grid == {("20240107", "USD"): {"rate": 5.0, "exchangedate": "07.01.2024"}}
+
+
+@pytest.mark.parametrize("dates", [["20240106", "20240107", "20240108"], ["20240107"]])
+def test_grid_is_the_same_in_every_mode(fake_nbu, dates):
+    currencies = ["USD", "EUR"]
+    grids = {mode: nbu_fetcher.fetch_rate_grid(dates, currencies, mode=mode, rate_limit=None)
+             for mode in nbu_fetcher.FETCH_MODES}
+
+    expected = {(date, currency): _expected(currency, date)[currency] for date in dates for currency in currencies}
+    assert grids == {mode: expected for mode in nbu_fetcher.FETCH_MODES}
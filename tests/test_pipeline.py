@@ -0,0 +1,28 @@
+import os
+import threading
+
+import pipeline
+
+
+def test_channel_counts_only_delivered_items():
+    stop = threading.Event()
+    channel = pipeline.Channel("test", maxsize=1)
+    channel.put("first", stop)
+
+    stop.set()
+    channel.put("dropped", stop)  # The queue is full and the pipeline stopped: the item is dropped
+
+    assert channel.stats()["items"] == 1
+    assert channel.get(threading.Event()) == "first"
+
+
+def test_run_pipeline_uploads_csv_and_charts(s3_bucket, fake_nbu, tmp_path):
+    dates = ["20221230", "20221231", "20230101", "20230102"]
+
+    report = pipeline.run_pipeline(dates, ["USD", "EUR"], s3_bucket, csv_name=str(tmp_path / "rates.csv"),
+                                   batch_dates=2, output_dir=str(tmp_path), rate_limit=None)
+
+    assert report["records"] == 8
+    assert sorted(report["uploaded"]) == ["2022_uah_exchange_rates.png", "2023_uah_exchange_rates.png", "rates.csv"]
+    assert report["queues"]["fetch->serialize"]["items"] == 2
+    assert os.path.exists(tmp_path / "2022_uah_exchange_rates.png")
@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import rate_cache
+
+TODAY = datetime(2024, 3, 15, 12, 0)
+
+
+class Clock:
+    """Stands in for the time and datetime modules inside rate_cache."""
+
+    def __init__(self, now):
+        self.now = now
+
+    def time(self):
+        return self.now.timestamp()
+
+    def advance(self, seconds):
+        self.now += timedelta(seconds=seconds)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(TODAY)
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return clock.now
+
+    monkeypatch.setattr(rate_cache, "time", clock)
+    monkeypatch.setattr(rate_cache, "datetime", FrozenDatetime)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = rate_cache.RateCache(str(tmp_path / "rates.sqlite"), volatile_ttl=60, max_volatile_entries=2)
+    yield cache
+    cache.close()
+
+
+def _rate(rate, date_str):
+    return {"rate": rate, "exchangedate": datetime.strptime(date_str, "%Y%m%d").strftime("%d.%m.%Y")}
+
+
+def test_volatile_entry_expires_after_ttl(cache, clock):
+    cache.put("20240315", "USD", _rate(39.1, "20240315"))
+
+    clock.advance(59)
+    assert cache.get("20240315", "USD") == _rate(39.1, "20240315")
+    clock.advance(2)
+    assert cache.get("20240315", "USD") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_historical_entry_is_permanent(cache, clock):
+    cache.put("20240314", "USD", _rate(38.9, "20240314"))
+
+    clock.advance(10 * 365 * 24 * 3600)
+    today = clock.now.strftime("%Y%m%d")
+    cache.put(today, "EUR", _rate(45.0, today))  # Triggers the volatile eviction pass
+
+    assert cache.get("20240314", "USD") == _rate(38.9, "20240314")
+    assert cache.stats()["volatile_entries"] == 1
+
+
+def test_volatile_entries_are_capped_oldest_first(cache, clock):
+    cache.put("20240314", "USD", _rate(38.9, "20240314"))
+    for currency in ("USD", "EUR", "GBP"):
+        cache.put("20240315", currency, _rate(40.0, "20240315"))
+        clock.advance(1)
+
+    found, missing = cache.get_many(["20240314", "20240315"], ["USD", "EUR", "GBP"])
+    assert sorted(found) == [("20240314", "USD"), ("20240315", "EUR"), ("20240315", "GBP")]
+    assert sorted(missing) == [("20240314", "EUR"), ("20240314", "GBP"), ("20240315", "USD")]
+    assert cache.stats() == {"hits": 3, "misses": 3, "evictions": 1, "entries": 3, "volatile_entries": 2}
+
+
+def test_expired_entries_are_evicted_on_write(cache, clock):
+    cache.put("20240315", "USD", _rate(39.1, "20240315"))
+    clock.advance(61)
+    cache.put("20240315", "EUR", _rate(42.0, "20240315"))
+
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["entries"] == 1
+
+
+def test_entries_survive_reopening(tmp_path, clock):
+    path = str(tmp_path / "rates.sqlite")
+    cache = rate_cache.RateCache(path)
+    cache.put_many({("20240301", "USD"): _rate(38.0, "20240301"), ("20240315", "USD"): _rate(39.1, "20240315")})
+    cache.close()
+
+    cache = rate_cache.RateCache(path)
+    assert cache.get_many(["20240301", "20240315"], ["USD"])[1] == []
+    cache.close()
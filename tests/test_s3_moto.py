@@ -0,0 +1,62 @@
+import os
+
+import s3_transfer
+from aws_clients import get_client
+
+MB = s3_transfer.MB
+
+
+def _keys(bucket_name):
+    paginator = get_client('s3').get_paginator('list_objects_v2')
+    return [obj['Key'] for page in paginator.paginate(Bucket=bucket_name) for obj in page.get('Contents', [])]
+
+
+def test_multipart_upload_download_round_trip(s3_bucket, tmp_path):
+    data = os.urandom(12 * MB + 123)
+    source, target = tmp_path / "source.bin", tmp_path / "target.bin"
+    source.write_bytes(data)
+    config = s3_transfer.make_transfer_config(multipart_threshold=5 * MB, chunk_size=5 * MB, max_concurrency=4)
+
+    uploaded = s3_transfer.upload_file(s3_bucket, str(source), "big.bin", config=config, verbose=False)
+    head = get_client('s3').head_object(Bucket=s3_bucket, Key="big.bin")
+    downloaded = s3_transfer.download_file(s3_bucket, "big.bin", str(target), config=config, verbose=False)
+
+    assert head['ETag'].strip('"').endswith("-3")  # Uploaded as three parts
+    assert uploaded['bytes'] == downloaded['bytes'] == len(data)
+    assert target.read_bytes() == data
+
+
+def test_upload_defaults_to_file_name(s3_bucket, tmp_path):
+    source = tmp_path / "rates.csv"
+    source.write_text("currency,rate\nUSD,41.2\n")
+
+    s3_transfer.upload_file(s3_bucket, str(source), verbose=False)
+
+    assert _keys(s3_bucket) == ["rates.csv"]
+
+
+def test_sync_round_trip_skips_unchanged_files(s3_bucket, tmp_path):
+    local_dir, restored_dir = tmp_path / "local", tmp_path / "restored"
+    files = {"a.csv": b"1" * 10, "nested/b.csv": b"2" * 20, "nested/deeper/c.csv": b"3" * 30}
+    for name, body in files.items():
+        path = local_dir.joinpath(*name.split("/"))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(body)
+
+    up = s3_transfer.sync_directory_to_s3(str(local_dir), s3_bucket, prefix="exports/", max_workers=3)
+    assert (up['files'], up['failed'], up['skipped'], up['bytes']) == (3, 0, 0, 60)
+    assert sorted(_keys(s3_bucket)) == sorted("exports/" + name for name in files)
+
+    down = s3_transfer.sync_s3_prefix_to_directory(s3_bucket, "exports/", str(restored_dir), max_workers=3)
+    assert (down['files'], down['failed'], down['skipped'], down['bytes']) == (3, 0, 0, 60)
+    for name, body in files.items():
+        assert restored_dir.joinpath(*name.split("/")).read_bytes() == body
+
+    # Nothing changed on either side, so a second pass moves nothing
+    assert s3_transfer.sync_directory_to_s3(str(local_dir), s3_bucket, prefix="exports/")['skipped'] == 3
+    assert s3_transfer.sync_s3_prefix_to_directory(s3_bucket, "exports/", str(restored_dir))['skipped'] == 3
+
+    # A changed size is uploaded again
+    local_dir.joinpath("a.csv").write_bytes(b"1" * 11)
+    again = s3_transfer.sync_directory_to_s3(str(local_dir), s3_bucket, prefix="exports/")
+    assert (again['files'], again['skipped']) == (1, 2)
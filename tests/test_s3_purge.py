@@ -0,0 +1,64 @@
+import ec2_s3_computing_automation
+from aws_clients import get_client
+
+
+def _put_objects(bucket_name, count, prefix="obj/"):
+    s3_client = get_client('s3')
+    for i in range(count):
+        s3_client.put_object(Bucket=bucket_name, Key=f"{prefix}{i:05d}", Body=b"x" * (i % 7))
+
+
+def _keys(bucket_name):
+    paginator = get_client('s3').get_paginator('list_objects_v2')
+    return [obj['Key'] for page in paginator.paginate(Bucket=bucket_name) for obj in page.get('Contents', [])]
+
+
+def test_purge_deletes_every_batch(s3_bucket):
+    count = ec2_s3_computing_automation.DELETE_OBJECTS_LIMIT * 2 + 5
+    _put_objects(s3_bucket, count)
+
+    totals = ec2_s3_computing_automation.delete_all_objects_in_s3_bucket(s3_bucket, max_workers=2)
+
+    assert totals['objects'] == count
+    assert totals['failed'] == 0
+    assert totals['bytes'] == sum(i % 7 for i in range(count))
+    assert _keys(s3_bucket) == []
+
+
+def test_purge_removes_versions_and_delete_markers(s3_bucket):
+    s3_client = get_client('s3')
+    s3_client.put_bucket_versioning(Bucket=s3_bucket, VersioningConfiguration={'Status': 'Enabled'})
+    for body in (b"a", b"bb"):
+        s3_client.put_object(Bucket=s3_bucket, Key="versioned", Body=body)
+    s3_client.delete_object(Bucket=s3_bucket, Key="versioned")
+
+    totals = ec2_s3_computing_automation.delete_all_objects_in_s3_bucket(s3_bucket)
+
+    assert totals['objects'] == 3  # Two versions and one delete marker
+    versions = s3_client.list_object_versions(Bucket=s3_bucket)
+    assert not versions.get('Versions') and not versions.get('DeleteMarkers')
+    s3_client.delete_bucket(Bucket=s3_bucket)
+
+
+def test_delete_batch_retries_throttled_keys(s3_bucket, monkeypatch):
+    _put_objects(s3_bucket, 3)
+    s3_client = get_client('s3')
+    delete_objects = s3_client.delete_objects
+    calls = []
+
+    def throttle_first_call(**kwargs):
+        calls.append([entry['Key'] for entry in kwargs['Delete']['Objects']])
+        response = delete_objects(**kwargs)
+        if len(calls) == 1:
+            # Report the first key as throttled without deleting it, like a partial S3 failure
+            key = kwargs['Delete']['Objects'][0]['Key']
+            s3_client.put_object(Bucket=s3_bucket, Key=key, Body=b"")
+            response['Errors'] = [{'Key': key, 'Code': 'SlowDown', 'Message': 'Reduce your request rate.'}]
+        return response
+
+    monkeypatch.setattr(s3_client, 'delete_objects', throttle_first_call)
+    batch = [({'Key': key}, 1) for key in _keys(s3_bucket)]
+
+    assert ec2_s3_computing_automation._delete_batch(s3_bucket, batch) == (3, 3, 0)
+    assert calls == [["obj/00000", "obj/00001", "obj/00002"], ["obj/00000"]]
+    assert _keys(s3_bucket) == []